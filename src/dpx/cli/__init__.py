@@ -1,13 +1,15 @@
 import typer
 
-from src.dpx.cli import create, read, update, delete, dev
+from src.dpx.cli.utils.registry import LazyGroup
 
-app = typer.Typer()
+# Commands in create, read, update, delete, dev are loaded on dispatch
+# See: src/dpx/cli/utils/registry.py
+app = typer.Typer(cls=LazyGroup)
+
+
+@app.callback()
+def callback() -> None:
+    pass
 
-app.add_typer(create.app)
-app.add_typer(read.app)
-app.add_typer(update.app)
-app.add_typer(delete.app)
-app.add_typer(dev.app, name="dev")
 
 # __all__ = ["create", "read", "update", "delete"]
@@ -6,17 +6,31 @@ init
 cdb
 """
 
+import csv
 import os
 import warnings
+from collections.abc import Callable, Iterable
+from functools import partial
+from pathlib import Path
 from typing_extensions import Annotated
 
 import typer
-from icecream import ic
 from rich import print
 
-from src.dpx.cli.utils.util import ProjectManager, Project, temp_prefix
+from src.dpx.cli.utils.completion import complete_group, complete_project
+from src.dpx.cli.utils.context import Invocation
+from src.dpx.cli.utils.util import Project, temp_prefix
 from src.dpx.utils.paths import PROJECTS_DIR
-from src.dpx.utils.util import random_string, csv_to_excel
+from src.dpx.utils.util import (
+    available_memory,
+    columnar_formats,
+    copy_modes,
+    csv_converters,
+    csv_to_excel,
+    csv_to_excel_memory,
+    format_size,
+    random_string,
+)
 
 doptions: list[str] = ["ripe", "metal"]
 # data folder name options
@@ -35,7 +49,9 @@ name_help = "The name of the project."
 url_help = "The url source of the dataset."
 playground_help = "Choose the playground group."
 group_help = "The name of the group."
+project_group_help = "The group of the project, found from its name if not given."
 force_overwrite_help = "Force overwrite."
+store_help = "Keep the downloaded files in the store shared by projects, hardlinked into raw."
 
 app = typer.Typer()
 # projects_manager = ProjectManager()
@@ -43,20 +59,23 @@ app = typer.Typer()
 
 @app.command(help="Create a new group.")
 def gadd(
+    ctx: typer.Context,
     group: Annotated[
         str,
         typer.Argument(help="The name of the group you want to create."),
     ],
 ) -> None:
-    project_manager = ProjectManager()
-    project_manager.create_group(group)
+    invocation = ctx.ensure_object(Invocation)
+    invocation.project_manager.create_group(group)
+    invocation.project_manager.save_name_index()
 
 
 @app.command(help="Download a dataset to an existing project.")
 def dl(
+    ctx: typer.Context,
     name: Annotated[
         str,
-        typer.Argument(help=name_help),
+        typer.Argument(help=name_help, autocompletion=complete_project),
     ],
     url: Annotated[
         str,
@@ -80,9 +99,24 @@ def dl(
             "-g",
             "--group",
             help=group_help,
+            autocompletion=complete_group,
         ),
     ] = current_main,
+    store: Annotated[
+        bool,
+        typer.Option(
+            "-s",
+            "--store",
+            help=store_help,
+        ),
+    ] = False,
 ) -> None:
+    """Examples:
+
+    dpx dl smith-somedataset -u <url> --store
+        Download into the store shared by projects, or link from it if <url> was downloaded before.
+    """
+
     # Case where url is necessary
     # Maybe possible to download data not using url
     if not url:
@@ -91,24 +125,38 @@ def dl(
     if playground:
         group = "playground"
 
-    projects_manager = ProjectManager()
-    projects_manager.verify_group(group)
-    projects_manager.verify_project(name)
+    invocation = ctx.ensure_object(Invocation)
+    invocation.verify_group(group)
+    project = invocation.project(name)
 
-    this_project_path = PROJECTS_DIR / group / name
-    project = Project(this_project_path)
+    if store:
+        linked = project.link_stored_dataset(url)
+        if linked is not None:
+            print(f"'{url}' linked from the store, {len(linked)} file(s) not downloaded.")
+            project.append_source(url)
+            project.save_data_index()
+            return
+        before = project.data_file_stats()
 
     if url:
         project.handle_url(url)
         project.append_source(url)
+        project.save_data_index()
+
+    if store:
+        downloaded = [path for path, stat in project.data_file_stats().items() if before.get(path) != stat]
+        stored, freed = project.data_store(downloaded, url)
+        print(f"{stored} file(s) added to the store, {format_size(freed)} shared with other projects.")
 
 
 @app.command(help="Copies all data in raw to interim in a project.")
 def dcp(
+    ctx: typer.Context,
     name: Annotated[
         str,
         typer.Argument(
             help=name_help,
+            autocompletion=complete_project,
         ),
     ],
     playground: Annotated[
@@ -120,13 +168,14 @@ def dcp(
         ),
     ] = False,
     group: Annotated[
-        str,
+        str | None,
         typer.Option(
             "-g",
             "--group",
-            help=group_help,
+            help=project_group_help,
+            autocompletion=complete_group,
         ),
-    ] = current_main,
+    ] = None,
     force_overwrite: Annotated[
         bool,
         typer.Option(
@@ -135,37 +184,75 @@ def dcp(
             help=force_overwrite_help,
         ),
     ] = False,
+    output_format: Annotated[
+        str | None,
+        typer.Option(
+            "--format",
+            help=f"Convert .csv files to this format while copying, one of: {', '.join(columnar_formats)}.",
+            autocompletion=lambda incomplete: [f for f in columnar_formats if f.startswith(incomplete)],
+        ),
+    ] = None,
+    mode: Annotated[
+        str,
+        typer.Option(
+            "-m",
+            "--mode",
+            help=(
+                "How files are copied: reflink (copy-on-write clone), hardlink (shares the file with raw,"
+                " editing one edits both), copy, or auto (reflink where supported, else copy)."
+            ),
+            autocompletion=lambda incomplete: [m for m in copy_modes if m.startswith(incomplete)],
+        ),
+    ] = "auto",
+    jobs: Annotated[
+        int | None,
+        typer.Option(
+            "-j",
+            "--jobs",
+            help="Threads copying the files of a folder at once.",
+        ),
+    ] = None,
 ) -> None:
-    """Copies all data in raw to interim in a project."""
+    """Copies all data in raw to interim in a project.
 
-    if playground:
-        group = "playground"
+    dpx dcp smith-somedataset --format parquet
+        Copy raw to interim, writing .csv files as .parquet.
 
-    project_manager = ProjectManager()
-    group = project_manager.get_group_from_project(name)
+    dpx dcp smith-somedataset --mode hardlink
+        Link raw files into interim instead of copying them, taking no extra space.
 
-    # TODO: clean redundant verifications
-    project_manager.verify_group(group)
-    project_manager.verify_project(name)
+    Folders in raw are copied recursively, 'images/' to 'images-copy/'.
+    """
 
-    this_project_path = PROJECTS_DIR / group / name
-    project = Project(this_project_path)
+    if jobs is not None and jobs < 1:
+        raise ValueError(f"'{jobs}' jobs, must be at least 1.")
 
-    created_copies = project.data_copy(force_overwrite)
+    if playground:
+        group = "playground"
 
-    for created_copy in created_copies:
-        print(f"'{created_copy.name}' created in '{created_copy.parent.parent.name}/{created_copy.parent.name}'")
-        return
+    invocation = ctx.ensure_object(Invocation)
+    project = invocation.project(name, group)
 
-    warnings.warn("No files copied.")
+    created_copies = project.data_copy(force_overwrite, output_format, mode, jobs)
+    project.save_data_index()
+
+    for created_copy, how in created_copies:
+        print(
+            f"'{created_copy.name}' created in '{created_copy.parent.parent.name}/{created_copy.parent.name}' ({how})"
+        )
+
+    if not created_copies:
+        warnings.warn("No files copied.")
 
 
 @app.command(help="Copies and converts all csv files in raw to interim.")
 def dpromote(
+    ctx: typer.Context,
     name: Annotated[
         str,
         typer.Argument(
             help=name_help,
+            autocompletion=complete_project,
         ),
     ],
     playground: Annotated[
@@ -177,13 +264,14 @@ def dpromote(
         ),
     ] = False,
     group: Annotated[
-        str,
+        str | None,
         typer.Option(
             "-g",
             "--group",
-            help=group_help,
+            help=project_group_help,
+            autocompletion=complete_group,
         ),
-    ] = current_main,
+    ] = None,
     force_overwrite: Annotated[
         bool,
         typer.Option(
@@ -192,74 +280,299 @@ def dpromote(
             help=force_overwrite_help,
         ),
     ] = False,
+    jobs: Annotated[
+        int | None,
+        typer.Option(
+            "-j",
+            "--jobs",
+            help="Files converted at once. Defaults to the number of CPUs, fewer when memory is low.",
+        ),
+    ] = None,
+    output_format: Annotated[
+        str,
+        typer.Option(
+            "--format",
+            help=f"Format the .csv files are converted to, one of: {', '.join(csv_converters)}.",
+            autocompletion=lambda incomplete: [f for f in csv_converters if f.startswith(incomplete)],
+        ),
+    ] = "xlsx",
     # ddir: Annotated[str, typer.Option()] = base_ddir,
     # ca: Annotated[str, typer.Option()] = copy_attachment,
 ) -> None:
-    """Copies and converts all .csv to .xlsx files from raw to interim."""
+    """Copies and converts all .csv to .xlsx files from raw to interim.
 
-    if playground:
-        group = "playground"
+    Files are converted in a pool of processes, their results are reported in file name order.
+    .csv files in folders copied or zip archives extracted by dcp are converted too.
 
-    project_manager = ProjectManager()
-    group = project_manager.get_group_from_project(name)
+    dpx dpromote smith-somedataset --format parquet
+        Convert to .parquet instead, much faster to load in a notebook than .xlsx.
+        parquet and feather need pyarrow: pip install 'dpx[columnar]'
+    """
 
-    # TODO: clean redundant verification
-    project_manager.verify_project(name)
-    project_manager.verify_group(group)
+    if output_format not in csv_converters:
+        raise ValueError(f"'{output_format}' is not a format, choose from: {list(csv_converters)}.")
 
-    this_project_path = PROJECTS_DIR / group / name
-    project = Project(this_project_path)
+    if playground:
+        group = "playground"
+
+    invocation = ctx.ensure_object(Invocation)
+    project = invocation.project(name, group)
 
     # Copy files from raw to interim
     dcp(
+        ctx,
         name=name,
         playground=playground,
-        group=group,
+        group=project.group,
         force_overwrite=force_overwrite,
     )
 
-    # Turn all .csv in raw to .xlsx in interim
-    interim_files = os.listdir(project.data_interim_path)
-    interim_file_paths = [project.data_interim_path / interim_file for interim_file in interim_files]
+    # Turn all .csv in raw to output_format in interim
+    # Including those in folders copied or extracted by dcp
+    interim_file_paths: list[Path] = []
+    for root, dirnames, filenames in os.walk(project.data_interim_path):
+        dirnames.sort()
+        interim_file_paths += [Path(root) / filename for filename in sorted(filenames)]
 
+    # Skips csv files unchanged since their last conversion
+    manifest = project.data_manifest()
+
+    to_convert: list[Path] = []
     for interim_file_path in interim_file_paths:
         stem, ext = os.path.splitext(interim_file_path.name)
 
         if ext not in [".csv"]:
             continue
 
-        # TODO: assumes excel ext is always .xlsx
-        supposed_xlsx_file = interim_file_path.parent / f"{stem}.xlsx"
+        supposed_file = interim_file_path.parent / f"{stem}.{output_format}"
 
-        if supposed_xlsx_file.exists():
-            if not force_overwrite:
+        if supposed_file.exists() and not force_overwrite:
+            current = manifest.is_current(interim_file_path, output_format)
+            if current is None:
+                # Converted before the manifest
+                manifest.record(interim_file_path, output_format, [supposed_file])
+            if current is not False:
                 continue
 
-        created_xlsx_filename = csv_to_excel(interim_file_path)
-        print(
-            f"'{created_xlsx_filename.name}' created in '{interim_file_path.parent.parent.name}/{interim_file_path.parent.name}'"
-        )
+        to_convert.append(interim_file_path)
 
+    created_by_csv = promote_csvs(to_convert, conversion_jobs(jobs, len(to_convert)), csv_converters[output_format])
+
+    for csv_path, created_files in created_by_csv.items():
+        if created_files is not None:
+            manifest.record(csv_path, output_format, created_files)
+    manifest.save()
+
+    project.save_data_index()
+
+    if None in created_by_csv.values():
+        raise typer.Exit(code=1)
     return
 
 
-# @app.command("Create a database")
-# def cdb(
-#     name: Annotated[str, typer.Argument()],
-#     dbn: Annotated[str, typer.Option()] = temp_prefix + random_string(),
-# ) -> None:
-#     pass
+def conversion_jobs(requested: int | None, files: int) -> int:
+    """Processes for converting files: as requested or one per CPU,
+    no more than files, nor than available memory allows.
+    """
+
+    if requested is not None and requested < 1:
+        raise ValueError(f"'{requested}' jobs, must be at least 1.")
+
+    jobs = requested or os.process_cpu_count() or 1
+    jobs = min(jobs, max(files, 1))
+
+    memory = available_memory()
+    if memory is not None:
+        memory_jobs = max(memory // csv_to_excel_memory, 1)
+        if memory_jobs < jobs:
+            print(f"Low memory, converting {memory_jobs} file(s) at once instead of {jobs}.")
+            jobs = memory_jobs
+
+    return jobs
+
+
+def promote_csvs(
+    csv_paths: list[Path],
+    jobs: int,
+    convert: Callable[[Path], list[Path]] = csv_to_excel,
+) -> dict[Path, list[Path] | None]:
+    """Converts csv files with convert (.xlsx by default), jobs at a time.
+
+    Progress is printed per file, in the order of csv_paths whatever the order they finish in.
+    Returns the files created from each csv, None for those which failed, after reporting them.
+    """
+
+    def report(results: Iterable[Callable[[], list[Path]]]) -> dict[Path, list[Path] | None]:
+        created_by_csv: dict[Path, list[Path] | None] = {}
+        total = len(csv_paths)
+        for i, (csv_path, result) in enumerate(zip(csv_paths, results), start=1):
+            try:
+                created_files = result()
+            # RuntimeError: a worker which died breaks the pool (BrokenProcessPool)
+            except (OSError, ValueError, ImportError, EOFError, csv.Error, RuntimeError) as e:
+                print(f"[{i}/{total}] Could not convert '{csv_path.name}': {e}")
+                created_by_csv[csv_path] = None
+                continue
+
+            for created in created_files:
+                print(f"[{i}/{total}] '{created.name}' created in '{created.parent.parent.name}/{created.parent.name}'")
+            created_by_csv[csv_path] = created_files
+        return created_by_csv
+
+    if jobs <= 1:
+        return report(partial(convert, csv_path) for csv_path in csv_paths)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(convert, csv_path) for csv_path in csv_paths]
+        return report(future.result for future in futures)
+
+
+@app.command(help="Add the raw files of a project to the store shared by projects.")
+def dstore(
+    ctx: typer.Context,
+    name: Annotated[
+        str,
+        typer.Argument(
+            help=name_help,
+            autocompletion=complete_project,
+        ),
+    ],
+    playground: Annotated[
+        bool,
+        typer.Option(
+            "-p",
+            "--playground",
+            help=playground_help,
+        ),
+    ] = False,
+    group: Annotated[
+        str | None,
+        typer.Option(
+            "-g",
+            "--group",
+            help=project_group_help,
+            autocompletion=complete_group,
+        ),
+    ] = None,
+) -> None:
+    """Examples:
+
+    dpx dstore smith-somedataset
+        Each file of data/raw becomes a hardlink to the blob of its content in dp-projects/.hidden/store,
+        files another project stored before take no more space.
+
+    Stored files are read only, they may be shared with other projects.
+    A blob is removed when 'dpx rm' removes the last project linking to it.
+    """
+
+    if playground:
+        group = "playground"
+
+    invocation = ctx.ensure_object(Invocation)
+    project = invocation.project(name, group)
+
+    stored, freed = project.data_store()
+    print(f"{stored} file(s) in the store, {format_size(freed)} shared with other projects.")
+
+
+@app.command(help="Load the csv files in raw and interim into a SQLite database in data/db.")
+def cdb(
+    ctx: typer.Context,
+    name: Annotated[
+        str,
+        typer.Argument(
+            help=name_help,
+            autocompletion=complete_project,
+        ),
+    ],
+    playground: Annotated[
+        bool,
+        typer.Option(
+            "-p",
+            "--playground",
+            help=playground_help,
+        ),
+    ] = False,
+    group: Annotated[
+        str | None,
+        typer.Option(
+            "-g",
+            "--group",
+            help=project_group_help,
+            autocompletion=complete_group,
+        ),
+    ] = None,
+    force_overwrite: Annotated[
+        bool,
+        typer.Option(
+            "-f",
+            "--force",
+            help="Load every file again, even those unchanged since their last load.",
+        ),
+    ] = False,
+    dbn: Annotated[
+        str | None,
+        typer.Option(
+            "--dbn",
+            help="Name of the database, the project name by default.",
+        ),
+    ] = None,
+    index_columns: Annotated[
+        list[str] | None,
+        typer.Option(
+            "-i",
+            "--index",
+            help="Column to index in every table which has it, repeatable. Id columns are always indexed.",
+        ),
+    ] = None,
+) -> None:
+    """Loads the .csv and .tsv files in raw and interim, in folders too, one table per file.
+
+    dpx cdb smith-somedataset
+        data/raw/train.csv to table 'train' of data/db/smith-somedataset.sqlite3
+
+    dpx cdb smith-somedataset -i region -i store
+        Index the region and store columns too.
+
+    Rows are streamed into SQLite, the files are never read whole into memory.
+    Files unchanged since their last load are skipped.
+    """
+
+    if playground:
+        group = "playground"
+
+    invocation = ctx.ensure_object(Invocation)
+    project = invocation.project(name, group)
+
+    db_path, loaded = project.data_load_db(force_overwrite, dbn, index_columns)
+
+    data_path = project.this_project_path / "data"
+    for csv_path, (table, rows) in loaded.items():
+        if isinstance(rows, str):
+            print(f"Could not load '{csv_path.relative_to(data_path)}': {rows}")
+        else:
+            print(f"'{csv_path.relative_to(data_path)}' loaded into table '{table}' ({rows} rows)")
+
+    if not loaded:
+        warnings.warn("No files loaded.")
+    print(f"'{db_path.name}' in 'data/db' ({format_size(db_path.stat().st_size)})")
+
+    if any(isinstance(rows, str) for _, rows in loaded.values()):
+        raise typer.Exit(code=1)
 
 
 @app.command(help="Initialise a project workspace in an existing project group.")
 def init(
+    ctx: typer.Context,
     *,
     name: Annotated[
-        str,
+        str | None,
         typer.Argument(
-            help=name_help,
+            help=f"{name_help} A random '{temp_prefix}' name if not given.",
         ),
-    ] = temp_prefix + random_string(),
+    ] = None,
     playground: Annotated[
         bool,
         typer.Option(
@@ -274,6 +587,7 @@ def init(
             "-g",
             "--g",
             help=group_help,
+            autocompletion=complete_group,
         ),
     ] = current_main,
     # doption: Annotated[str, typer.Option()] = doption,
@@ -293,6 +607,14 @@ def init(
             help=force_overwrite_help,
         ),
     ] = False,
+    store: Annotated[
+        bool,
+        typer.Option(
+            "-s",
+            "--store",
+            help=store_help,
+        ),
+    ] = False,
 ) -> None:
     """Initialises a workspace.
 
@@ -303,16 +625,23 @@ def init(
         Initialise a project called 'smith-somedataset'
         with data downloaded from <url>
         in group <group>
+
+    dpx init
+        Initialise a temporary project with a random name, 'tmp_scjmuv'.
     """
 
+    # Drawn per call, a default argument is drawn once per process and a daemon serves many
+    if name is None:
+        name = temp_prefix + random_string()
+
     def end_message() -> None:
         print(f"Initialised new project: '{name}' in group: '{group}'.")
         pass
 
-    project_manager = ProjectManager()
-    project_manager.verify_group(group)
+    invocation = ctx.ensure_object(Invocation)
+    invocation.verify_group(group)
 
-    if not project_manager.can_create_project(name):
+    if not invocation.project_manager.can_create_project(name):
         raise ValueError(f"Project '{name}' cannot be created.")
 
     if playground:
@@ -321,16 +650,15 @@ def init(
     this_project_path = PROJECTS_DIR / group / name
     this_project_path.mkdir(exist_ok=True)
 
-    # make data folders
+    # make data folders, other init folders and the final excel file
     project = Project(this_project_path)
-    project.mkdir_data_folders()
-
-    # make other init folders
-    project.mkdir_other_files()
+    invocation.add_project(project)
+    project.scaffold()
 
     project.lock()
 
-    project.add_final_excel_file()
+    invocation.project_manager.save_name_index()
+    project.save_data_index()
 
     if not url:
         end_message()
@@ -339,14 +667,17 @@ def init(
     # Dowload data using cli command
     print("Downloading files from URL...")
     dl(
+        ctx,
         name=name,
         url=url,
         playground=playground,
         group=group,
+        store=store,
     )
 
     # print("Initialising downloaded files...")
     # dpromote(
+    #     ctx,
     #     name=name,
     #     playground=playground,
     #     group=group,
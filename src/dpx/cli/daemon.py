@@ -0,0 +1,225 @@
+"""Daemon CLI command.
+
+daemon
+
+dpx daemon
+    Imports every command module and syncs the project catalog once,
+    then listens on DAEMON_SOCKET_PATH.
+    Each request is run in a forked copy of the warm process,
+    with the client's stdin, stdout and stderr.
+
+dpxc <command> ...
+    Client, see src/dpx/dpx_launcher.py.
+    Falls back to running in-process when no daemon is listening.
+"""
+
+import contextlib
+import io
+import os
+import random
+import signal
+import socket
+import sys
+from typing import Annotated
+
+import typer
+from rich import print
+
+from src.dpx.cli.utils.registry import lazy_table, load_command
+from src.dpx.cli.utils.util import ProjectManager
+from src.dpx.utils.daemon import recv_request, send_int
+from src.dpx.utils.paths import DAEMON_SOCKET_PATH
+
+app = typer.Typer()
+
+stop_argv = ["--stop-daemon"]
+
+
+def warm_up() -> None:
+    """Import what commands need so forked requests start warm."""
+
+    import pandas  # noqa: F401
+    import rich.table  # noqa: F401
+
+    from src.dpx.__main__ import app as dpx_app
+
+    for name in lazy_table():
+        load_command(name)
+
+    # Rendering help once loads the rest of typer and rich
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            dpx_app(args=["--help"], prog_name="dpx")
+        except SystemExit:
+            pass
+
+    # Brings the on-disk catalog up to date
+    ProjectManager()
+
+
+def is_same_user(conn: socket.socket) -> bool:
+    """Only serve the user running the daemon, where the platform can tell."""
+
+    if not hasattr(socket, "SO_PEERCRED"):
+        return True
+
+    creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, 12)
+    uid = int.from_bytes(creds[4:8], sys.byteorder)
+    return uid == os.getuid()
+
+
+def run_request(conn: socket.socket, request: dict, fds: list[int]) -> None:
+    """Run a request in this (forked) process and exit."""
+
+    from src.dpx.__main__ import app as dpx_app
+
+    code = 1
+    try:
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+
+        # Line buffered when the client is a terminal, as in-process
+        sys.stdout.reconfigure(line_buffering=os.isatty(1))
+
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+        send_int(conn, os.getpid())
+        prog = request.get("prog", "dpx")
+        sys.argv = [prog, *request["argv"]]
+        try:
+            # Shell completion is served here too, with the index and modules warm
+            dpx_app(args=request["argv"], prog_name=prog)
+            code = 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+        except KeyboardInterrupt:
+            code = 130
+        except Exception:
+            # Printed as if the command ran in-process, the exit below ends the re-raise
+            sys.excepthook(*sys.exc_info())
+            raise
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        try:
+            send_int(conn, code)
+        finally:
+            os._exit(0)
+
+
+def serve(server: socket.socket) -> None:
+    while True:
+        conn, _ = server.accept()
+
+        # Reap finished requests
+        try:
+            while os.waitpid(-1, os.WNOHANG)[0]:
+                pass
+        except ChildProcessError:
+            pass
+
+        if not is_same_user(conn):
+            conn.close()
+            continue
+
+        try:
+            request, fds = recv_request(conn)
+        except (OSError, ValueError):
+            conn.close()
+            continue
+
+        if request["argv"] == stop_argv:
+            for fd in fds:
+                os.close(fd)
+            send_int(conn, os.getpid())
+            send_int(conn, 0)
+            conn.close()
+            return
+
+        # Nothing buffered may be copied into the request
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        if os.fork() == 0:
+            server.close()
+            # Each request draws its own random names, not those of the parent's state
+            random.seed()
+            run_request(conn, request, fds)
+
+        for fd in fds:
+            os.close(fd)
+        conn.close()
+
+
+@app.command(help="Keep dpx warm in the background for the dpxc client.")
+def daemon(
+    stop: Annotated[
+        bool,
+        typer.Option(
+            "--stop",
+            help="Stop the running daemon.",
+        ),
+    ] = False,
+) -> None:
+    """Examples:
+
+    dpx daemon &
+        Start the daemon in the background.
+
+    dpxc ls -a
+        Run 'dpx ls -a' in the daemon, or in-process if it is not running.
+
+    dpx daemon --stop
+        Stop the daemon.
+    """
+
+    if not hasattr(socket, "AF_UNIX") or not hasattr(socket, "send_fds"):
+        raise OSError("The daemon needs unix sockets.")
+
+    socket_path = str(DAEMON_SOCKET_PATH)
+
+    if stop:
+        from src.dpx.dpx_launcher import forward
+
+        if forward(stop_argv) is None:
+            print("No daemon running.")
+        else:
+            print("Stopped the daemon.")
+        return
+
+    DAEMON_SOCKET_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+    # A socket file left by a daemon that did not exit cleanly
+    if DAEMON_SOCKET_PATH.exists():
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            DAEMON_SOCKET_PATH.unlink()
+        else:
+            raise RuntimeError(f"A daemon is already listening on '{socket_path}'.")
+        finally:
+            probe.close()
+
+    warm_up()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        server.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    server.listen()
+
+    print(f"Listening on '{socket_path}'.")
+    try:
+        serve(server)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        DAEMON_SOCKET_PATH.unlink(missing_ok=True)
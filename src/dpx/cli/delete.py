@@ -12,23 +12,37 @@ from pathlib import Path
 from typing_extensions import Annotated
 
 import typer
-from icecream import ic
 from rich import print
 
+from src.dpx.cli.utils.completion import complete_group, complete_project, name_index
 from src.dpx.cli.utils.util import ProjectManager, Project
 from src.dpx.utils.paths import PROJECTS_DIR
+from src.dpx.utils.util import format_size
 
 app = typer.Typer()
 current_main = "main"
 wait_to_unlock: int = 10
 
 
+def collect_store() -> None:
+    """Remove the blobs of the store no project links to any more, see store.py."""
+
+    from src.dpx.cli.utils.store import BlobStore
+
+    store = BlobStore()
+    removed, freed = store.collect()
+    store.save()
+    if removed:
+        print(f"{removed} file(s) no project uses removed from the store, {format_size(freed)} freed.")
+
+
 @app.command(help="Delete project(s).")
 def rm(
     names: Annotated[
         list[str] | None,
         typer.Argument(
             help="The name of the project(s) you want to delete.",
+            autocompletion=complete_project,
         ),
     ] = None,
     group: Annotated[
@@ -37,6 +51,7 @@ def rm(
             "-g",
             "--group",
             help="Search in a group.",
+            autocompletion=complete_group,
         ),
     ] = current_main,
     playground: Annotated[
@@ -102,6 +117,7 @@ def rm(
             return
 
         unlocked_projects: list[str] = []
+        deleted_projects: list[str] = []
         for f in filepaths:
             if not f.exists():
                 # file not found error
@@ -114,9 +130,16 @@ def rm(
                 unlocked_projects.append(project.name)
             else:
                 shutil.rmtree(f)
+                project_manager.unregister_project(f.name)
+                deleted_projects.append(f.name)
                 print(f"'{f.name}' deleted from '{f.parent.name}'")
                 continue
 
+        if deleted_projects:
+            project_manager.save_name_index()
+            name_index.write_data({name: None for name in deleted_projects})
+            collect_store()
+
         if unlocked_projects:
             plural = len(unlocked_projects) > 1
             print(f"Project{'s' if plural else ''}", end=": ")
@@ -167,6 +190,7 @@ def grm(
         str,
         typer.Argument(
             help="Name of group you want to delete.",
+            autocompletion=complete_group,
         ),
     ],
 ) -> None:
@@ -184,5 +208,8 @@ def grm(
             os.rmdir(group_path)
         finally:
             print(f"Deleted group: '{group}'.")
+
+        project_manager.groups.remove(group)
+        project_manager.save_name_index()
     else:
         print(f"Cannot delete group: '{group}'. Empty first.")
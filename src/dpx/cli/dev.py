@@ -1,20 +1,65 @@
+import importlib
 import os
+import random
+import statistics
 import subprocess
+import sys
+import tempfile
+import time
 import typer
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from functools import cached_property
+from pathlib import Path
 from typing import Annotated
 
 from icecream import ic
+from rich import print
+from rich.console import Console
+from rich.table import Table
 
-from src.dpx.cli.utils.util import Project, ProjectManager
+from src.dpx.cli.utils.catalog import ProjectCatalog
+from src.dpx.cli.utils.completion import NameIndex
+from src.dpx.cli.utils.search import SearchIndex
+from src.dpx.cli.utils.registry import lazy_commands, lazy_groups, lazy_table, load_command
+from src.dpx.cli.utils.util import Project, ProjectManager, scan_group, temp_prefix
 from src.dpx.cli.utils.url_manager import URLDispatcher, KaggleHandler
 from src.dpx.utils.paths import PROJECTS_DIR, DPX_DIR
 
 app = typer.Typer()
 
-test_project = "test"
-test_project_path = PROJECTS_DIR / "main" / test_project
-fm = Project(test_project_path)
-pm = ProjectManager()
+
+class DevContext:
+    """Dev tooling, built on first use.
+
+    Nothing here touches the filesystem at import time.
+    """
+
+    test_project = "test"
+
+    @cached_property
+    def project_manager(self) -> ProjectManager:
+        return ProjectManager()
+
+    @cached_property
+    def test_project_path(self) -> Path:
+        return PROJECTS_DIR / "main" / self.test_project
+
+    @cached_property
+    def project(self) -> Project:
+        return Project(self.test_project_path)
+
+
+dev_context = DevContext()
+
+
+def projects_tmp_dir() -> tempfile.TemporaryDirectory:
+    """A temporary folder on the filesystem of the projects, for reflinks and hardlinks,
+    hidden so that scans do not take it for a group.
+    """
+
+    return tempfile.TemporaryDirectory(dir=PROJECTS_DIR, prefix=".")
 
 
 @app.command()
@@ -47,7 +92,7 @@ def finalxl(
         ),
     ],
 ) -> None:
-    project_manager = ProjectManager()
+    project_manager = dev_context.project_manager
     project_manager.verify_project(name)
 
     group = project_manager.get_group_from_project(name)
@@ -62,7 +107,7 @@ def finalxl(
 def cd(
     name: Annotated[str | None, typer.Argument()] = None,
 ) -> None:
-    project_manager = ProjectManager()
+    project_manager = dev_context.project_manager
 
     ic(name)
     if name is None:
@@ -77,6 +122,752 @@ def cd(
     os.chdir(goto)
 
 
+@app.command(help="Check the lazy command table against the command modules.")
+def check_commands() -> None:
+    mismatches: list[str] = []
+
+    for name, (module_name, table_help) in lazy_table().items():
+        command = load_command(name)
+        actual_help: str = command.get_short_help_str(limit=1000) if command.help else ""
+
+        if actual_help != table_help:
+            mismatches.append(f"'{name}' help in table: '{table_help}', in '{module_name}': '{actual_help}'")
+
+    # Commands defined in a module but missing from the table
+    modules: set[str] = {module_name for module_name, _ in lazy_commands.values()}
+    for module_name in sorted(modules):
+        module = importlib.import_module(module_name)
+        for name in typer.main.get_group(module.app).commands:
+            if name not in lazy_commands:
+                mismatches.append(f"'{name}' in '{module_name}' is not in the table.")
+
+    if mismatches:
+        for mismatch in mismatches:
+            print(mismatch)
+        raise typer.Exit(code=1)
+
+    print(f"{len(lazy_commands)} commands and {len(lazy_groups)} groups match.")
+
+
+@app.command(help="Benchmark the startup time of each command.")
+def bench_startup(
+    repeat: Annotated[
+        int,
+        typer.Option(
+            "-r",
+            "--repeat",
+            help="Runs per command.",
+        ),
+    ] = 5,
+) -> None:
+    """Times 'dpx <command> --help' in a fresh interpreter for every command.
+
+    '--help' imports the command's module without doing any work,
+    so the time is interpreter startup plus imports.
+    """
+
+    def run(args: list[str]) -> list[float]:
+        timings: list[float] = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-m", "src.dpx", *args],
+                cwd=DPX_DIR,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=True,
+            )
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    table = Table(title=f"dpx startup (ms, {repeat} runs)")
+    table.add_column("command")
+    table.add_column("min", justify="right")
+    table.add_column("median", justify="right")
+
+    to_run: list[list[str]] = [["--help"]] + [[name, "--help"] for name in lazy_table()]
+    for args in to_run:
+        timings = run(args)
+        table.add_row(" ".join(args), f"{min(timings):.0f}", f"{statistics.median(timings):.0f}")
+
+    console = Console()
+    console.print(table)
+
+
+@app.command(help="Check that no module scans directories at import time.")
+def check_import_fs() -> None:
+    result = subprocess.run(
+        [sys.executable, "-m", "src.dpx.utils.import_guard"],
+        cwd=DPX_DIR,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise typer.Exit(code=result.returncode)
+
+
+@contextmanager
+def count_fs_calls() -> Iterator[Counter[str]]:
+    """Counts calls to os.stat, os.lstat, os.listdir and os.scandir.
+
+    Path.is_dir(), Path.exists(), ... go through os.stat.
+    DirEntry.is_dir() does not, it uses the file type from the listing.
+    """
+
+    counts: Counter[str] = Counter()
+    names: list[str] = ["stat", "lstat", "listdir", "scandir"]
+    originals: dict[str, Callable] = {name: getattr(os, name) for name in names}
+
+    def counting(name: str) -> Callable:
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            return originals[name](*args, **kwargs)
+
+        return wrapper
+
+    for name in names:
+        setattr(os, name, counting(name))
+    try:
+        yield counts
+    finally:
+        for name, original in originals.items():
+            setattr(os, name, original)
+
+
+def legacy_scan_group(group_path: Path) -> tuple[list[Path], list[Path]]:
+    """scan_group as it was before: listdir, then is_project and is_temp_project per file."""
+
+    def is_group(filepath: Path) -> bool:
+        return filepath.parent.name == PROJECTS_DIR.name and filepath.is_dir() and not filepath.name.startswith(".")
+
+    def is_project(filepath: Path) -> bool:
+        return is_group(filepath.parent) and filepath.is_dir()
+
+    def is_temp_project(filepath: Path) -> bool:
+        return is_project(filepath) and filepath.name.startswith(temp_prefix)
+
+    files = os.listdir(group_path)
+    project_paths = [group_path / file for file in files if is_project(group_path / file)]
+    temp_project_paths = [group_path / file for file in files if is_temp_project(group_path / file)]
+    non_temp_project_paths = list(set(project_paths).difference(set(temp_project_paths)))
+
+    return temp_project_paths, non_temp_project_paths
+
+
+@app.command(help="Benchmark scanning a group of synthetic projects.")
+def bench_scan(
+    projects: Annotated[
+        int,
+        typer.Option(
+            "-n",
+            "--projects",
+            help="Number of projects in the synthetic group.",
+        ),
+    ] = 50_000,
+) -> None:
+    """Builds a synthetic group in a temp dir, one in ten projects is a temp project,
+    then compares the syscalls and time of legacy_scan_group and scan_group.
+    """
+
+    with tempfile.TemporaryDirectory() as tmp:
+        group_path = Path(tmp) / PROJECTS_DIR.name / "bench"
+        group_path.mkdir(parents=True)
+        (group_path / ".gitkeep").touch()
+        for i in range(projects):
+            name = f"{temp_prefix}{i}" if i % 10 == 0 else f"project-{i}"
+            (group_path / name).mkdir()
+
+        table = Table(title=f"Scan of {projects} projects")
+        table.add_column("scan")
+        table.add_column("stat", justify="right")
+        table.add_column("listdir + scandir", justify="right")
+        table.add_column("ms", justify="right")
+
+        results: list[set[Path]] = []
+        scans: dict[str, Callable] = {"legacy_scan_group": legacy_scan_group, "scan_group": scan_group}
+        for label, scan in scans.items():
+            with count_fs_calls() as counts:
+                start = time.perf_counter()
+                temp_project_paths, non_temp_project_paths = scan(group_path)
+                elapsed = (time.perf_counter() - start) * 1000
+
+            results.append(set(temp_project_paths) | set(non_temp_project_paths))
+            table.add_row(
+                label,
+                str(counts["stat"] + counts["lstat"]),
+                str(counts["listdir"] + counts["scandir"]),
+                f"{elapsed:.0f}",
+            )
+
+    if results[0] != results[1]:
+        raise ValueError("Scans found different projects.")
+
+    console = Console()
+    console.print(table)
+
+
+@app.command(help="Benchmark shell completion against a synthetic name index.")
+def bench_complete(
+    projects: Annotated[
+        int,
+        typer.Option(
+            "-n",
+            "--projects",
+            help="Number of projects in the synthetic index.",
+        ),
+    ] = 100_000,
+    repeat: Annotated[
+        int,
+        typer.Option(
+            "-r",
+            "--repeat",
+            help="Lookups per prefix.",
+        ),
+    ] = 100,
+) -> None:
+    """Writes a name index of synthetic projects in a temp dir,
+    then times completing project names and data files from it.
+    """
+
+    with tempfile.TemporaryDirectory() as tmp:
+        name_index = NameIndex(Path(tmp) / "names", Path(tmp))
+
+        groups = ["main", "playground"]
+        groups_by_name = {f"project-{i}": groups[i % 2] for i in range(projects)}
+
+        start = time.perf_counter()
+        name_index.write_projects(groups, groups_by_name)
+        write_ms = (time.perf_counter() - start) * 1000
+
+        name_index.write_data(
+            {f"project-{i}": [("raw", f"file-{j}.csv") for j in range(10)] for i in range(0, projects, 100)}
+        )
+
+        table = Table(title=f"Completion over {projects} projects (ms, {repeat} lookups)")
+        table.add_column("lookup")
+        table.add_column("candidates", justify="right")
+        table.add_column("median", justify="right")
+
+        lookups: dict[str, Callable[[], list]] = {
+            "project ''": lambda: name_index.complete_projects(""),
+            "project 'project-9'": lambda: name_index.complete_projects("project-9"),
+            "project 'project-12345'": lambda: name_index.complete_projects("project-12345"),
+            "project 'zzz'": lambda: name_index.complete_projects("zzz"),
+            "data 'project-100' 'file-'": lambda: name_index.complete_data_files("project-100", "file-"),
+            "group ''": lambda: name_index.complete_groups(""),
+        }
+        for label, lookup in lookups.items():
+            timings: list[float] = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                candidates = lookup()
+                timings.append((time.perf_counter() - start) * 1000)
+            table.add_row(label, str(len(candidates)), f"{statistics.median(timings):.3f}")
+
+    console = Console()
+    console.print(table)
+    print(f"Index written in {write_ms:.0f}ms.")
+
+
+@app.command(help="Benchmark fuzzy project lookups against a synthetic catalog.")
+def bench_find(
+    projects: Annotated[
+        int,
+        typer.Option(
+            "-n",
+            "--projects",
+            help="Number of projects in the synthetic catalog.",
+        ),
+    ] = 50_000,
+    repeat: Annotated[
+        int,
+        typer.Option(
+            "-r",
+            "--repeat",
+            help="Lookups per query.",
+        ),
+    ] = 20,
+) -> None:
+    """Fills a catalog in a temp dir with synthetic project names,
+    then times ProjectCatalog.similar for a few queries.
+    """
+
+    # Names like 'author-dataset' from a vocabulary of made up words
+    rng = random.Random(0)
+    syllables = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "da", "pe", "zu", "ho"]
+    words = ["".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(2000)]
+    names = {f"{rng.choice(words)}-{rng.choice(words)}" for _ in range(projects)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = ProjectCatalog(Path(tmp))
+
+        start = time.perf_counter()
+        rows = [(name, "main", 0) for name in sorted(names)]
+        catalog.replace_group("main", 0, rows)
+        index_ms = (time.perf_counter() - start) * 1000
+
+        some_name = rows[len(rows) // 2][0]
+        misspelt = some_name[:2] + some_name[3] + some_name[2] + some_name[4:]
+
+        table = Table(title=f"Fuzzy lookups over {len(rows)} projects (ms, {repeat} runs)")
+        table.add_column("query")
+        table.add_column("best match")
+        table.add_column("median", justify="right")
+
+        for query in [some_name, misspelt, some_name.split("-")[0], "zzzz"]:
+            timings: list[float] = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                matches = catalog.similar(query)
+                timings.append((time.perf_counter() - start) * 1000)
+            best = f"{matches[0][0]} ({matches[0][2]:.2f})" if matches else ""
+            table.add_row(query, best, f"{statistics.median(timings):.1f}")
+
+        catalog.close()
+
+    console = Console()
+    console.print(table)
+    print(f"Trigrams indexed in {index_ms:.0f}ms.")
+
+
+@app.command(help="Benchmark the metadata search index on synthetic projects.")
+def bench_search(
+    projects: Annotated[
+        int,
+        typer.Option(
+            "-n",
+            "--projects",
+            help="Number of synthetic projects.",
+        ),
+    ] = 5_000,
+) -> None:
+    """Writes a README, notes and sources for each synthetic project in a temp dir,
+    then times indexing, re-syncing with nothing or one file changed, and searching.
+    """
+
+    # Sizes of a filled in README, notes and sources
+    rng = random.Random(0)
+    words = [f"word{i}" for i in range(5000)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base_path = Path(tmp)
+        groups_by_name: dict[str, str] = {}
+        for i in range(projects):
+            name = f"project-{i}"
+            project_path = base_path / "main" / name
+            (project_path / "docs").mkdir(parents=True)
+            (project_path / "references").mkdir()
+            (project_path / "README.md").write_text(" ".join(rng.choices(words, k=80)))
+            (project_path / "docs" / "notes.txt").write_text(" ".join(rng.choices(words, k=30)))
+            (project_path / "references" / "sources.txt").write_text(
+                f"https://www.kaggle.com/datasets/user{i}/data{i}\n"
+            )
+            groups_by_name[name] = "main"
+
+        search_index = SearchIndex(base_path)
+
+        table = Table(title=f"Search index over {projects} projects")
+        table.add_column("step")
+        table.add_column("files read / results", justify="right")
+        table.add_column("ms", justify="right")
+
+        def timed(label: str, run: Callable[[], int]) -> None:
+            start = time.perf_counter()
+            files = run()
+            table.add_row(label, str(files), f"{(time.perf_counter() - start) * 1000:.1f}")
+
+        timed("first sync", lambda: search_index.sync(groups_by_name))
+        timed("sync, nothing changed", lambda: search_index.sync(groups_by_name))
+        with open(base_path / "main" / "project-0" / "README.md", "a") as f:
+            f.write(" appended")
+        timed("sync, one file changed", lambda: search_index.sync(groups_by_name))
+        timed("search 'word42'", lambda: len(search_index.search("word42")))
+        timed("search 'word42 word7'", lambda: len(search_index.search("word42 word7")))
+        timed("search 'user123'", lambda: len(search_index.search("user123")))
+
+        search_index.close()
+
+    console = Console()
+    console.print(table)
+
+
+@app.command(help="Benchmark csv_to_excel on a synthetic csv.")
+def bench_excel(
+    rows: Annotated[
+        int,
+        typer.Option(
+            "-n",
+            "--rows",
+            help="Rows in the synthetic csv.",
+        ),
+    ] = 200_000,
+) -> None:
+    """Converts a synthetic csv in a fresh interpreter,
+    reports the time and the peak memory (max RSS) of the conversion.
+    """
+
+    import resource
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "bench.csv"
+        with open(csv_path, "w") as f:
+            f.write("id,name,value,ratio,flag\n")
+            f.writelines(f"{i},name-{i % 1000},{i * 7 % 1013},{i / 3:.4f},{i % 2 == 0}\n" for i in range(rows))
+
+        start = time.perf_counter()
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                f"from pathlib import Path; from src.dpx.utils.util import csv_to_excel; csv_to_excel(Path({str(csv_path)!r}))",
+            ],
+            cwd=DPX_DIR,
+            check=True,
+        )
+        elapsed = time.perf_counter() - start
+
+        csv_mb = csv_path.stat().st_size / 1e6
+        xlsx_mb = sum(p.stat().st_size for p in Path(tmp).glob("*.xlsx")) / 1e6
+
+    # KiB on linux
+    max_rss_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+    print(f"{rows} rows, csv {csv_mb:.1f}MB -> xlsx {xlsx_mb:.1f}MB in {elapsed:.1f}s, peak memory {max_rss_mb:.0f}MB")
+
+
+@app.command(help="Benchmark writing and loading each dpromote format on a synthetic csv.")
+def bench_formats(
+    rows: Annotated[
+        int,
+        typer.Option(
+            "-n",
+            "--rows",
+            help="Rows in the synthetic csv.",
+        ),
+    ] = 100_000,
+) -> None:
+    """Converts a synthetic csv to each format, then loads it with pandas,
+    each in a fresh interpreter, as a notebook would.
+
+    Reports the time, file size and peak memory (max RSS) of loading.
+    The csv itself is loaded too, as a baseline.
+    """
+
+    from src.dpx.utils.util import csv_converters
+
+    loaders = {
+        "csv": "pd.read_csv(path)",
+        "xlsx": "pd.read_excel(path, sheet_name=None)",
+        "parquet": "pd.read_parquet(path)",
+        "feather": "pd.read_feather(path)",
+    }
+
+    def run(code: str) -> tuple[float, float]:
+        """Seconds and peak memory (MB) of code run in a fresh interpreter."""
+
+        start = time.perf_counter()
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                f"{code}\nimport resource; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)",
+            ],
+            cwd=DPX_DIR,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        elapsed = time.perf_counter() - start
+
+        # KiB on linux
+        return elapsed, int(result.stdout.split()[-1]) / 1024
+
+    table = Table("format", "write (s)", "size (MB)", "load (s)", "load peak memory (MB)")
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "bench.csv"
+        with open(csv_path, "w") as f:
+            f.write("id,name,value,ratio,flag\n")
+            f.writelines(f"{i},name-{i % 1000},{i * 7 % 1013},{i / 3:.4f},{i % 2 == 0}\n" for i in range(rows))
+
+        for output_format, loader in loaders.items():
+            path = csv_path.with_suffix(f".{output_format}")
+
+            write = "-"
+            if output_format in csv_converters:
+                write_seconds, _ = run(
+                    "from pathlib import Path; from src.dpx.utils.util import csv_converters; "
+                    f"csv_converters[{output_format!r}](Path({str(csv_path)!r}))"
+                )
+                write = f"{write_seconds:.2f}"
+
+            load_seconds, load_memory = run(f"import pandas as pd; path = {str(path)!r}; {loader}")
+
+            table.add_row(
+                output_format,
+                write,
+                f"{path.stat().st_size / 1e6:.1f}",
+                f"{load_seconds:.2f}",
+                f"{load_memory:.0f}",
+            )
+
+    print(f"{rows} rows, each run includes interpreter and pandas startup")
+    Console().print(table)
+
+
+@app.command(help="Benchmark copying a tree of small files, serial against threaded.")
+def bench_copy_tree(
+    files: Annotated[
+        int,
+        typer.Option(
+            "-n",
+            "--files",
+            help="Files in the synthetic tree.",
+        ),
+    ] = 100_000,
+    size: Annotated[
+        int,
+        typer.Option(
+            "-s",
+            "--size",
+            help="Bytes per file.",
+        ),
+    ] = 1024,
+    mode: Annotated[
+        str,
+        typer.Option(
+            "-m",
+            "--mode",
+            help="Copy mode, see dcp --mode.",
+        ),
+    ] = "auto",
+) -> None:
+    """Copies a synthetic tree with copy_tree,
+    with one thread then with a pool of threads.
+    Files are spread over folders of 1000, as in an unzipped Kaggle image dataset.
+    """
+
+    from src.dpx.utils.util import copy_tree
+
+    payload = os.urandom(size)
+    with projects_tmp_dir() as tmp:
+        src = Path(tmp) / "src"
+        for i in range(files):
+            folder = src / f"part-{i // 1000:03}"
+            if i % 1000 == 0:
+                folder.mkdir(parents=True)
+            (folder / f"{i}.bin").write_bytes(payload)
+
+        table = Table("workers", "seconds", "files/s", "copied")
+        for workers in [1, None]:
+            dst = Path(tmp) / f"dst-{workers}"
+            start = time.perf_counter()
+            how = copy_tree(src, dst, mode, workers)
+            elapsed = time.perf_counter() - start
+            table.add_row(
+                str(workers or "pool"),
+                f"{elapsed:.2f}",
+                f"{files / elapsed:.0f}",
+                ", ".join(f"{n} {way}" for way, n in how.items()),
+            )
+
+    print(f"{files} files of {size} bytes, {os.process_cpu_count()} CPU(s)")
+    Console().print(table)
+
+
+@app.command(help="Benchmark head and tail on a large synthetic csv.")
+def bench_head_tail(
+    megabytes: Annotated[
+        int,
+        typer.Option(
+            "-s",
+            "--size",
+            help="Size of the synthetic csv in MB.",
+        ),
+    ] = 1000,
+    number: Annotated[
+        int,
+        typer.Option(
+            "-n",
+            "--number",
+            help="Records read.",
+        ),
+    ] = 10,
+) -> None:
+    """Times head_records and tail_records, the reads behind dpx head and dpx tail,
+    on a csv with a quoted multi-line field in every 100th record.
+    """
+
+    from src.dpx.utils.records import head_records, tail_records
+
+    block = "".join(
+        f'{i},name-{i},"line one\nline two",{i / 7:.3f}\n' if i % 100 == 0 else f"{i},name-{i},plain,{i / 7:.3f}\n"
+        for i in range(10_000)
+    )
+
+    with projects_tmp_dir() as tmp:
+        csv_path = Path(tmp) / "bench.csv"
+        with open(csv_path, "w") as f:
+            f.write("id,name,text,value\n")
+            while f.tell() < megabytes * 1_000_000:
+                f.write(block)
+
+        table = Table("read", "median (ms)", "records")
+        for label, read in {
+            "head": lambda: head_records(csv_path, number + 1),
+            "tail": lambda: tail_records(csv_path, number)[0],
+        }.items():
+            times: list[float] = []
+            for _ in range(20):
+                start = time.perf_counter()
+                records = read()
+                times.append(time.perf_counter() - start)
+            table.add_row(label, f"{statistics.median(times) * 1000:.3f}", str(len(records)))
+
+        size_mb = csv_path.stat().st_size / 1e6
+
+    print(f"{size_mb:.0f}MB csv, page cache warm")
+    Console().print(table)
+
+
+@app.command(help="Benchmark reading a csv with and without its sniffed options.")
+def bench_sniff(
+    rows: Annotated[
+        int,
+        typer.Option(
+            "-r",
+            "--rows",
+            help="Rows in the synthetic csv.",
+        ),
+    ] = 1_000_000,
+) -> None:
+    """Times pandas.read_csv as it infers, and sniff.read_csv with the sidecar written,
+    on a csv of small integers and repeated labels, and compares the memory of both frames.
+    """
+
+    import pandas as pd
+
+    from src.dpx.utils.sniff import read_csv, sidecar_path, sniff
+
+    regions = ["north", "south", "east", "west"]
+    with projects_tmp_dir() as tmp:
+        csv_path = Path(tmp) / "bench.csv"
+        with open(csv_path, "w") as f:
+            f.write("store,region,units,price\n")
+            f.writelines(f"{i % 500},{regions[i % 4]},{i % 100},{i % 1000 / 10}\n" for i in range(rows))
+
+        start = time.perf_counter()
+        sniffed = sniff(csv_path)
+        sniff_seconds = time.perf_counter() - start
+
+        table = Table("read", "seconds", "memory (MB)")
+        for label, read in {"inferred": pd.read_csv, "sniffed": read_csv}.items():
+            start = time.perf_counter()
+            df = read(csv_path)
+            seconds = time.perf_counter() - start
+            table.add_row(label, f"{seconds:.2f}", f"{df.memory_usage(deep=True).sum() / 1e6:.1f}")
+
+        sidecar_written = sidecar_path(csv_path).exists()
+
+    print(f"{rows} rows, sniffed in {sniff_seconds * 1000:.0f}ms (sidecar written: {sidecar_written})")
+    print(f"dtypes: {sniffed['dtypes']}")
+    Console().print(table)
+
+
+@app.command(help="Benchmark loading a csv into SQLite, streamed and through pandas.")
+def bench_cdb(
+    megabytes: Annotated[
+        int,
+        typer.Option(
+            "-s",
+            "--size",
+            help="Size of the synthetic csv in MB.",
+        ),
+    ] = 200,
+) -> None:
+    """Times load_csv, the load behind dpx cdb, against pandas read_csv and to_sql,
+    each into a new database.
+    """
+
+    import sqlite3
+
+    import pandas as pd
+
+    from src.dpx.utils.db import connect, load_csv
+
+    block = "".join(f"{i},store-{i % 500},{i % 100},{i / 7:.3f},2024-01-{i % 28 + 1:02}\n" for i in range(10_000))
+
+    with projects_tmp_dir() as tmp:
+        csv_path = Path(tmp) / "bench.csv"
+        with open(csv_path, "w") as f:
+            f.write("row,store,units,price,day\n")
+            while f.tell() < megabytes * 1_000_000:
+                f.write(block)
+        size_mb = csv_path.stat().st_size / 1e6
+
+        def streamed() -> None:
+            connection = connect(Path(tmp) / "streamed.sqlite3")
+            load_csv(connection, csv_path, "bench", [])
+            connection.close()
+
+        def through_pandas() -> None:
+            connection = sqlite3.connect(Path(tmp) / "pandas.sqlite3")
+            pd.read_csv(csv_path).to_sql("bench", connection, index=False, chunksize=100_000)
+            connection.close()
+
+        table = Table("load", "seconds", "MB/s")
+        for label, load in {"streamed": streamed, "pandas": through_pandas}.items():
+            start = time.perf_counter()
+            load()
+            seconds = time.perf_counter() - start
+            table.add_row(label, f"{seconds:.2f}", f"{size_mb / seconds:.0f}")
+
+    print(f"{size_mb:.0f}MB csv, page cache warm")
+    Console().print(table)
+
+
+@app.command(help="Benchmark scaffolding a project, generated against copied from the template.")
+def bench_init(
+    repeat: Annotated[
+        int,
+        typer.Option(
+            "-r",
+            "--repeat",
+            help="Projects made each way.",
+        ),
+    ] = 5,
+) -> None:
+    """Makes projects in a fresh interpreter each, as dpx init does,
+    so the time includes importing nbformat and pandas where they are used.
+    The first copy builds the template if it is not built yet.
+    """
+
+    ways = {
+        "generated": "project.mkdir_data_folders(); project.mkdir_other_files(); project.add_final_excel_file()",
+        "template": "project.scaffold()",
+    }
+
+    table = Table(title=f"project scaffold (ms, {repeat} runs)")
+    table.add_column("way")
+    table.add_column("min", justify="right")
+    table.add_column("median", justify="right")
+
+    with projects_tmp_dir() as tmp:
+        for way, code in ways.items():
+            timings: list[float] = []
+            for i in range(repeat):
+                project_path = Path(tmp) / f"{way}-{i}"
+                project_path.mkdir()
+                script = (
+                    "from pathlib import Path; from src.dpx.cli.utils.util import Project; "
+                    f"project = Project(Path({str(project_path)!r})); {code}"
+                )
+                start = time.perf_counter()
+                subprocess.run([sys.executable, "-c", script], cwd=DPX_DIR, check=True)
+                timings.append((time.perf_counter() - start) * 1000)
+            table.add_row(way, f"{min(timings):.0f}", f"{statistics.median(timings):.0f}")
+
+    Console().print(table)
+
+
 @app.command()
 def test_function(name: Annotated[str, typer.Argument()]) -> None:
     print(f"hello {name}")
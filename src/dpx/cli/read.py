@@ -2,12 +2,15 @@
 
 ls
 dls
+dstats
 head
 tail
 begin
 open
 """
 
+import csv
+import io
 import os
 import sys
 import subprocess
@@ -15,17 +18,21 @@ from collections.abc import Callable
 from pathlib import Path
 from typing_extensions import Annotated
 
-import pandas as pd
 import typer
-from icecream import ic
-from pandas import DataFrame
 from rich import print
 from rich.console import Console
 from rich.table import Table
 
+from src.dpx.cli.utils.catalog import catalog_dirname, similarity, similarity_threshold, trigrams
+from src.dpx.cli.utils.completion import complete_data_file, complete_group, complete_project
+from src.dpx.cli.utils.search import SearchIndex
+from src.dpx.cli.utils.stats import profiled_suffixes
 from src.dpx.cli.utils.util import Project, ProjectManager
+from src.dpx.utils.compress import compression, data_suffix, logical_size
 from src.dpx.utils.paths import PROJECTS_DIR
-from src.dpx.utils.util import df_to_table
+from src.dpx.utils.records import head_records, tail_records
+from src.dpx.utils.sniff import load_sniffed
+from src.dpx.utils.util import df_to_table, format_size
 
 
 ide = "code"
@@ -40,6 +47,7 @@ def ls(
         list[str],
         typer.Argument(
             help="List projects in group(s).",
+            autocompletion=complete_group,
         ),
     ] = [current_main],
     playground: Annotated[
@@ -95,6 +103,8 @@ def ls(
         List all non-temp projects from groups: portfolio, main, and playground, respectively.
     """
 
+    import pandas as pd
+
     project_manager = ProjectManager()
 
     for group in groups:
@@ -122,7 +132,7 @@ def ls(
         )
         df = pd.concat([df, df_concat], axis=1)
 
-    df: DataFrame = df.fillna("")
+    df = df.fillna("")
 
     table: Table = df_to_table(df)
 
@@ -142,7 +152,7 @@ def gls(
     ] = False,
 ) -> None:
     # hotfix
-    exclude_files = [".git", ".gitignore", ".DS_Store", "README.md"]
+    exclude_files = [".git", ".gitignore", ".DS_Store", "README.md", catalog_dirname]
 
     project_manager = ProjectManager()
 
@@ -164,6 +174,7 @@ def dls(
         str,
         typer.Argument(
             help="The project name.",
+            autocompletion=complete_project,
         ),
     ],
     # playground: Annotated[
@@ -184,6 +195,14 @@ def dls(
     # ] = current_main,
     # ddir: Annotated[str, typer.Option()],
     # ddirs: Annotated[list[str], typer.Option()],
+    show_stats: Annotated[
+        bool,
+        typer.Option(
+            "-s",
+            "--stats",
+            help="Show the size, rows, columns and nulls of each file, see dstats.",
+        ),
+    ] = False,
 ) -> None:
     # if playground:
     #     group = "playground"
@@ -196,6 +215,11 @@ def dls(
     this_project_path = PROJECTS_DIR / group / name
     project = Project(this_project_path)
 
+    if show_stats:
+        console = Console()
+        console.print(data_stats_table(project))
+        return
+
     df = project.data_ls()
 
     for col in df.columns:
@@ -210,12 +234,162 @@ def dls(
     console.print(table)
 
 
+def file_size(path: Path) -> str:
+    """Size of a file, decompressed and on disk if it is compressed."""
+
+    size = path.stat().st_size
+    if compression(path) is None:
+        return format_size(size)
+    return f"{format_size(logical_size(path))} ({format_size(size)} on disk)"
+
+
+def data_stats_table(project: Project) -> Table:
+    """One row per data file, with its profile where it has one."""
+
+    data_path = project.this_project_path / "data"
+    data_stats = project.data_stats()
+
+    entries = [(folder, file) for folder, file in project.data_names() if (data_path / folder / file).is_file()]
+    profiled = [data_path / folder / file for folder, file in entries if data_suffix(file) in profiled_suffixes]
+    profiles = data_stats.profiles(profiled)
+    data_stats.save()
+
+    table = Table(title=f"{project.group}/{project.name}/data/")
+    table.add_column("folder")
+    table.add_column("file")
+    table.add_column("size", justify="right")
+    table.add_column("rows", justify="right")
+    table.add_column("columns", justify="right")
+    table.add_column("nulls", justify="right")
+
+    for folder, file in sorted(entries):
+        path = data_path / folder / file
+        profile = profiles.get(path)
+        size = file_size(path)
+
+        if profile is None or isinstance(profile, str):
+            table.add_row(f"{folder}/", file, size, "", "", "" if profile is None else "unreadable")
+            continue
+
+        rows = profile["rows"]
+        cells = rows * len(profile["columns"])
+        nulls = sum(column["nulls"] for column in profile["columns"])
+        table.add_row(
+            f"{folder}/",
+            file,
+            size,
+            f"{rows:,}",
+            str(len(profile["columns"])),
+            f"{nulls / cells:.1%}" if cells else "",
+        )
+
+    return table
+
+
+@app.command(help="Profile the data files of a project: rows, column types, nulls, min and max.")
+def dstats(
+    name: Annotated[
+        str,
+        typer.Argument(
+            help="The project name.",
+            autocompletion=complete_project,
+        ),
+    ],
+    files: Annotated[
+        list[str] | None,
+        typer.Argument(
+            help="Data files to profile, all by default.",
+            autocompletion=complete_data_file,
+        ),
+    ] = None,
+    jobs: Annotated[
+        int | None,
+        typer.Option(
+            "-j",
+            "--jobs",
+            help="Files profiled at once. Defaults to the number of CPUs.",
+        ),
+    ] = None,
+    force: Annotated[
+        bool,
+        typer.Option(
+            "-f",
+            "--force",
+            help="Profile again, ignoring cached profiles.",
+        ),
+    ] = False,
+) -> None:
+    """Examples:
+
+    dpx dstats smith-somedataset
+        Profile every .csv, .tsv, .xlsx, .parquet and .feather file of the project.
+
+    dpx dstats smith-somedataset train.csv
+        Profile one file.
+
+    Each file is read once, in chunks, and its profile is cached in data/.stats.json
+    until the file changes.
+    """
+
+    if jobs is not None and jobs < 1:
+        raise ValueError(f"'{jobs}' jobs, must be at least 1.")
+
+    project_manager = ProjectManager()
+
+    project_manager.verify_project(name)
+    group = project_manager.get_group_from_project(name)
+
+    project = Project(PROJECTS_DIR / group / name)
+    data_path = project.this_project_path / "data"
+
+    paths = project.profiled_files()
+    if files:
+        for file in files:
+            if not any(file in [path.name, path.relative_to(data_path).as_posix()] for path in paths):
+                raise ValueError(f"'{file}' is not a data file of '{name}' which can be profiled.")
+        paths = [path for path in paths if path.name in files or path.relative_to(data_path).as_posix() in files]
+
+    if not paths:
+        print(f"No data files to profile in '{name}'.")
+        return
+
+    data_stats = project.data_stats()
+    profiles = data_stats.profiles(paths, jobs, force)
+    data_stats.save()
+
+    console = Console()
+    for path, profile in profiles.items():
+        relative = path.relative_to(data_path).as_posix()
+        if isinstance(profile, str):
+            print(f"Could not profile '{relative}': {profile}")
+            continue
+
+        rows = profile["rows"]
+        table = Table(title=f"{relative}: {rows:,} rows, {file_size(path)}")
+        table.add_column("column")
+        table.add_column("type")
+        table.add_column("nulls", justify="right")
+        table.add_column("min")
+        table.add_column("max")
+        for column in profile["columns"]:
+            nulls = column["nulls"]
+            table.add_row(
+                column["name"],
+                column["type"],
+                f"{nulls:,} ({nulls / rows:.0%})" if rows else "0",
+                "" if column["min"] is None else str(column["min"]),
+                "" if column["max"] is None else str(column["max"]),
+            )
+        console.print(table)
+
+
 @app.command(help="Find the project path.")
 def where(
     name: Annotated[
         str,
         typer.Argument(
             help="The name of the project.",
+            autocompletion=complete_project,
         ),
     ],
 ) -> None:
@@ -226,12 +400,131 @@ def where(
         print(project_path)
 
 
+@app.command(help="Find projects and groups by approximate name.")
+def find(
+    query: Annotated[
+        str,
+        typer.Argument(
+            help="Part of, or a misspelling of, the name.",
+        ),
+    ],
+    number: Annotated[
+        int,
+        typer.Option(
+            "-n",
+            "--number",
+            help="Maximum number of projects shown.",
+        ),
+    ] = 10,
+) -> None:
+    """Examples:
+
+    dpx find somedata
+        Projects named like 'somedata', e.g. 'smith-somedataset', most similar first.
+
+    dpx find smtih -n 3
+        The three projects closest to 'smtih'.
+    """
+
+    project_manager = ProjectManager()
+
+    query_grams = trigrams(query)
+    groups: list[tuple[str, float]] = []
+    for group in project_manager.groups:
+        score = similarity(query_grams, trigrams(group))
+        if score >= similarity_threshold:
+            groups.append((group, score))
+    groups.sort(key=lambda match: -match[1])
+
+    matches = project_manager.catalog.similar(query, limit=number)
+
+    if not matches and not groups:
+        print(f"Nothing similar to '{query}'.")
+        return
+
+    if groups:
+        print("Groups:", ", ".join(f"'{group}'" for group, _ in groups))
+
+    if matches:
+        table = Table(title=f"Projects similar to '{query}'")
+        table.add_column("project")
+        table.add_column("group")
+        table.add_column("similarity", justify="right")
+        for name, group, score in matches:
+            table.add_row(name, group, f"{score:.2f}")
+
+        console = Console()
+        console.print(table)
+
+
+@app.command(help="Search the README, notes, sources and metadata of every project.")
+def search(
+    terms: Annotated[
+        list[str],
+        typer.Argument(
+            help="Words which must all appear in a project.",
+        ),
+    ],
+    number: Annotated[
+        int,
+        typer.Option(
+            "-n",
+            "--number",
+            help="Maximum number of projects shown.",
+        ),
+    ] = 10,
+    cached: Annotated[
+        bool,
+        typer.Option(
+            "-c",
+            "--cached",
+            help="Search the index as it is, without checking files for changes.",
+        ),
+    ] = False,
+) -> None:
+    """Examples:
+
+    dpx search bitcoin
+        Projects mentioning 'bitcoin', e.g. in their README or Kaggle metadata.
+
+    dpx search kaggle.com/datasets/smith
+        Projects whose sources include a dataset by 'smith'.
+
+    dpx search census -c
+        Skip the stat of every metadata file, for very large trees.
+    """
+
+    project_manager = ProjectManager()
+
+    search_index = SearchIndex(project_manager.base_path)
+    if not cached:
+        search_index.sync(project_manager.groups_by_name)
+    results = search_index.search(" ".join(terms), limit=number)
+    search_index.close()
+
+    if not results:
+        print(f"No project mentions {' '.join(repr(term) for term in terms)}.")
+        return
+
+    table = Table(title=f"Projects matching {' '.join(repr(term) for term in terms)}")
+    table.add_column("project")
+    table.add_column("group")
+    table.add_column("files")
+    table.add_column("score", justify="right")
+    for name, group, score, files in results:
+        table.add_row(name, group, ", ".join(files), f"{score:.2f}")
+
+    console = Console()
+    console.print(table)
+
+
 @app.command(help="View the sources of a project.")
 def sources(
     name: Annotated[
         str,
         typer.Argument(
             help="The name of the project.",
+            autocompletion=complete_project,
         ),
     ],
 ) -> None:
@@ -242,27 +535,243 @@ def sources(
     print(project.get_sources().rstrip())
 
 
-# @app.command()
-# def head(
-#     name: Annotated[str, typer.Argument()],
-#     playground: Annotated[bool, typer.Option()] = False,
-#     number: Annotated[int, typer.Option()] = 10,
-# ) -> None:
-#     pass
+# Delimiters of the files shown as tables by head and tail, others are shown as lines
+record_delimiters = {".csv": ",", ".tsv": "\t"}
 
 
-# @app.command()
-# def tail(
-#     name: Annotated[str, typer.Argument()],
-#     playground: Annotated[bool, typer.Option()] = False,
-#     number: Annotated[int, typer.Option()] = 10,
-# ) -> None:
-#     pass
+def record_options(path: Path) -> tuple[str | None, str, str]:
+    """Delimiter, quote and encoding of a file, from its sniffed sidecar if it has a fresh one.
+
+    The file is not sniffed here, head and tail stay a few page reads.
+    """
+
+    sniffed = load_sniffed(path)
+    if sniffed is not None:
+        return sniffed["delimiter"], sniffed["quotechar"], sniffed["encoding"]
+    return record_delimiters.get(data_suffix(path)), '"', "utf-8"
+
+
+def show_records(path: Path, header: str | None, records: list[str], raw: bool) -> None:
+    """Print records as a table under their header, or as they are in the file."""
+
+    delimiter, quotechar, _ = record_options(path)
+    console = Console()
+
+    if raw or delimiter is None:
+        for record in [header] * (header is not None) + records:
+            console.print(record, markup=False, highlight=False, soft_wrap=True)
+        return
+
+    def fields(record: str) -> list[str]:
+        return next(csv.reader(io.StringIO(record, newline=""), delimiter=delimiter, quotechar=quotechar), [])
+
+    table = Table(title=path.name)
+    for column in fields(header or ""):
+        table.add_column(column)
+    for record in records:
+        table.add_row(*fields(record))
+    console.print(table)
+
+
+@app.command(help="Show the first records of a data file.")
+def head(
+    name: Annotated[
+        str,
+        typer.Argument(
+            help="The project name.",
+            autocompletion=complete_project,
+        ),
+    ],
+    file: Annotated[
+        str,
+        typer.Argument(
+            help="The data file, 'x.csv' or 'raw/x.csv'.",
+            autocompletion=complete_data_file,
+        ),
+    ],
+    number: Annotated[
+        int,
+        typer.Option(
+            "-n",
+            "--number",
+            help="Number of records, after the header.",
+        ),
+    ] = 10,
+    raw: Annotated[
+        bool,
+        typer.Option(
+            "-r",
+            "--raw",
+            help="Print records as they are in the file instead of a table.",
+        ),
+    ] = False,
+) -> None:
+    """Examples:
+
+    dpx head smith-somedataset train.csv
+        The header and first 10 records of train.csv.
+
+    Only the start of the file is read, whatever its size.
+    A newline inside a quoted field of a .csv or .tsv does not end a record.
+    """
+
+    project_manager = ProjectManager()
+    project_manager.verify_project(name)
+
+    project = Project(project_manager.get_project_path(name))
+    path = project.data_file(file)
+
+    delimiter, _, encoding = record_options(path)
+    quoted = delimiter is not None
+    records = head_records(path, number + 1, quoted, encoding)
+    show_records(path, records[0] if records else None, records[1:], raw)
+
+
+@app.command(help="Show the last records of a data file.")
+def tail(
+    name: Annotated[
+        str,
+        typer.Argument(
+            help="The project name.",
+            autocompletion=complete_project,
+        ),
+    ],
+    file: Annotated[
+        str,
+        typer.Argument(
+            help="The data file, 'x.csv' or 'raw/x.csv'.",
+            autocompletion=complete_data_file,
+        ),
+    ],
+    number: Annotated[
+        int,
+        typer.Option(
+            "-n",
+            "--number",
+            help="Number of records.",
+        ),
+    ] = 10,
+    raw: Annotated[
+        bool,
+        typer.Option(
+            "-r",
+            "--raw",
+            help="Print records as they are in the file instead of a table.",
+        ),
+    ] = False,
+) -> None:
+    """Examples:
+
+    dpx tail smith-somedataset train.csv -n 5
+        The header and last 5 records of train.csv.
+
+    The file is searched backward from its end, only its last pages are read.
+    A compressed file is decompressed from its start, it cannot be read backward.
+    A newline inside a quoted field of a .csv or .tsv does not end a record.
+    """
+
+    project_manager = ProjectManager()
+    project_manager.verify_project(name)
+
+    project = Project(project_manager.get_project_path(name))
+    path = project.data_file(file)
+
+    delimiter, _, encoding = record_options(path)
+    quoted = delimiter is not None
+    records, from_start = tail_records(path, number, quoted, encoding)
+
+    # The header is the first record of the file
+    header = None
+    if quoted:
+        if from_start:
+            header, records = (records[0], records[1:]) if records else (None, records)
+        else:
+            header = next(iter(head_records(path, 1, encoding=encoding)), None)
+    show_records(path, header, records, raw)
+
+
+@app.command(help="Run SQL over the data files of a project.")
+def query(
+    name: Annotated[
+        str,
+        typer.Argument(
+            help="The project name.",
+            autocompletion=complete_project,
+        ),
+    ],
+    sql: Annotated[
+        str,
+        typer.Argument(
+            help="The SQL query, a data file is a table named after it, 'x-copy.csv' is 'x_copy'.",
+        ),
+    ],
+    number: Annotated[
+        int,
+        typer.Option(
+            "-n",
+            "--number",
+            help="Number of rows shown.",
+        ),
+    ] = 20,
+    dbn: Annotated[
+        str | None,
+        typer.Option(
+            "--dbn",
+            help="Name of the database in data/db, the project name by default.",
+        ),
+    ] = None,
+) -> None:
+    """Examples:
+
+    dpx query smith-somedataset "SELECT region, COUNT(*) FROM train WHERE amount > 10 GROUP BY region"
+        Count the rows of data/raw/train.csv by region.
+
+    The .csv, .tsv, .parquet and .feather files of raw, interim and processed are tables.
+    A file the query reads is read for this query only, with only the columns it names,
+    and .parquet and .feather files with the filters of its WHERE, nothing is written.
+    A table loaded by cdb into the project database, and current, is read from there.
+    Only the rows shown are fetched.
+    """
+
+    import sqlite3
+
+    from src.dpx.utils.db import fetch
+
+    project_manager = ProjectManager()
+    project_manager.verify_project(name)
+
+    project = Project(project_manager.get_project_path(name))
+    data_path = project.this_project_path / "data"
+
+    connection, read = project.query_connection(sql, dbn)
+    try:
+        for path, (table, count) in read.items():
+            if isinstance(count, str):
+                print(f"Could not read '{path.relative_to(data_path)}': {count}")
+            else:
+                print(f"'{path.relative_to(data_path)}' read as table '{table}' ({count} rows)")
+
+        columns, rows, more = fetch(connection, sql, number)
+    except sqlite3.Error as e:
+        print(f"Query failed: {e}")
+        raise typer.Exit(code=1)
+    finally:
+        connection.close()
+
+    if not columns:
+        return
+
+    import pandas as pd
+
+    # object keeps integers and NULLs as SQLite gives them
+    Console().print(df_to_table(pd.DataFrame(rows, columns=columns, dtype=object)))
+    if more:
+        print(f"First {number} rows shown, use -n to show more.")
 
 
 @app.command()
 def begin(
-    name: Annotated[str, typer.Argument()],
+    name: Annotated[str, typer.Argument(autocompletion=complete_project)],
     # playground: Annotated[
     #     bool,
     #     typer.Option(
@@ -6,6 +6,7 @@ uds
 promote
 demote
 mv
+compress
 """
 
 import os
@@ -14,9 +15,9 @@ from typing_extensions import Annotated
 from pathlib import Path
 
 import typer
-from icecream import ic
 from rich import print
 
+from src.dpx.cli.utils.completion import complete_group, complete_project, name_index
 from src.dpx.cli.utils.util import Project, ProjectManager
 from src.dpx.utils.paths import PROJECTS_DIR
 from src.dpx.utils.util import find_dirs_with_name
@@ -29,7 +30,7 @@ current_main = "main"
 def unlock(
     names: Annotated[
         list[str] | None,
-        typer.Argument(help="The name of the project you want to unlock."),
+        typer.Argument(help="The name of the project you want to unlock.", autocompletion=complete_project),
     ] = None,
     # playground: Annotated[
     #     bool,
@@ -70,7 +71,7 @@ def unlock(
 def lock(
     names: Annotated[
         list[str] | None,
-        typer.Argument(help="The name of the project you want to lock."),
+        typer.Argument(help="The name of the project you want to lock.", autocompletion=complete_project),
     ] = None,
     # playground: Annotated[
     #     bool,
@@ -128,6 +129,7 @@ def islocked(
         str,
         typer.Argument(
             help="The name of the project.",
+            autocompletion=complete_project,
         ),
     ],
 ) -> None:
@@ -145,6 +147,7 @@ def rename(
         list[str],
         typer.Argument(
             help="From name to new name",
+            autocompletion=complete_project,
         ),
     ],
     playground: Annotated[
@@ -161,6 +164,7 @@ def rename(
             "-g",
             "--group",
             help="Rename a project in group.",
+            autocompletion=complete_group,
         ),
     ] = current_main,
 ) -> None:
@@ -197,6 +201,13 @@ def rename(
             os.rename(old_dir_name, new_dir_name)
         except Exception as e:
             print(e)
+        else:
+            if dir == this_old_project_path:
+                project_manager.unregister_project(old_name)
+                project_manager.register_project(new_dir_name)
+                name_index.write_data({old_name: None, new_name: Project(new_dir_name).data_names()})
+
+    project_manager.save_name_index()
 
 
 @app.command()
@@ -213,6 +224,7 @@ def add_sources(
             "-n",
             "--name",
             help="The name of the project.",
+            autocompletion=complete_project,
         ),
     ],
 ) -> None:
@@ -263,6 +275,7 @@ def mv(
         list[str],
         typer.Argument(
             help="The name of the project(s).",
+            autocompletion=complete_project,
         ),
     ],
     to_group: Annotated[
@@ -270,6 +283,7 @@ def mv(
         typer.Option(
             "-to",
             help="Move the file to this group.",
+            autocompletion=complete_group,
         ),
     ],
     # playground: Annotated[
@@ -313,9 +327,13 @@ def mv(
         src = PROJECTS_DIR / group / name
         dst = PROJECTS_DIR / to_group / name
         shutil.move(src, dst)
+        project_manager.register_project(dst)
 
         moved_projects.append(name)
 
+    if moved_projects:
+        project_manager.save_name_index()
+
     if moved_projects:
         print("Moved projects:", end=" ")
         for moved_project in moved_projects:
@@ -335,3 +353,98 @@ def mv(
         print("before moving.")
 
     pass
+
+
+@app.command(help="Compress the raw csv and text files of project(s), read as before.")
+def compress(
+    names: Annotated[
+        list[str] | None,
+        typer.Argument(
+            help="The name of the project(s).",
+            autocompletion=complete_project,
+        ),
+    ] = None,
+    method: Annotated[
+        str | None,
+        typer.Option(
+            "-m",
+            "--method",
+            help="zstd or gzip, zstd if zstandard is installed, else gzip.",
+        ),
+    ] = None,
+    level: Annotated[
+        int | None,
+        typer.Option(
+            "--level",
+            help="Compression level, by default zstd 3 or gzip 6.",
+        ),
+    ] = None,
+    auto: Annotated[
+        bool,
+        typer.Option(
+            "--auto",
+            help="Only cold files: 1 MiB or more, not read or modified for 30 days.",
+        ),
+    ] = False,
+    compress_all: Annotated[
+        bool,
+        typer.Option(
+            "-a",
+            "--all",
+            help="Compress the raw files of all projects in all groups.",
+        ),
+    ] = False,
+) -> None:
+    """Examples:
+
+    dpx compress smith-somedataset
+        data/raw/train.csv becomes data/raw/train.csv.zst.
+
+    dpx compress --all --auto
+        Compress the cold raw files of every project.
+
+    Compressed files are decompressed as they are read, by dcp, dstats, head, tail, cdb and query.
+    dcp writes the copy in interim decompressed, 'train-copy.csv'.
+    """
+
+    from src.dpx.utils.compress import default_method
+    from src.dpx.utils.util import format_size
+
+    project_manager = ProjectManager()
+
+    if compress_all:
+        paths = project_manager.list_projects_paths(project_manager.groups)
+    elif names:
+        for name in names:
+            project_manager.verify_project(name)
+        paths = [project_manager.get_project_path(name) for name in names]
+    else:
+        raise ValueError("Requires at least one project.")
+
+    method = method or default_method()
+
+    locked_projects: list[str] = []
+    before = after = 0
+    for path in paths:
+        project = Project(path)
+        if project.is_locked():
+            locked_projects.append(project.name)
+            continue
+
+        for compressed_path, size, compressed_size in project.data_compress(method, level, auto):
+            print(
+                f"Compressed '{project.name}/{compressed_path.relative_to(path).as_posix()}':"
+                f" {format_size(size)} to {format_size(compressed_size)}."
+            )
+            before, after = before + size, after + compressed_size
+
+    if before:
+        print(f"{format_size(before - after)} freed.")
+    elif not locked_projects:
+        print("Nothing to compress.")
+
+    if locked_projects:
+        print("Must unlock:", end=" ")
+        for locked_project in locked_projects:
+            print(f"'{locked_project}'", end=", ")
+        print("before compressing.")
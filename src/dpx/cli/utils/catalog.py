@@ -0,0 +1,212 @@
+"""Persistent catalog of projects.
+
+dp-projects/
+    .dpx/
+        catalog.sqlite3     <- catalog
+    main/
+        some_project/
+    ...
+
+The catalog maps a project name to its group and mtime.
+
+A group is only rescanned when the mtime of its folder changed since it was
+last scanned. Creating, moving, renaming or deleting a project changes the
+mtime of its group, so one stat per group validates the catalog.
+
+Lock state is not cataloged, locking a project does not change the mtime
+of its group. The .locked file of the project is the only record of it.
+
+A group scanned within racy_seconds of its last change is rescanned next time
+(see settled_mtime_ns), filesystems with coarse mtimes could hide a second change in the same tick.
+
+Project names are also indexed by trigram, for fuzzy lookups (dpx find)
+and for suggestions when a name is mistyped.
+"""
+
+import math
+import os
+import re
+import sqlite3
+from collections import Counter
+from pathlib import Path
+
+from src.dpx.utils.paths import DPX_STATE_DIR
+from src.dpx.utils.util import settled_mtime_ns
+
+# Within the base path, as DPX_STATE_DIR is within PROJECTS_DIR
+catalog_dirname = DPX_STATE_DIR.name
+catalog_filename = "catalog.sqlite3"
+
+# Bump to rebuild catalogs written by an older dpx
+schema_version = 3
+
+# Minimum trigram similarity of a fuzzy match
+similarity_threshold = 0.3
+# Looser for 'did you mean' suggestions, a swapped pair of letters changes several trigrams
+suggestion_threshold = 0.2
+
+# (name, group, mtime_ns)
+type CatalogRow = tuple[str, str, int]
+
+schema = """
+CREATE TABLE IF NOT EXISTS groups (
+    name TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS projects (
+    name TEXT NOT NULL,
+    grp TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    PRIMARY KEY (grp, name)
+);
+CREATE INDEX IF NOT EXISTS projects_name ON projects (name);
+CREATE TABLE IF NOT EXISTS trigrams (
+    gram TEXT NOT NULL,
+    grp TEXT NOT NULL,
+    entries TEXT NOT NULL,
+    PRIMARY KEY (gram, grp)
+);
+"""
+
+
+def trigrams(text: str) -> set[str]:
+    """Trigrams of the words in text, lowercased and padded as in pg_trgm.
+
+    'ab-c' -> {'  a', ' ab', 'ab ', '  c', ' c '}
+    """
+
+    grams: set[str] = set()
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(grams: set[str], other: set[str]) -> float:
+    """Share of trigrams in common."""
+
+    if not grams or not other:
+        return 0.0
+    shared = len(grams & other)
+    return shared / (len(grams) + len(other) - shared)
+
+
+class ProjectCatalog:
+    """On-disk index of the projects in every group."""
+
+    def __init__(self, base_path: Path) -> None:
+        self.base_path: Path = base_path
+        self.catalog_path: Path = base_path / catalog_dirname / catalog_filename
+        self.connection: sqlite3.Connection = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the catalog, in memory if it cannot be written to disk."""
+
+        try:
+            self.catalog_path.parent.mkdir(exist_ok=True)
+            connection = sqlite3.connect(self.catalog_path)
+            version: int = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != schema_version:
+                connection.executescript(
+                    "DROP TABLE IF EXISTS groups; DROP TABLE IF EXISTS projects; DROP TABLE IF EXISTS trigrams;"
+                )
+                connection.execute(f"PRAGMA user_version = {schema_version}")
+            connection.executescript(schema)
+        except (OSError, sqlite3.Error):
+            connection = sqlite3.connect(":memory:")
+            connection.executescript(schema)
+
+        return connection
+
+    def stale_groups(self, groups: list[str]) -> dict[str, int]:
+        """Groups whose folder changed since they were scanned.
+
+        Returns the current mtime of each stale group.
+        """
+
+        scanned: dict[str, int] = dict(self.connection.execute("SELECT name, mtime_ns FROM groups"))
+
+        stale: dict[str, int] = {}
+        for group in groups:
+            mtime_ns = os.stat(self.base_path / group).st_mtime_ns
+            if scanned.get(group) != mtime_ns:
+                stale[group] = mtime_ns
+
+        return stale
+
+    def replace_group(self, group: str, mtime_ns: int, rows: list[CatalogRow]) -> None:
+        """Replace all projects of a group with a fresh scan."""
+
+        mtime_ns = settled_mtime_ns(mtime_ns)
+
+        # gram -> "name\ttrigram count" of the projects containing it, one row per gram and group
+        postings: dict[str, list[str]] = {}
+        for name, *_ in rows:
+            grams = trigrams(name)
+            for gram in grams:
+                postings.setdefault(gram, []).append(f"{name}\t{len(grams)}")
+        trigram_rows = [(gram, group, "\n".join(entries)) for gram, entries in postings.items()]
+
+        with self.connection:
+            self.connection.execute("DELETE FROM projects WHERE grp = ?", (group,))
+            self.connection.execute("DELETE FROM trigrams WHERE grp = ?", (group,))
+            self.connection.executemany("INSERT OR REPLACE INTO projects VALUES (?, ?, ?)", rows)
+            self.connection.executemany("INSERT INTO trigrams VALUES (?, ?, ?)", trigram_rows)
+            self.connection.execute("INSERT OR REPLACE INTO groups VALUES (?, ?)", (group, mtime_ns))
+
+    def retain_groups(self, groups: list[str]) -> None:
+        """Forget groups that no longer exist."""
+
+        placeholders = ", ".join("?" for _ in groups)
+        with self.connection:
+            self.connection.execute(f"DELETE FROM projects WHERE grp NOT IN ({placeholders})", groups)
+            self.connection.execute(f"DELETE FROM trigrams WHERE grp NOT IN ({placeholders})", groups)
+            self.connection.execute(f"DELETE FROM groups WHERE name NOT IN ({placeholders})", groups)
+
+    def projects_in(self, group: str) -> list[str]:
+        """Names of the projects in a group."""
+
+        cursor = self.connection.execute("SELECT name FROM projects WHERE grp = ? ORDER BY name", (group,))
+        return [name for (name,) in cursor]
+
+    def similar(
+        self,
+        query: str,
+        limit: int = 10,
+        threshold: float = similarity_threshold,
+    ) -> list[tuple[str, str, float]]:
+        """Projects whose name is similar to query, most similar first.
+
+        Returns (name, group, similarity).
+        """
+
+        grams = trigrams(query)
+        if not grams:
+            return []
+
+        # similarity >= threshold needs at least this many shared trigrams
+        min_shared = max(1, math.ceil(threshold * len(grams) / (1 + threshold)))
+
+        # Count the query trigrams each project shares
+        shared_by_group: dict[str, Counter[str]] = {}
+        placeholders = ", ".join("?" for _ in grams)
+        cursor = self.connection.execute(f"SELECT grp, entries FROM trigrams WHERE gram IN ({placeholders})", [*grams])
+        for group, entries in cursor:
+            shared_by_group.setdefault(group, Counter()).update(entries.split("\n"))
+
+        matches: list[tuple[str, str, float]] = []
+        for group, shared_by_entry in shared_by_group.items():
+            for entry, shared in shared_by_entry.items():
+                if shared < min_shared:
+                    continue
+
+                name, total = entry.split("\t")
+                score = shared / (len(grams) + int(total) - shared)
+                if score >= threshold:
+                    matches.append((name, group, score))
+
+        matches.sort(key=lambda match: (-match[2], match[0], match[1]))
+        return matches[:limit]
+
+    def close(self) -> None:
+        self.connection.close()
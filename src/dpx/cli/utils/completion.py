@@ -0,0 +1,206 @@
+"""Shell completion from a precomputed name index.
+
+dp-projects/
+    .dpx/
+        names/
+            groups      <- one group per line
+            projects    <- "name\tgroup" per line, sorted
+            data        <- "project\tfolder\tfile" per line, sorted
+
+Completing a project name must not build a ProjectManager (which validates
+the catalog), so the files are kept sorted and searched by bisection,
+a lookup reads a few pages of the file whatever the number of projects.
+
+The index is rewritten by ProjectManager whenever it rescans a group,
+and by the commands which create, move, rename or delete projects and data.
+A project with no entry in the data index has its data folders listed directly.
+
+Nothing beyond the stdlib and typer is imported, completion runs on every tab press.
+"""
+
+import mmap
+import os
+from pathlib import Path
+
+import typer
+
+from src.dpx.utils.paths import NAMES_INDEX_DIR, PROJECTS_DIR
+
+groups_filename = "groups"
+projects_filename = "projects"
+data_filename = "data"
+
+max_candidates = 200
+
+
+def search_prefix(path: Path, prefix: str, limit: int = max_candidates) -> list[str]:
+    """Lines of a sorted file which start with prefix."""
+
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                return search_lines(m, prefix.encode(), limit)
+    except FileNotFoundError:
+        return []
+
+
+def search_lines(m: mmap.mmap, key: bytes, limit: int) -> list[str]:
+    """Bisect the lines of a sorted mmap for those starting with key."""
+
+    size = len(m)
+
+    # First line >= key, lo and hi are always line starts
+    lo, hi = 0, size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = m.rfind(b"\n", 0, mid) + 1
+        end = m.find(b"\n", start)
+        if end == -1:
+            end = size
+        if m[start:end] < key:
+            lo = end + 1
+        else:
+            hi = start
+
+    lines: list[str] = []
+    while lo < size and len(lines) < limit:
+        end = m.find(b"\n", lo)
+        if end == -1:
+            end = size
+        line = m[lo:end]
+        if not line.startswith(key):
+            break
+        lines.append(line.decode())
+        lo = end + 1
+
+    return lines
+
+
+def write_lines(path: Path, lines: list[str]) -> None:
+    """Atomically replace an index file."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+        f.write("\n".join(lines))
+    os.replace(tmp_path, path)
+
+
+class NameIndex:
+    """Sorted files of group, project and data file names."""
+
+    def __init__(self, index_dir: Path, base_path: Path) -> None:
+        self.index_dir: Path = index_dir
+        self.base_path: Path = base_path
+
+        self.groups_path: Path = index_dir / groups_filename
+        self.projects_path: Path = index_dir / projects_filename
+        self.data_path: Path = index_dir / data_filename
+
+    def groups(self) -> list[str]:
+        try:
+            return self.groups_path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            return []
+
+    def write_projects(self, groups: list[str], groups_by_name: dict[str, str]) -> None:
+        """Replace the group and project names."""
+
+        write_lines(self.projects_path, sorted(f"{name}\t{group}" for name, group in groups_by_name.items()))
+        # Groups keep their order
+        write_lines(self.groups_path, groups)
+
+    def write_data(self, entries_by_project: dict[str, list[tuple[str, str]] | None]) -> None:
+        """Replace the data files of some projects, None forgets a project.
+
+        entries: (folder, file)
+        """
+
+        try:
+            lines = self.data_path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            lines = []
+
+        lines = [line for line in lines if line.split("\t", 1)[0] not in entries_by_project]
+        for project, entries in entries_by_project.items():
+            if entries is None:
+                continue
+
+            # The empty entry marks the project as indexed
+            lines.append(f"{project}\t\t")
+            lines += [f"{project}\t{folder}\t{file}" for folder, file in entries]
+
+        write_lines(self.data_path, sorted(lines))
+
+    def complete_groups(self, incomplete: str) -> list[str]:
+        return [group for group in self.groups() if group.startswith(incomplete)]
+
+    def complete_projects(self, incomplete: str) -> list[str]:
+        names: list[str] = []
+        for line in search_prefix(self.projects_path, incomplete):
+            name, _ = line.split("\t", 1)
+            names.append(name)
+        return names
+
+    def group_of(self, project: str) -> str | None:
+        lines = search_prefix(self.projects_path, f"{project}\t", limit=1)
+        if not lines:
+            return None
+        return lines[0].split("\t", 1)[1]
+
+    def complete_data_files(self, project: str, incomplete: str) -> list[tuple[str, str]]:
+        """(file, folder) of the data files of a project starting with incomplete."""
+
+        lines = search_prefix(self.data_path, f"{project}\t")
+        if lines:
+            entries = [line.split("\t", 2)[1:] for line in lines]
+        else:
+            entries = self.scan_data_files(project)
+
+        return [(file, folder) for folder, file in entries if file and file.startswith(incomplete)]
+
+    def scan_data_files(self, project: str) -> list[tuple[str, str]]:
+        """(folder, file) read from the project, when it is not in the data index."""
+
+        group = self.group_of(project)
+        if group is None:
+            return []
+
+        entries: list[tuple[str, str]] = []
+        try:
+            with os.scandir(self.base_path / group / project / "data") as folders:
+                for folder in folders:
+                    if not folder.is_dir():
+                        continue
+                    with os.scandir(folder.path) as files:
+                        entries += [(folder.name, file.name) for file in files if not file.name.startswith(".")]
+        except OSError:
+            return []
+
+        return entries
+
+
+name_index = NameIndex(NAMES_INDEX_DIR, PROJECTS_DIR)
+
+
+# Typer autocompletion callbacks
+
+
+def complete_group(incomplete: str) -> list[str]:
+    return name_index.complete_groups(incomplete)
+
+
+def complete_project(incomplete: str) -> list[str]:
+    return name_index.complete_projects(incomplete)
+
+
+def complete_data_file(ctx: typer.Context, incomplete: str) -> list[tuple[str, str]]:
+    """Data files of the project given in the 'name' parameter."""
+
+    project = ctx.params.get("name")
+    if not project:
+        return []
+    return name_index.complete_data_files(project, incomplete)
@@ -0,0 +1,55 @@
+"""Per-invocation context.
+
+Holds one ProjectManager and the projects resolved during a dpx invocation.
+Commands which call other commands pass their typer.Context along,
+e.g. init -> dl, dpromote -> dcp, so the tree is scanned once.
+
+In a command:
+    invocation = ctx.ensure_object(Invocation)
+    project = invocation.project(name)
+"""
+
+from functools import cached_property
+
+from src.dpx.cli.utils.util import Project, ProjectManager
+
+
+class Invocation:
+    """State shared by the commands of one dpx invocation."""
+
+    def __init__(self) -> None:
+        self.projects: dict[str, Project] = {}
+        self.verified_groups: set[str] = set()
+
+    @cached_property
+    def project_manager(self) -> ProjectManager:
+        return ProjectManager()
+
+    def verify_group(self, group: str) -> None:
+        """Raises an error if the input is not a valid group, checked once per invocation."""
+
+        if group not in self.verified_groups:
+            self.project_manager.verify_group(group)
+            self.verified_groups.add(group)
+
+    def project(self, name: str, group: str | None = None) -> Project:
+        """The project with this name, verified and resolved once per invocation.
+
+        Project names are unique across groups, group, if given, is checked.
+        """
+
+        if name not in self.projects:
+            self.project_manager.verify_project(name)
+            self.projects[name] = Project(self.project_manager.get_project_path(name))
+
+        project = self.projects[name]
+        if group is not None and project.group != group:
+            self.verify_group(group)
+            raise ValueError(f"'{name}' is not in '{group}', it is in '{project.group}'.")
+        return project
+
+    def add_project(self, project: Project) -> None:
+        """Record a project created in this invocation."""
+
+        self.project_manager.register_project(project.this_project_path)
+        self.projects[project.name] = project
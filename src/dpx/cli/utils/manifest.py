@@ -0,0 +1,157 @@
+"""Manifest of the data files a project derived, so re-runs redo only what changed.
+
+some_project/
+    data/
+        .manifest.json      <- manifest
+        raw/
+            x.csv           <- input
+        interim/
+            x-copy.csv      <- output of x.csv, kind 'copy'
+            x-copy.parquet  <- output of x-copy.csv, kind 'parquet'
+
+For each input and kind of work (copy, xlsx, parquet, ...) the manifest records
+the hash of the input and the outputs made from it.
+The work is current while the input hash is unchanged and its outputs exist.
+Outputs edited since are left alone.
+
+Hashes are cached by size and mtime, an input whose stat did not change is not
+read again. A file hashed within racy_seconds of its last change is hashed again
+next time, as in the catalog.
+
+A folder is fingerprinted by the path, size and mtime of each of its files,
+hashing every file of a large dataset on each run would cost more than copying it.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from src.dpx.utils.util import settled_mtime_ns
+
+manifest_filename = ".manifest.json"
+
+# Bump to drop manifests written by an older dpx
+manifest_version = 1
+
+# Hardware accelerated on most CPUs
+hash_name = "sha256"
+
+
+def hash_file(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, hash_name).hexdigest()
+
+
+def hash_tree(path: Path) -> str:
+    """Hash of the path, size and mtime of every file in a folder."""
+
+    digest = hashlib.new(hash_name)
+    root = str(path)
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            file_path = os.path.join(dirpath, name)
+            stat = os.lstat(file_path)
+            digest.update(f"{file_path[len(root) :]}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+class DataManifest:
+    """Input hashes and derived outputs of the data folder of a project.
+
+    Paths are relative to the data folder, 'raw/x.csv'.
+    """
+
+    def __init__(self, data_path: Path) -> None:
+        self.data_path: Path = data_path
+        self.manifest_path: Path = data_path / manifest_filename
+
+        # path: [size, mtime_ns, hash]
+        self.files: dict[str, list] = {}
+        # input path: {kind: {"input": hash, "outputs": [path, ...]}}
+        self.derived: dict[str, dict[str, dict]] = {}
+        self.changed = False
+
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+
+        if not isinstance(manifest, dict) or manifest.get("version") != manifest_version:
+            return
+
+        self.files = manifest.get("files", {})
+        self.derived = manifest.get("derived", {})
+
+    def relative(self, path: Path) -> str:
+        return path.relative_to(self.data_path).as_posix()
+
+    def fingerprint(self, path: Path) -> str | None:
+        """Hash of a file or folder, None if it does not exist.
+
+        A file whose size and mtime are unchanged is not read.
+        """
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        if path.is_dir():
+            return hash_tree(path)
+
+        key = self.relative(path)
+        cached = self.files.get(key)
+        if cached is not None and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return cached[2]
+
+        digest = hash_file(path)
+
+        mtime_ns = settled_mtime_ns(stat.st_mtime_ns)
+
+        self.files[key] = [stat.st_size, mtime_ns, digest]
+        self.changed = True
+        return digest
+
+    def is_current(self, input_path: Path, kind: str) -> bool | None:
+        """Whether the outputs of input_path for kind are up to date.
+
+        None when the manifest has no record of them, e.g. made before the manifest.
+        """
+
+        record = self.derived.get(self.relative(input_path), {}).get(kind)
+        if record is None:
+            return None
+
+        if self.fingerprint(input_path) != record["input"]:
+            return False
+
+        return all((self.data_path / output).exists() for output in record["outputs"])
+
+    def record(self, input_path: Path, kind: str, outputs: list[Path]) -> None:
+        """Record the outputs made from the current input_path."""
+
+        self.derived.setdefault(self.relative(input_path), {})[kind] = {
+            "input": self.fingerprint(input_path),
+            "outputs": [self.relative(output) for output in outputs],
+        }
+        self.changed = True
+
+    def save(self) -> None:
+        """Write the manifest if it changed, dropping files which no longer exist."""
+
+        if not self.changed:
+            return
+
+        self.files = {path: cached for path, cached in self.files.items() if (self.data_path / path).exists()}
+        self.derived = {path: kinds for path, kinds in self.derived.items() if (self.data_path / path).exists()}
+
+        manifest = {"version": manifest_version, "files": self.files, "derived": self.derived}
+        tmp_path = self.manifest_path.with_name(f"{manifest_filename}.tmp")
+        tmp_path.write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+        os.replace(tmp_path, self.manifest_path)
+        self.changed = False
@@ -0,0 +1,139 @@
+"""Lazy command registry.
+
+The modules behind each command (create, read, update, delete, dev) pull in
+pandas, nbformat, requests, ... when imported.
+Commands are registered here by name only, and their module is imported
+when the command is dispatched.
+
+'dpx --help' is served from the precomputed table below without importing any
+command module.
+
+Keep the table in sync with the commands:
+    dpx dev check-commands
+"""
+
+import importlib
+from functools import cache
+
+import typer
+from typer.core import TyperCommand, TyperGroup
+
+create_module = "src.dpx.cli.create"
+read_module = "src.dpx.cli.read"
+update_module = "src.dpx.cli.update"
+delete_module = "src.dpx.cli.delete"
+dev_module = "src.dpx.cli.dev"
+daemon_module = "src.dpx.cli.daemon"
+
+# Precomputed command table
+# name: (module, short help)
+# Ordered as shown in 'dpx --help'
+lazy_commands: dict[str, tuple[str, str]] = {
+    "gadd": (create_module, "Create a new group."),
+    "dl": (create_module, "Download a dataset to an existing project."),
+    "dcp": (create_module, "Copies all data in raw to interim in a project."),
+    "dpromote": (create_module, "Copies and converts all csv files in raw to interim."),
+    "dstore": (create_module, "Add the raw files of a project to the store shared by projects."),
+    "cdb": (create_module, "Load the csv files in raw and interim into a SQLite database in data/db."),
+    "init": (create_module, "Initialise a project workspace in an existing project group."),
+    "ls": (read_module, "List project(s) in group(s)."),
+    "gls": (read_module, "List groups."),
+    "dls": (read_module, "List data files in a project."),
+    "dstats": (read_module, "Profile the data files of a project: rows, column types, nulls, min and max."),
+    "head": (read_module, "Show the first records of a data file."),
+    "tail": (read_module, "Show the last records of a data file."),
+    "query": (read_module, "Run SQL over the data files of a project."),
+    "where": (read_module, "Find the project path."),
+    "find": (read_module, "Find projects and groups by approximate name."),
+    "search": (read_module, "Search the README, notes, sources and metadata of every project."),
+    "sources": (read_module, "View the sources of a project."),
+    "begin": (read_module, "Begin working on the project by opening an IDE."),
+    "unlock": (update_module, "Unlock project(s)."),
+    "lock": (update_module, ""),
+    "islocked": (update_module, ""),
+    "rename": (update_module, "Rename an existing project including all sub files with the same name."),
+    "add-sources": (update_module, "Appends sources to the sources.txt"),
+    "mv": (update_module, "Move a file from one group to another group."),
+    "compress": (update_module, "Compress the raw csv and text files of project(s), read as before."),
+    "rm": (delete_module, "Delete project(s)."),
+    "grm": (delete_module, ""),
+    "daemon": (daemon_module, "Keep dpx warm in the background for the dpxc client."),
+}
+
+# Sub-apps mounted under their own name
+# name: (module, short help)
+lazy_groups: dict[str, tuple[str, str]] = {
+    "dev": (dev_module, ""),
+}
+
+
+def lazy_table() -> dict[str, tuple[str, str]]:
+    """All lazily registered names, commands first."""
+
+    return lazy_commands | lazy_groups
+
+
+@cache
+def load_command(name: str) -> TyperCommand | TyperGroup:
+    """Import the module of a registered command and build its click command.
+
+    Cached, so a long running process (dpx daemon) builds each command once.
+    """
+
+    table = lazy_table()
+    if name not in table:
+        raise ValueError(f"'{name}' is not a registered command.")
+
+    module_name, _ = table[name]
+    module = importlib.import_module(module_name)
+    group = typer.main.get_group(module.app)
+
+    if name in lazy_groups:
+        group.name = name
+        return group
+
+    if name not in group.commands:
+        raise ValueError(f"'{name}' is not a command in '{module_name}'.")
+
+    return group.commands[name]
+
+
+class LazyGroup(TyperGroup):
+    """Typer group which loads registered commands on dispatch."""
+
+    # While listing, registered commands are served from the table
+    _listing = False
+
+    def list_commands(self, ctx: typer.Context) -> list[str]:
+        eager: list[str] = super().list_commands(ctx)
+        return eager + [name for name in lazy_table() if name not in eager]
+
+    def get_command(self, ctx: typer.Context, cmd_name: str) -> TyperCommand | TyperGroup | None:
+        if cmd_name in self.commands:
+            return self.commands[cmd_name]
+
+        table = lazy_table()
+        if cmd_name not in table:
+            return None
+
+        if self._listing:
+            _, help = table[cmd_name]
+            return TyperCommand(cmd_name, help=help or None)
+
+        command = load_command(cmd_name)
+        self.commands[cmd_name] = command
+        return command
+
+    def format_help(self, ctx: typer.Context, formatter) -> None:
+        self._listing = True
+        try:
+            return super().format_help(ctx, formatter)
+        finally:
+            self._listing = False
+
+    def shell_complete(self, ctx: typer.Context, incomplete: str) -> list:
+        self._listing = True
+        try:
+            return super().shell_complete(ctx, incomplete)
+        finally:
+            self._listing = False
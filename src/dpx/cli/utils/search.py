@@ -0,0 +1,249 @@
+"""Full-text index of project metadata.
+
+dp-projects/
+    .dpx/
+        search.sqlite3      <- index
+    main/
+        some_project/
+            README.md                       <- indexed
+            docs/notes.txt                  <- indexed
+            references/sources.txt          <- indexed
+            data/external/*.json            <- indexed, e.g. Kaggle's dataset-metadata.json
+
+An inverted index: term -> (file, count).
+Each file also keeps its list of terms, so its postings are deleted by key
+when it changes, and new postings are inserted in key order.
+
+Before a search every indexed file is stat'ed, and only files whose mtime or
+size changed since they were indexed are read again.
+Files of deleted or moved projects are dropped.
+
+Results are ranked by project, summing the BM25 score of each of its files.
+"""
+
+import json
+import math
+import os
+import re
+import sqlite3
+from collections import Counter
+from pathlib import Path
+
+from src.dpx.utils.paths import DPX_STATE_DIR
+
+# Within the base path, as DPX_STATE_DIR is within PROJECTS_DIR
+search_dirname = DPX_STATE_DIR.name
+search_filename = "search.sqlite3"
+
+# Bump to rebuild indexes written by an older dpx
+schema_version = 1
+
+# Relative to a project
+metadata_files = ["README.md", "docs/notes.txt", "references/sources.txt"]
+metadata_dir = "data/external"
+metadata_dir_suffix = ".json"
+
+# BM25 parameters
+k1 = 1.2
+b = 0.75
+
+schema = """
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY,
+    project TEXT NOT NULL,
+    grp TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    terms INTEGER NOT NULL,
+    term_list TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    path TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (term, path)
+) WITHOUT ROWID;
+"""
+
+# (project, group, score, matched files relative to the project)
+type SearchResult = tuple[str, str, float, list[str]]
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased words and numbers."""
+
+    return re.findall(r"[^\W_]+", text.lower())
+
+
+def json_text(value: object) -> str:
+    """The strings in a json document, its keys left out."""
+
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return "\n".join(json_text(v) for v in value.values())
+    if isinstance(value, list):
+        return "\n".join(json_text(v) for v in value)
+    return ""
+
+
+def read_text(path: Path) -> str:
+    text = path.read_text(encoding="utf-8", errors="replace")
+    if path.suffix != ".json":
+        return text
+
+    try:
+        return json_text(json.loads(text))
+    except json.JSONDecodeError:
+        return text
+
+
+class SearchIndex:
+    """On-disk inverted index of the metadata files of every project."""
+
+    def __init__(self, base_path: Path) -> None:
+        self.base_path: Path = base_path
+        self.index_path: Path = base_path / search_dirname / search_filename
+        self.connection: sqlite3.Connection = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the index, in memory if it cannot be written to disk."""
+
+        try:
+            self.index_path.parent.mkdir(exist_ok=True)
+            connection = sqlite3.connect(self.index_path)
+            version: int = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != schema_version:
+                connection.executescript("DROP TABLE IF EXISTS documents; DROP TABLE IF EXISTS postings;")
+                connection.execute(f"PRAGMA user_version = {schema_version}")
+            connection.executescript(schema)
+        except (OSError, sqlite3.Error):
+            connection = sqlite3.connect(":memory:")
+            connection.executescript(schema)
+
+        return connection
+
+    def metadata_stats(self, group: str, project: str) -> dict[str, os.stat_result]:
+        """Stat of each metadata file of a project, by path relative to base_path."""
+
+        # Plain strings, this runs for every project before each search
+        project_rel = f"{group}/{project}"
+        project_path = f"{self.base_path}/{project_rel}"
+
+        stats: dict[str, os.stat_result] = {}
+        for file in metadata_files:
+            try:
+                stats[f"{project_rel}/{file}"] = os.stat(f"{project_path}/{file}")
+            except OSError:
+                continue
+
+        try:
+            with os.scandir(f"{project_path}/{metadata_dir}") as entries:
+                for entry in entries:
+                    if entry.name.endswith(metadata_dir_suffix) and entry.is_file():
+                        stats[f"{project_rel}/{metadata_dir}/{entry.name}"] = entry.stat()
+        except OSError:
+            pass
+
+        return stats
+
+    def sync(self, groups_by_name: dict[str, str]) -> int:
+        """Re-index the metadata files which changed.
+
+        Returns the number of files read.
+        """
+
+        indexed: dict[str, tuple[int, int]] = {
+            path: (mtime_ns, size)
+            for path, mtime_ns, size in self.connection.execute("SELECT path, mtime_ns, size FROM documents")
+        }
+
+        seen: set[str] = set()
+        changed: list[tuple[str, str, str, os.stat_result]] = []
+        for project, group in groups_by_name.items():
+            for path, stat in self.metadata_stats(group, project).items():
+                seen.add(path)
+                if indexed.get(path) != (stat.st_mtime_ns, stat.st_size):
+                    changed.append((path, project, group, stat))
+
+        removed = [path for path in indexed if path not in seen]
+        if not changed and not removed:
+            return 0
+
+        documents: list[tuple[str, str, str, int, int, int, str]] = []
+        postings: list[tuple[str, str, int]] = []
+        for path, project, group, stat in changed:
+            try:
+                counts = Counter(tokenize(read_text(self.base_path / path)))
+            except OSError:
+                continue
+
+            documents.append((path, project, group, stat.st_mtime_ns, stat.st_size, counts.total(), "\n".join(counts)))
+            postings += [(term, path, count) for term, count in counts.items()]
+
+        # Inserting in key order keeps the first sync of a large tree fast
+        postings.sort()
+
+        with self.connection:
+            for path in removed + [path for path, *_ in changed if path in indexed]:
+                (term_list,) = self.connection.execute(
+                    "SELECT term_list FROM documents WHERE path = ?", (path,)
+                ).fetchone()
+                self.connection.executemany(
+                    "DELETE FROM postings WHERE term = ? AND path = ?",
+                    [(term, path) for term in term_list.split("\n")],
+                )
+                self.connection.execute("DELETE FROM documents WHERE path = ?", (path,))
+
+            self.connection.executemany("INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?, ?)", documents)
+            self.connection.executemany("INSERT INTO postings VALUES (?, ?, ?)", postings)
+
+        return len(documents)
+
+    def search(self, query: str, limit: int = 10) -> list[SearchResult]:
+        """Projects with every term of query in their metadata, best first."""
+
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+
+        documents, total_terms = self.connection.execute("SELECT COUNT(*), SUM(terms) FROM documents").fetchone()
+        if not documents:
+            return []
+        average_terms = total_terms / documents
+
+        placeholders = ", ".join("?" for _ in terms)
+        cursor = self.connection.execute(
+            f"""
+            SELECT p.term, p.count, p.path, d.project, d.grp, d.terms
+            FROM postings p JOIN documents d ON d.path = p.path
+            WHERE p.term IN ({placeholders})
+            """,
+            terms,
+        )
+        hits = cursor.fetchall()
+
+        frequency: Counter[str] = Counter(term for term, *_ in hits)
+
+        scores: dict[tuple[str, str], float] = {}
+        matched_terms: dict[tuple[str, str], set[str]] = {}
+        matched_files: dict[tuple[str, str], set[str]] = {}
+        for term, count, path, project, group, length in hits:
+            idf = math.log(1 + (documents - frequency[term] + 0.5) / (frequency[term] + 0.5))
+            score = idf * count * (k1 + 1) / (count + k1 * (1 - b + b * length / average_terms))
+
+            key = (project, group)
+            scores[key] = scores.get(key, 0.0) + score
+            matched_terms.setdefault(key, set()).add(term)
+            matched_files.setdefault(key, set()).add(path.removeprefix(f"{group}/{project}/"))
+
+        results: list[SearchResult] = [
+            (project, group, score, sorted(matched_files[(project, group)]))
+            for (project, group), score in scores.items()
+            if len(matched_terms[(project, group)]) == len(terms)
+        ]
+        results.sort(key=lambda result: (-result[2], result[0]))
+        return results[:limit]
+
+    def close(self) -> None:
+        self.connection.close()
@@ -0,0 +1,289 @@
+"""Profiles of data files, cached beside the data.
+
+some_project/
+    data/
+        .stats.json     <- cache
+        raw/
+            x.csv       <- profiled
+
+A profile is the row count of a file and, per column, its type, null count,
+min and max.
+
+Each file is read once, in chunks (pandas for .csv, .tsv and .xlsx,
+pyarrow batches for .parquet and .feather), so memory stays flat whatever its size.
+A compressed .csv or .tsv is decompressed as it is read.
+Files are profiled in parallel, one process per file.
+
+Profiles are cached by size and mtime, a file profiled before is not read again.
+"""
+
+import csv
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from src.dpx.utils.compress import data_suffix
+from src.dpx.utils.sniff import read_csv_chunks
+from src.dpx.utils.util import csv_chunk_rows, settled_mtime_ns
+
+# pandas and pyarrow are imported where used, in the processes profiling
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+stats_filename = ".stats.json"
+
+# Bump to drop profiles computed by an older dpx
+stats_version = 1
+
+profiled_suffixes = [".csv", ".tsv", ".xlsx", ".parquet", ".feather"]
+
+# {"name", "type", "nulls", "min", "max"}
+type ColumnProfile = dict[str, Any]
+# {"rows", "columns": [ColumnProfile, ...]}
+type Profile = dict[str, Any]
+
+# pandas dtype kinds to type names
+kind_names = {"b": "bool", "i": "int", "u": "int", "f": "float", "M": "datetime", "m": "timedelta"}
+
+
+def plain(value: Any) -> Any:
+    """A value json can hold, numpy scalars unwrapped, dates as text."""
+
+    if hasattr(value, "item"):
+        value = value.item()
+    if value is None or isinstance(value, bool | int | float | str):
+        return value
+    return str(value)
+
+
+class FrameProfiler:
+    """Profile built from consecutive pandas chunks of one table."""
+
+    def __init__(self) -> None:
+        self.rows = 0
+        # name: {"kinds", "nulls", "min", "max"}
+        self.columns: dict[str, dict[str, Any]] = {}
+
+    def add(self, df: "DataFrame") -> None:
+        self.rows += len(df)
+        for name in df.columns:
+            series = df[name]
+            column = self.columns.setdefault(str(name), {"kinds": set(), "nulls": 0, "min": None, "max": None})
+            column["nulls"] += int(series.isna().sum())
+
+            values = series.dropna()
+            if values.empty:
+                continue
+
+            kind = series.dtype.kind
+            column["kinds"].add(kind)
+            if kind in kind_names:
+                low, high = plain(values.min()), plain(values.max())
+            else:
+                text = values.astype(str)
+                low, high = text.min(), text.max()
+
+            # Chunks may disagree on the type of a column: an int column with a null
+            # in a later chunk is read as float, numbers then compare as floats,
+            # and text compares with anything
+            if column["min"] is not None and type(column["min"]) is not type(low):
+                bounds = [column["min"], column["max"], low, high]
+                as_type = float if all(isinstance(bound, int | float) for bound in bounds) else str
+                column["min"], column["max"], low, high = map(as_type, bounds)
+            column["min"] = low if column["min"] is None else min(column["min"], low)
+            column["max"] = high if column["max"] is None else max(column["max"], high)
+
+    def profile(self) -> Profile:
+        columns: list[ColumnProfile] = []
+        for name, column in self.columns.items():
+            kinds = {kind_names.get(kind, "string") for kind in column["kinds"]}
+            if kinds == {"int", "float"}:
+                kinds = {"float"}
+            type_name = kinds.pop() if len(kinds) == 1 else "string" if kinds else "empty"
+
+            columns.append(
+                {"name": name, "type": type_name, "nulls": column["nulls"], "min": column["min"], "max": column["max"]}
+            )
+        return {"rows": self.rows, "columns": columns}
+
+
+def profile_batches(schema, batches) -> Profile:
+    """Profile of pyarrow record batches."""
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    rows = 0
+    columns: list[ColumnProfile] = [
+        {"name": field.name, "type": str(field.type), "nulls": 0, "min": None, "max": None} for field in schema
+    ]
+    for batch in batches:
+        rows += batch.num_rows
+        for column, array in zip(columns, batch.columns):
+            column["nulls"] += array.null_count
+            try:
+                min_max = pc.min_max(array)
+            except (pa.ArrowNotImplementedError, pa.ArrowTypeError):
+                continue
+
+            low, high = min_max["min"].as_py(), min_max["max"].as_py()
+            if low is None:
+                continue
+            column["min"] = low if column["min"] is None else min(column["min"], low)
+            column["max"] = high if column["max"] is None else max(column["max"], high)
+
+    for column in columns:
+        column["min"], column["max"] = plain(column["min"]), plain(column["max"])
+    return {"rows": rows, "columns": columns}
+
+
+def profile_file(path: str) -> Profile:
+    """Profile of one data file, read once in chunks."""
+
+    suffix = data_suffix(path)
+
+    if suffix in [".csv", ".tsv"]:
+        profiler = FrameProfiler()
+        for chunk in read_csv_chunks(Path(path), csv_chunk_rows):
+            profiler.add(chunk)
+        return profiler.profile()
+
+    if suffix == ".xlsx":
+        import pandas as pd
+        from openpyxl import load_workbook
+
+        # Sheets of one workbook are parts of one table, as written by csv_to_excel
+        profiler = FrameProfiler()
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                rows = sheet.iter_rows(values_only=True)
+                header = next(rows, None)
+                if header is None:
+                    continue
+
+                chunk: list[tuple] = []
+                for row in rows:
+                    chunk.append(row)
+                    if len(chunk) == csv_chunk_rows:
+                        profiler.add(pd.DataFrame(chunk, columns=header))
+                        chunk = []
+                if chunk:
+                    profiler.add(pd.DataFrame(chunk, columns=header))
+        finally:
+            workbook.close()
+        return profiler.profile()
+
+    if suffix == ".parquet":
+        from pyarrow import parquet as pq
+
+        with pq.ParquetFile(path) as parquet_file:
+            return profile_batches(parquet_file.schema_arrow, parquet_file.iter_batches(batch_size=csv_chunk_rows))
+
+    if suffix == ".feather":
+        import pyarrow as pa
+        from pyarrow import ipc
+
+        with pa.memory_map(path) as source:
+            reader = ipc.open_file(source)
+            return profile_batches(reader.schema, (reader.get_batch(i) for i in range(reader.num_record_batches)))
+
+    raise ValueError(f"'{os.path.basename(path)}' cannot be profiled, only {', '.join(profiled_suffixes)} files.")
+
+
+class DataStats:
+    """Cached profiles of the data files of a project.
+
+    Paths are relative to the data folder, 'raw/x.csv'.
+    """
+
+    def __init__(self, data_path: Path) -> None:
+        self.data_path: Path = data_path
+        self.stats_path: Path = data_path / stats_filename
+
+        # path: {"size", "mtime_ns", "profile"}
+        self.files: dict[str, dict[str, Any]] = {}
+        self.changed = False
+
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            stats = json.loads(self.stats_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+
+        if isinstance(stats, dict) and stats.get("version") == stats_version:
+            self.files = stats.get("files", {})
+
+    def cached(self, path: Path, stat: os.stat_result) -> Profile | None:
+        entry = self.files.get(path.relative_to(self.data_path).as_posix())
+        if entry is None or (entry["size"], entry["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        return entry["profile"]
+
+    def profiles(self, paths: list[Path], jobs: int | None = None, force: bool = False) -> dict[Path, Profile | str]:
+        """Profile of each file, from the cache or read again.
+
+        Files are read by jobs processes, by default one per CPU.
+        A file which cannot be read has an error message instead.
+        """
+
+        results: dict[Path, Profile | str] = {}
+        stats: dict[Path, os.stat_result] = {}
+        to_profile: list[Path] = []
+        for path in paths:
+            stats[path] = os.stat(path)
+            profile = None if force else self.cached(path, stats[path])
+            if profile is None:
+                to_profile.append(path)
+            else:
+                results[path] = profile
+
+        jobs = min(jobs or os.process_cpu_count() or 1, max(len(to_profile), 1))
+        if jobs <= 1:
+            outcomes = [self._attempt(profile_file, str(path)) for path in to_profile]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                futures = [executor.submit(profile_file, str(path)) for path in to_profile]
+                outcomes = [self._attempt(future.result) for future in futures]
+
+        for path, outcome in zip(to_profile, outcomes):
+            results[path] = outcome
+            if isinstance(outcome, str):
+                continue
+
+            mtime_ns = settled_mtime_ns(stats[path].st_mtime_ns)
+
+            self.files[path.relative_to(self.data_path).as_posix()] = {
+                "size": stats[path].st_size,
+                "mtime_ns": mtime_ns,
+                "profile": outcome,
+            }
+            self.changed = True
+
+        return {path: results[path] for path in paths}
+
+    @staticmethod
+    def _attempt(function, *args) -> Profile | str:
+        try:
+            return function(*args)
+        # RuntimeError: a worker which died breaks the pool (BrokenProcessPool)
+        except (OSError, ValueError, ImportError, EOFError, csv.Error, RuntimeError) as e:
+            return f"{type(e).__name__}: {e}"
+
+    def save(self) -> None:
+        """Write the cache if it changed, dropping files which no longer exist."""
+
+        if not self.changed:
+            return
+
+        self.files = {path: entry for path, entry in self.files.items() if (self.data_path / path).exists()}
+
+        tmp_path = self.stats_path.with_name(f"{stats_filename}.tmp")
+        tmp_path.write_text(json.dumps({"version": stats_version, "files": self.files}), encoding="utf-8")
+        os.replace(tmp_path, self.stats_path)
+        self.changed = False
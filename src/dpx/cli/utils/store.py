@@ -0,0 +1,214 @@
+"""Content-addressed store of raw data shared by projects, opt-in.
+
+dp-projects/
+    .hidden/
+        store/
+            datasets.json           <- files of each dataset downloaded, by url
+            blobs/
+                3f/
+                    3fa9...         <- blob, named by the sha256 of its content
+    main/
+        some_project/
+            data/
+                raw/
+                    x.csv           <- hardlink to a blob
+
+A file added to the store becomes a hardlink to the blob of its content,
+so projects holding the same file share one copy on disk.
+A dataset downloaded before is linked from the store instead of downloaded again.
+
+Blobs are read only, editing a stored file in place would edit it in every project.
+Tools which write a new file and rename it over the old one are fine.
+
+The link count of a blob is its reference count: a blob linked by no project
+has a count of one, and is removed by collect, which rm runs.
+
+The store must be on the same filesystem as the projects, hardlinks cannot cross filesystems.
+"""
+
+import errno
+import json
+import os
+import stat
+from pathlib import Path
+
+from src.dpx.cli.utils.manifest import DataManifest
+from src.dpx.utils.paths import STORE_DIR
+
+datasets_filename = "datasets.json"
+blobs_dirname = "blobs"
+
+# Bump to drop dataset records written by an older dpx
+store_version = 1
+
+read_only = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+def link_into(blob: Path, path: Path) -> None:
+    """Make path a hardlink to blob, replacing what was there."""
+
+    # Renaming a link over another link to the same file does nothing
+    if path.exists() and os.path.samefile(blob, path):
+        return
+
+    tmp_path = path.with_name(f".{path.name}.link")
+    tmp_path.unlink(missing_ok=True)
+    os.link(blob, tmp_path)
+    os.replace(tmp_path, path)
+
+
+class BlobStore:
+    """Blobs of the raw data files of every project, and the files of each dataset downloaded."""
+
+    def __init__(self, store_path: Path = STORE_DIR) -> None:
+        self.store_path: Path = store_path
+        self.blobs_path: Path = store_path / blobs_dirname
+        self.datasets_path: Path = store_path / datasets_filename
+
+        # url: {path relative to the data folder: hash}
+        self.datasets: dict[str, dict[str, str]] = {}
+        self.changed = False
+
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            datasets = json.loads(self.datasets_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+
+        if isinstance(datasets, dict) and datasets.get("version") == store_version:
+            self.datasets = datasets.get("datasets", {})
+
+    def exists(self) -> bool:
+        """Whether the store is in use, it is made by the first file added."""
+
+        return self.blobs_path.is_dir()
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blobs_path / digest[:2] / digest
+
+    def add(self, path: Path, digest: str) -> bool:
+        """Store a file as the blob of its content, digest, and link it to the blob.
+
+        Returns whether the file was replaced by a link to a blob stored before,
+        its space is then freed.
+        """
+
+        blob = self.blob_path(digest)
+        try:
+            blob_stat = os.stat(blob)
+        except FileNotFoundError:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(path, blob)
+            except OSError as e:
+                if e.errno == errno.EXDEV:
+                    raise ValueError(f"'{path}' is not on the filesystem of the store '{self.store_path}'.") from e
+                raise
+            os.chmod(blob, read_only)
+            return False
+
+        if os.path.samestat(blob_stat, os.stat(path)):
+            return False
+        link_into(blob, path)
+        return True
+
+    def add_files(self, data_path: Path, paths: list[Path]) -> tuple[dict[str, str], int]:
+        """Store the files of a project's data folder.
+
+        Hashes are read from the project's data manifest where it has them.
+        Returns the hash of each file by path relative to data_path,
+        and the bytes freed by files already stored.
+        """
+
+        manifest = DataManifest(data_path)
+        digests: dict[str, str] = {}
+        freed = 0
+        try:
+            for path in paths:
+                size = os.stat(path).st_size
+                digest = manifest.fingerprint(path)
+                if digest is None:
+                    continue
+                if self.add(path, digest):
+                    freed += size
+                digests[manifest.relative(path)] = digest
+        finally:
+            manifest.save()
+
+        return digests, freed
+
+    def record_dataset(self, url: str, digests: dict[str, str]) -> None:
+        """Record the files a download of url made."""
+
+        self.datasets[url] = digests
+        self.changed = True
+
+    def link_dataset(self, url: str, data_path: Path) -> list[Path] | None:
+        """Link the files of a dataset downloaded before into a project's data folder.
+
+        None if the dataset was not downloaded before, or a blob of it was collected since.
+        """
+
+        digests = self.datasets.get(url)
+        if not digests or not all(self.blob_path(digest).is_file() for digest in digests.values()):
+            return None
+
+        linked: list[Path] = []
+        for relative, digest in digests.items():
+            path = data_path / relative
+            path.parent.mkdir(parents=True, exist_ok=True)
+            link_into(self.blob_path(digest), path)
+            linked.append(path)
+        return linked
+
+    def collect(self) -> tuple[int, int]:
+        """Remove the blobs no project links to any more.
+
+        Returns the number of blobs removed and their bytes.
+        """
+
+        removed = freed = 0
+        if not self.exists():
+            return removed, freed
+
+        with os.scandir(self.blobs_path) as folders:
+            for folder in folders:
+                if not folder.is_dir():
+                    continue
+                kept = False
+                with os.scandir(folder.path) as blobs:
+                    for blob in blobs:
+                        blob_stat = blob.stat(follow_symlinks=False)
+                        if blob_stat.st_nlink > 1:
+                            kept = True
+                            continue
+                        os.unlink(blob.path)
+                        removed += 1
+                        freed += blob_stat.st_size
+                if not kept:
+                    os.rmdir(folder.path)
+
+        if removed:
+            # Datasets with a blob removed are downloaded again next time
+            self.datasets = {
+                url: digests
+                for url, digests in self.datasets.items()
+                if all(self.blob_path(digest).is_file() for digest in digests.values())
+            }
+            self.changed = True
+
+        return removed, freed
+
+    def save(self) -> None:
+        """Write the dataset records if they changed."""
+
+        if not self.changed:
+            return
+
+        self.store_path.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.datasets_path.with_name(f"{datasets_filename}.tmp")
+        tmp_path.write_text(json.dumps({"version": store_version, "datasets": self.datasets}), encoding="utf-8")
+        os.replace(tmp_path, self.datasets_path)
+        self.changed = False
@@ -0,0 +1,90 @@
+"""Scaffold of a new project, built once and copied by dpx init.
+
+dp-projects/
+    .dpx/
+        template/
+            3fa9c2d41b7e8a05/                   <- template, for the structure with this hash
+                data/
+                    processed/
+                        __project__.xlsx
+                notebooks/
+                    __project__.ipynb
+                ...
+
+The template is a project named __project__, made the slow way, generating
+the notebook with nbformat and the workbook with pandas. init copies it
+(see copy_tree) and renames what is named after __project__.
+
+The hash is of the structure trees of Project, a template is built again when
+they change, and the templates of older structures are removed.
+Bump template_version when how a file is generated changes.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from collections.abc import Callable
+from pathlib import Path
+
+from src.dpx.utils.paths import TEMPLATE_DIR
+from src.dpx.utils.util import Tree, copy_tree
+
+# Name of the template project, replaced by the name of each new project
+placeholder = "__project__"
+
+# Bump to build the template again
+template_version = 1
+
+
+class ProjectTemplate:
+    """Template tree of a project structure, built on first use."""
+
+    def __init__(self, trees: list[Tree], templates_path: Path = TEMPLATE_DIR) -> None:
+        self.templates_path: Path = templates_path
+
+        key = json.dumps([template_version, trees], sort_keys=True)
+        self.digest: str = hashlib.sha256(key.encode()).hexdigest()[:16]
+        self.template_path: Path = templates_path / self.digest
+
+    def build(self, make: Callable[[Path], None]) -> None:
+        """Make the template with make, given the path of a project named placeholder.
+
+        The template is made aside and renamed into place, a failed or
+        concurrent build never leaves a partial template.
+        """
+
+        build_path = self.templates_path / f".{self.digest}.{os.getpid()}.build"
+        shutil.rmtree(build_path, ignore_errors=True)
+        project_path = build_path / placeholder
+        project_path.mkdir(parents=True)
+        try:
+            make(project_path)
+            try:
+                os.rename(project_path, self.template_path)
+            except OSError:
+                # Built by another init meanwhile
+                if not self.template_path.is_dir():
+                    raise
+        finally:
+            shutil.rmtree(build_path, ignore_errors=True)
+
+        # Templates of older structures
+        for entry in os.scandir(self.templates_path):
+            if not entry.name.startswith(".") and entry.name != self.digest and entry.is_dir():
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    def copy(self, project_path: Path, make: Callable[[Path], None]) -> None:
+        """Copy the template to project_path, building it first if needed, named after its folder."""
+
+        if not self.template_path.is_dir():
+            self.build(make)
+
+        copy_tree(self.template_path, project_path, workers=1)
+
+        # Deepest first, a folder is renamed after what is in it
+        for root, dirnames, filenames in os.walk(self.template_path, topdown=False):
+            target = project_path / os.path.relpath(root, self.template_path)
+            for name in filenames + dirnames:
+                if placeholder in name:
+                    os.replace(target / name, target / name.replace(placeholder, project_path.name))
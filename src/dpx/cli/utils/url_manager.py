@@ -4,7 +4,6 @@ from pathlib import Path
 from typing import Protocol
 from urllib.parse import urlparse
 
-from icecream import ic
 from requests.exceptions import HTTPError
 from rich import print
 
@@ -29,21 +29,37 @@ all         refers to all groups
 """
 # from __future__ import annotations
 
+import csv
 import os
 import shutil
+import sqlite3
 import warnings
 import time
 import threading
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import pandas as pd
-from icecream import ic
-from pandas import DataFrame
-from rich import print
-
-from src.dpx.cli.utils.url_manager import URLDispatcher
+from src.dpx.cli.utils.catalog import CatalogRow, ProjectCatalog, suggestion_threshold
+from src.dpx.cli.utils.completion import name_index
+from src.dpx.cli.utils.manifest import DataManifest
+from src.dpx.cli.utils.stats import DataStats, profiled_suffixes
+from src.dpx.utils.compress import compression, data_name, data_suffix, decompress_file
 from src.dpx.utils.paths import PROJECTS_DIR
-from src.dpx.utils.util import Tree, create_structure
+from src.dpx.utils.sniff import copy_sidecar, load_sniffed, save_sniffed, sidecar_path, sidecar_suffix
+from src.dpx.utils.util import (
+    Tree,
+    columnar_formats,
+    copy_file,
+    copy_modes,
+    copy_tree,
+    create_structure,
+    csv_to_arrow,
+    extract_zip,
+)
+
+# pandas and the url handlers (requests) are imported where used
+if TYPE_CHECKING:
+    from pandas import DataFrame
 
 # Custom definitions
 temp_prefix = "tmp_"
@@ -71,6 +87,36 @@ another copy of file.ext -> file(4).ext
 # type Tree = dict[str, None | Tree]
 
 
+def scan_group(group_path: Path) -> tuple[list[Path], list[Path]]:
+    """Lists the projects in a group in a single pass.
+
+    Returns (temp project paths, non-temp project paths), each sorted by name.
+
+    Equivalent to is_temp_project / is_project on every file in the group,
+    given group_path is a group.
+    DirEntry.is_dir() uses the file type from the directory listing,
+    so there is no stat per entry (except symlinks, which are followed).
+    """
+
+    temp_projects: list[str] = []
+    non_temp_projects: list[str] = []
+
+    with os.scandir(group_path) as entries:
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+
+            if entry.name.startswith(temp_prefix):
+                temp_projects.append(entry.name)
+            else:
+                non_temp_projects.append(entry.name)
+
+    # Sort names, comparing Paths is much slower
+    temp_project_paths: list[Path] = [group_path / name for name in sorted(temp_projects)]
+    non_temp_project_paths: list[Path] = [group_path / name for name in sorted(non_temp_projects)]
+    return temp_project_paths, non_temp_project_paths
+
+
 class GroupManager:
     """Manager of groups."""
 
@@ -205,6 +251,9 @@ class GroupManager:
         group_path.mkdir()
         (group_path / ".gitkeep").touch()
 
+        self.groups.append(group_name)
+        self.groups_paths.append(group_path)
+
 
 class ProjectManager(GroupManager):
     """Manager of projects."""
@@ -237,24 +286,7 @@ class ProjectManager(GroupManager):
             self.verify_group(group)
             group_path = PROJECTS_DIR / group
 
-            # Filepaths in group
-            files = os.listdir(group_path)
-
-            project_paths: list[Path] = [
-                group_path / file
-                for file in files
-                if self.is_project(
-                    group_path / file,
-                )
-            ]
-            temp_project_paths: list[Path] = [
-                group_path / file
-                for file in files
-                if self.is_temp_project(
-                    group_path / file,
-                )
-            ]
-            non_temp_project_paths: list[Path] = list(set(project_paths).difference(set(temp_project_paths)))
+            temp_project_paths, non_temp_project_paths = scan_group(group_path)
 
             if show_temps:
                 # to_show: list[Path] = to_show + temp_project_paths
@@ -286,24 +318,92 @@ class ProjectManager(GroupManager):
         )
         return [p.name for p in project_paths]
 
+    def _scan_catalog_rows(self, group: str) -> list[CatalogRow]:
+        """Scan a group for its catalog rows."""
+
+        rows: list[CatalogRow] = []
+        for project_path in self.list_projects_paths([group]):
+            mtime_ns = project_path.stat().st_mtime_ns
+            rows.append((project_path.name, group, mtime_ns))
+        return rows
+
+    def sync_catalog(self) -> list[str]:
+        """Rescan the groups that changed since the catalog was written.
+
+        Returns the rescanned groups.
+        """
+
+        stale_groups = self.catalog.stale_groups(self.groups)
+        for group, mtime_ns in stale_groups.items():
+            self.catalog.replace_group(group, mtime_ns, self._scan_catalog_rows(group))
+
+        self.catalog.retain_groups(self.groups)
+        return list(stale_groups)
+
     def __init__(self) -> None:
         super().__init__()
-        self.projects = self.list_projects(self.groups)
-        self.project_paths = self.list_projects_paths(self.groups)
+        self.catalog = ProjectCatalog(self.base_path)
+        rescanned_groups = self.sync_catalog()
+
+        # name -> group, built once per invocation
+        # Paths are built on lookup, building one per project dominates with many projects
+        # If two groups have a project with the same name, the first group in order wins
+        self.groups_by_name: dict[str, str] = {}
+        for group in self.groups:
+            for name in self.catalog.projects_in(group):
+                self.groups_by_name.setdefault(name, group)
+
+        if rescanned_groups or name_index.groups() != self.groups:
+            self.save_name_index()
+
+    @property
+    def projects(self) -> list[str]:
+        return list(self.groups_by_name)
+
+    @property
+    def project_paths(self) -> list[Path]:
+        return [PROJECTS_DIR / group / name for name, group in self.groups_by_name.items()]
+
+    def register_project(self, project_path: Path) -> None:
+        """Record a project created or moved in this invocation."""
+
+        self.groups_by_name[project_path.name] = project_path.parent.name
+
+    def unregister_project(self, name: str) -> None:
+        """Forget a project deleted or moved in this invocation."""
+
+        self.groups_by_name.pop(name, None)
+
+    def save_name_index(self) -> None:
+        """Write the group and project names served to shell completion.
+
+        Called by the commands which change groups or projects.
+        """
+
+        name_index.write_projects(self.groups, self.groups_by_name)
+
+    def suggest_projects(self, name: str) -> str:
+        """' Did you mean: ...?' listing the projects closest to name, empty if none are close."""
+
+        matches = self.catalog.similar(name, limit=3, threshold=suggestion_threshold)
+        if not matches:
+            return ""
+
+        names = ", ".join(f"'{match}'" for match, _, _ in matches)
+        return f" Did you mean: {names}?"
 
     def verify_project(self, project_candidate: str) -> None:
         """Raises an error if the input is not a valid project."""
-        if project_candidate not in self.projects:
-            raise ValueError(f"'{project_candidate}' is not a valid project.")
+        if project_candidate not in self.groups_by_name:
+            raise ValueError(f"'{project_candidate}' is not a valid project.{self.suggest_projects(project_candidate)}")
 
     def get_group_from_project(self, project: str) -> str:
         """Get group name from project name."""
 
-        for project_path in self.list_projects_paths(self.groups):
-            if project_path.name == project:
-                return project_path.parent.name
+        if project in self.groups_by_name:
+            return self.groups_by_name[project]
 
-        raise FileNotFoundError(f"Cannot find group from project: '{project}'.")
+        raise FileNotFoundError(f"Cannot find group from project: '{project}'.{self.suggest_projects(project)}")
 
     def get_project_path(self, name: str) -> Path:
         group = self.get_group_from_project(name)
@@ -321,7 +421,7 @@ class ProjectManager(GroupManager):
         """
 
         # unique project name
-        if new_project in self.projects:
+        if new_project in self.groups_by_name:
             raise FileExistsError(
                 f"'{new_project}' already exists in the project group: '{self.get_group_from_project(new_project)}'."
             )
@@ -455,6 +555,7 @@ class Project:
         self.data_interim_path: Path = data_interim_path
         self.data_processed_path: Path = data_processed_path
         self.data_external_path: Path = data_external_path
+        self.data_db_path: Path = self.this_project_path / "data" / "db"
         self.sources_path: Path = sources_path
 
     def is_locked(self) -> bool:
@@ -490,12 +591,94 @@ class Project:
         time.sleep(seconds)
         self.lock()
 
+    def data_names(self) -> list[tuple[str, str]]:
+        """(folder, file) of every data file in this project."""
+
+        entries: list[tuple[str, str]] = []
+        for data_folder in self.data_folder_names:
+            data_folder_path = self.this_project_path / "data" / data_folder
+            if not data_folder_path.is_dir():
+                continue
+
+            with os.scandir(data_folder_path) as files:
+                entries += [(data_folder, file.name) for file in files if not file.name.startswith(".")]
+
+        return entries
+
+    def data_manifest(self) -> DataManifest:
+        """Hashes of the data files and what was derived from them, see manifest.py."""
+
+        return DataManifest(self.this_project_path / "data")
+
+    def data_stats(self) -> DataStats:
+        """Cached profiles of the data files, see stats.py."""
+
+        return DataStats(self.this_project_path / "data")
+
+    def profiled_files(self) -> list[Path]:
+        """Data files which can be profiled, in folders too, sorted."""
+
+        paths: list[Path] = []
+        for data_folder in self.data_folder_names:
+            for root, dirnames, filenames in os.walk(self.this_project_path / "data" / data_folder):
+                dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+                paths += [
+                    Path(root) / filename
+                    for filename in sorted(filenames)
+                    if not filename.startswith(".") and data_suffix(filename) in profiled_suffixes
+                ]
+        return paths
+
+    def data_file(self, file: str) -> Path:
+        """Path of a data file given by name, 'x.csv', or by folder too, 'raw/x.csv'."""
+
+        data_path = self.this_project_path / "data"
+        if "/" in file:
+            path = data_path / file
+            if not path.is_file():
+                raise ValueError(f"'{file}' is not a data file of '{self.name}'.")
+            return path
+
+        folders = [folder for folder in self.data_folder_names if (data_path / folder / file).is_file()]
+        if not folders:
+            raise ValueError(f"'{file}' is not a data file of '{self.name}'.")
+        if len(folders) > 1:
+            raise ValueError(f"'{file}' is in {', '.join(folders)}, choose one, e.g. '{folders[0]}/{file}'.")
+        return data_path / folders[0] / file
+
+    def save_data_index(self) -> None:
+        """Write the data file names served to shell completion.
+
+        Called by the commands which add data files.
+        """
+
+        name_index.write_data({self.name: self.data_names()})
+
     def mkdir_data_folders(self) -> None:
         create_structure(base_path=self.this_project_path, tree=self.data_folders_structure)
 
     def mkdir_other_files(self) -> None:
         create_structure(base_path=self.this_project_path, tree=self.other_files_structure)
 
+    def scaffold(self) -> None:
+        """Makes the folders and files of a new project, copied from the template (see template.py).
+
+        The same as mkdir_data_folders, mkdir_other_files and add_final_excel_file,
+        without importing nbformat and pandas, but for the first project.
+        """
+
+        from src.dpx.cli.utils.template import ProjectTemplate, placeholder
+
+        def make(project_path: Path) -> None:
+            project = Project(project_path)
+            project.mkdir_data_folders()
+            project.mkdir_other_files()
+            project.add_final_excel_file()
+
+        blank = Project(self.this_project_path.parent / placeholder)
+        template = ProjectTemplate([blank.data_folders_structure, blank.other_files_structure])
+        template.copy(self.this_project_path, make)
+
     def add_final_excel_file(self, excel_name: str | None = None) -> Path:
         """Create an empty excel file in data/processed/"""
 
@@ -507,6 +690,8 @@ class Project:
 
         final_xl_path = self.data_processed_path / excel_name
 
+        import pandas as pd
+
         df = pd.DataFrame()
         df.to_excel(final_xl_path, index=False)
 
@@ -526,7 +711,80 @@ class Project:
             out = f.read()
         return out
 
+    def data_store(self, paths: list[Path] | None = None, url: str | None = None) -> tuple[int, int]:
+        """Adds data files to the store shared by projects (see store.py),
+        by default every file of raw.
+
+        With url, the files are recorded as its dataset, and linked from the store
+        the next time it is downloaded.
+
+        Returns the number of files stored and the bytes freed by those stored before.
+        """
+
+        from src.dpx.cli.utils.store import BlobStore
+
+        if paths is None:
+            paths = self.data_files_in([self.data_dump_path])
+
+        store = BlobStore()
+        digests, freed = store.add_files(self.this_project_path / "data", paths)
+        if url is not None:
+            store.record_dataset(url, digests)
+        store.save()
+
+        return len(digests), freed
+
+    def link_stored_dataset(self, url: str) -> list[Path] | None:
+        """Links the files of a dataset from the store into the data folders.
+
+        None if the store does not have every file of it.
+        """
+
+        from src.dpx.cli.utils.store import BlobStore
+
+        return BlobStore().link_dataset(url, self.this_project_path / "data")
+
+    def data_file_stats(self) -> dict[Path, tuple[int, int]]:
+        """Size and mtime of every file of raw and external, to tell what a download wrote."""
+
+        stats: dict[Path, tuple[int, int]] = {}
+        for path in self.data_files_in([self.data_dump_path, self.data_external_path]):
+            stat = os.stat(path)
+            stats[path] = (stat.st_size, stat.st_mtime_ns)
+        return stats
+
+    def data_compress(self, method: str, level: int | None = None, auto: bool = False) -> list[tuple[Path, int, int]]:
+        """Compresses the text data files of raw (see compress.py), 'x.csv' to 'x.csv.zst'.
+
+        With auto, only cold files: large, and not read or modified for a while (see is_cold).
+        A file keeps its sniffed sidecar.
+
+        Returns each file compressed, with its size before and after.
+        """
+
+        from src.dpx.utils.compress import compress_file, compressible_suffixes, is_cold
+
+        now = time.time()
+        compressed: list[tuple[Path, int, int]] = []
+        for path in self.data_files_in([self.data_dump_path], compressible_suffixes):
+            if compression(path) is not None:
+                continue
+
+            stat = os.stat(path)
+            if auto and not is_cold(stat, now):
+                continue
+
+            sniffed = load_sniffed(path)
+            output_path = compress_file(path, method, level)
+            sidecar_path(path).unlink(missing_ok=True)
+            if sniffed is not None:
+                save_sniffed(output_path, sniffed)
+            compressed.append((output_path, stat.st_size, os.stat(output_path).st_size))
+        return compressed
+
     def handle_url(self, url: str) -> Path:
+        from src.dpx.cli.utils.url_manager import URLDispatcher
+
         dispatcher = URLDispatcher()
         return dispatcher.download(
             url,
@@ -534,8 +792,11 @@ class Project:
             external_path=self.data_external_path,
         )
 
-    def data_ls(self) -> DataFrame:
+    def data_ls(self) -> "DataFrame":
         """View the data filenames in this project."""
+
+        import pandas as pd
+
         ignore: list[str] = [self.data_ignore_file]
 
         df = pd.DataFrame()
@@ -547,7 +808,11 @@ class Project:
 
             data_files = os.listdir(data_folder_path)
             # print(data_files)
-            data_files = [data_file for data_file in data_files if data_file not in ignore]
+            data_files = [
+                data_file
+                for data_file in data_files
+                if data_file not in ignore and not data_file.endswith(sidecar_suffix)
+            ]
 
             df_concat = pd.DataFrame(
                 data_files,
@@ -556,52 +821,289 @@ class Project:
             df = pd.concat([df, df_concat], axis=1)
         return df
 
-    def data_copy(self, overwrite: bool = False) -> list[Path]:
+    def data_copy(
+        self,
+        overwrite: bool = False,
+        output_format: str | None = None,
+        mode: str = "auto",
+        workers: int | None = None,
+    ) -> list[tuple[Path, str]]:
         """Copies all files from raw to interim.
         Force is force overwrite.
 
+        With an output_format (parquet or feather), .csv files are converted
+        on the way instead of copied.
+
+        mode is how files are copied, see copy_file.
+        auto clones where the filesystem supports reflinks, so large raw data
+        takes no extra space until the copy is edited.
+
+        Folders are copied recursively, 'images/' to 'images-copy/',
+        their files by workers threads (see copy_tree), and are not converted.
+        Zip archives are extracted, 'x.zip' to 'x-copy/' (see extract_zip),
+        members already extracted are kept unless overwrite.
+        A copied file keeps the sniffed sidecar of its raw file (see sniff.py).
+        A compressed file is decompressed, 'x.csv.zst' to 'x-copy.csv', or converted
+        (see compress.py).
+
+        Without overwrite, a file is copied again only when it changed since
+        its last copy, as recorded in the data manifest.
+        A copy made before the manifest is kept, and recorded.
+
         Ignore files .gitkeep
 
-        Returns list of succefully created copies.
+        Returns list of succefully created copies, with how each was made.
         """
         ignore_files: list[str] = [".gitkeep"]
 
+        if output_format is not None and output_format not in columnar_formats:
+            raise ValueError(f"'{output_format}' cannot be written while copying, choose from: {columnar_formats}.")
+        if mode not in copy_modes:
+            raise ValueError(f"'{mode}' is not a copy mode, choose from: {copy_modes}.")
+
         self.data_interim_path.mkdir(exist_ok=True)
 
         raw_files = os.listdir(self.data_dump_path)
         # raw_file_paths = [self.data_dump_path / raw_file for raw_file in raw_files]
 
-        # filter out unwanted files
-        raw_files = [f for f in raw_files if f not in ignore_files]
+        # filter out unwanted files, and sniffed sidecars which go with their file
+        raw_files = [f for f in raw_files if f not in ignore_files and not f.endswith(sidecar_suffix)]
 
-        created_copies: list[Path] = []
-        for raw_filename in raw_files:
-            stem, ext = os.path.splitext(raw_filename)
+        manifest = self.data_manifest()
 
-            if ext in [".zip"]:
-                print(f"Not copying: '{raw_filename}'.")
-                continue
+        def is_current(src: Path, kind: str, dst: Path) -> bool:
+            """Whether dst is up to date, recording copies made before the manifest."""
 
-            new_stem = stem + copy_appendage
-            new_raw_filename = new_stem + ext
+            if overwrite or not dst.exists():
+                return False
 
-            src = self.data_dump_path / raw_filename
+            current = manifest.is_current(src, kind)
+            if current is None:
+                manifest.record(src, kind, [dst])
+                return True
+            return current
 
-            if src.is_dir():
-                # TODO: copy all files in this dir
-                print(f"Cannot copy folder '{raw_filename}' now.")
-                continue
+        created_copies: list[tuple[Path, str]] = []
+        try:
+            for raw_filename in raw_files:
+                src = self.data_dump_path / raw_filename
 
-            dst = self.data_interim_path / new_raw_filename
+                # Folders are copied whole, named after the top-level folder only
+                if src.is_dir() and not src.is_symlink():
+                    dst = self.data_interim_path / (raw_filename + copy_appendage)
 
-            if dst.exists():
-                if not overwrite:
+                    if is_current(src, "copy", dst):
+                        continue
+                    if dst.exists():
+                        shutil.rmtree(dst)
+
+                    how = copy_tree(src, dst, mode, workers)
+                    manifest.record(src, "copy", [dst])
+                    created_copies.append((dst, ", ".join(f"{n} {way}" for way, n in sorted(how.items())) or "empty"))
+                    continue
+
+                stem, ext = os.path.splitext(data_name(raw_filename))
+
+                # Archives are extracted, 'x.zip' to 'x-copy/'
+                if ext in [".zip"]:
+                    dst = self.data_interim_path / (stem + copy_appendage)
+
+                    # Extracting again only rewrites members which differ, nothing to adopt
+                    if not overwrite and dst.exists() and manifest.is_current(src, "extract"):
+                        continue
+
+                    how = extract_zip(src, dst, workers, skip_existing=not overwrite)
+                    manifest.record(src, "extract", [dst])
+                    created_copies.append((dst, ", ".join(f"{n} {way}" for way, n in sorted(how.items())) or "empty"))
                     continue
 
-            shutil.copyfile(src, dst)
-            created_copies.append(dst)
+                new_stem = stem + copy_appendage
+                convert = output_format is not None and ext == ".csv"
+                new_raw_filename = new_stem + (f".{output_format}" if convert else ext)
+                decompress = not convert and compression(src) is not None
+
+                dst = self.data_interim_path / new_raw_filename
+                kind = output_format if convert else "decompress" if decompress else "copy"
+
+                if is_current(src, kind, dst):
+                    continue
+
+                if convert:
+                    csv_to_arrow(src, output_format, output_path=dst)
+                    created_copies.append((dst, output_format))
+                elif decompress:
+                    decompress_file(src, dst)
+                    created_copies.append((dst, "decompressed"))
+                    copy_sidecar(src, dst)
+                else:
+                    created_copies.append((dst, copy_file(src, dst, mode)))
+                    copy_sidecar(src, dst)
+                manifest.record(src, kind, [dst])
+        finally:
+            # Records what was done, even if a later file failed
+            manifest.save()
 
         return created_copies
 
+    def data_files_in(self, folder_paths: list[Path], suffixes: list[str] | None = None) -> list[Path]:
+        """Files of folder_paths, with one of suffixes if given, in folders too, sorted.
+
+        Hidden files and folders, sidecars and caches, are left out.
+        """
+
+        paths: list[Path] = []
+        for folder_path in folder_paths:
+            for root, dirnames, filenames in os.walk(folder_path):
+                dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+                paths += [
+                    Path(root) / filename
+                    for filename in sorted(filenames)
+                    if not filename.startswith(".") and (suffixes is None or data_suffix(filename) in suffixes)
+                ]
+        return paths
+
+    def data_db(self, db_name: str | None = None) -> Path:
+        """Path of a SQLite database in data/db, named after the project by default."""
+
+        from src.dpx.utils.db import db_suffix
+
+        return self.data_db_path / f"{db_name or self.name}{db_suffix}"
+
+    def data_load_db(
+        self,
+        overwrite: bool = False,
+        db_name: str | None = None,
+        index_columns: list[str] | None = None,
+        paths: list[Path] | None = None,
+    ) -> tuple[Path, dict[Path, tuple[str, int | str]]]:
+        """Loads data files into a SQLite database in data/db, one table per file (see db.py).
+
+        paths default to the .csv and .tsv files of raw and interim, in folders too.
+        db_name defaults to the project name.
+        index_columns are indexed in every table which has them, as well as id columns.
+
+        Without overwrite, a file is loaded again only when it changed since
+        its last load, as recorded in the data manifest.
+
+        Returns the database, and the table and rows loaded of each file loaded,
+        or an error message instead of rows for those which failed.
+        """
+
+        from src.dpx.utils.db import connect, has_table, load_file, table_name
+
+        self.mkdir_db_folder()
+        db_path = self.data_db(db_name)
+        kind = f"sqlite:{db_path.name}"
+
+        if paths is None:
+            paths = self.data_files_in([self.data_dump_path, self.data_interim_path], [".csv", ".tsv"])
+
+        manifest = self.data_manifest()
+        connection = connect(db_path)
+
+        loaded: dict[Path, tuple[str, int | str]] = {}
+        # SQLite table names are case insensitive
+        tables: dict[str, Path] = {}
+        try:
+            for path in paths:
+                table = table_name(path)
+                if table.lower() in tables:
+                    relative = tables[table.lower()].relative_to(self.this_project_path / "data")
+                    loaded[path] = (table, f"table '{table}' is loaded from '{relative}'")
+                    continue
+                tables[table.lower()] = path
+
+                if not overwrite and has_table(connection, table) and manifest.is_current(path, kind):
+                    continue
+
+                try:
+                    loaded[path] = (table, load_file(connection, path, table, index_columns or []))
+                except (OSError, ValueError, ImportError, csv.Error, sqlite3.Error) as e:
+                    loaded[path] = (table, f"{type(e).__name__}: {e}")
+                    continue
+                manifest.record(path, kind, [db_path])
+
+            connection.execute("PRAGMA optimize")
+        finally:
+            connection.close()
+            manifest.save()
+
+        return db_path, loaded
+
+    def query_files(self, sql: str) -> dict[str, Path]:
+        """Data files of raw, interim and processed which sql reads as tables, by table.
+
+        Tables are the names in FROM and JOIN positions (see sql.py).
+        A table is named after its file, 'x-copy.csv' is 'x_copy',
+        the first file in raw, interim then processed has the name.
+        """
+
+        from src.dpx.utils.db import loaded_suffixes, table_name
+        from src.dpx.utils.sql import from_tables, tokens
+
+        # SQLite names are case insensitive
+        tables = {table.lower() for table in from_tables(tokens(sql))}
+        if not tables:
+            return {}
+
+        files = self.data_files_in(
+            [self.data_dump_path, self.data_interim_path, self.data_processed_path], loaded_suffixes
+        )
+        file_by_table: dict[str, Path] = {}
+        for path in files:
+            table = table_name(path)
+            if table.lower() in tables:
+                file_by_table.setdefault(table.lower(), path)
+        return {table_name(path): path for path in file_by_table.values()}
+
+    def query_connection(
+        self, sql: str, db_name: str | None = None
+    ) -> tuple[sqlite3.Connection, dict[Path, tuple[str, int | str]]]:
+        """A connection to run sql on, over the data files it reads, see query_files and fetch.
+
+        Nothing is written: the project database in data/db is opened read only,
+        and a table loaded there by cdb, and current, is read from it.
+        Other files are read into TEMP tables of the connection, with only the columns
+        sql names and, for .parquet and .feather, the filters of its WHERE (see sql.py).
+        The connection is then query only, sql cannot change what it reads.
+
+        Returns the connection, to close, and the table and rows read of each file read,
+        or an error message instead of rows for those which failed.
+        """
+
+        from src.dpx.utils.db import has_table, load_file
+        from src.dpx.utils.sql import pushed_filters, referenced_columns, tokens
+
+        sql_tokens = tokens(sql)
+        columns = referenced_columns(sql_tokens)
+        filters = pushed_filters(sql_tokens)
+
+        db_path = self.data_db(db_name)
+        kind = f"sqlite:{db_path.name}"
+        if db_path.exists():
+            connection = sqlite3.connect(f"{db_path.as_uri()}?mode=ro", uri=True, isolation_level=None)
+        else:
+            connection = sqlite3.connect(":memory:", isolation_level=None)
+
+        manifest = self.data_manifest()
+        read: dict[Path, tuple[str, int | str]] = {}
+        try:
+            for table, path in self.query_files(sql).items():
+                if has_table(connection, table) and manifest.is_current(path, kind):
+                    continue
+                try:
+                    read[path] = (table, load_file(connection, path, table, [], columns, filters, "temp"))
+                except (OSError, ValueError, ImportError, csv.Error, sqlite3.Error) as e:
+                    read[path] = (table, f"{type(e).__name__}: {e}")
+
+            connection.execute("PRAGMA query_only = ON")
+        except BaseException:
+            connection.close()
+            raise
+        finally:
+            manifest.save()
+
+        return connection, read
+
     def data_promote(self) -> None:
         self.data_copy()
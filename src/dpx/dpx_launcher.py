@@ -2,3 +2,64 @@ def main() -> None:
     from src.dpx.__main__ import main as dpx_main
 
     dpx_main()
+
+
+def forward(argv: list[str], prog: str = "dpx") -> int | None:
+    """Run a command in 'dpx daemon'.
+
+    prog names the program for shell completion, which reads _<PROG>_COMPLETE.
+
+    Returns the exit code of the command, None if no daemon is listening.
+    """
+
+    import os
+    import signal
+    import socket
+
+    from src.dpx.utils.daemon import recv_int, send_request
+    from src.dpx.utils.paths import DAEMON_SOCKET_PATH
+
+    if not hasattr(socket, "AF_UNIX") or not hasattr(socket, "send_fds"):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(DAEMON_SOCKET_PATH))
+    except OSError:
+        sock.close()
+        return None
+
+    with sock:
+        request = {"argv": argv, "prog": prog, "cwd": os.getcwd(), "env": dict(os.environ)}
+        send_request(sock, request, [0, 1, 2])
+
+        try:
+            pid = recv_int(sock)
+        except ConnectionError:
+            return 1
+
+        while True:
+            try:
+                return recv_int(sock)
+            except KeyboardInterrupt:
+                # Ctrl-C goes to this process only, pass it on
+                os.kill(pid, signal.SIGINT)
+            except ConnectionError:
+                return 1
+
+
+def client() -> None:
+    """Thin client entry point.
+
+    Runs the command in 'dpx daemon' when it is listening, in-process otherwise.
+    """
+
+    import os
+    import sys
+
+    code = forward(sys.argv[1:], prog=os.path.basename(sys.argv[0]))
+    if code is None:
+        main()
+        return
+
+    sys.exit(code)
@@ -0,0 +1,172 @@
+"""Compressed data files, written by dpx compress and read as if they were not.
+
+raw/
+    x.csv.zst       <- x.csv compressed with zstd
+    y.csv.gz        <- y.csv compressed with gzip
+
+A compressed file keeps the name of its data, 'x.csv', with the suffix of
+its compression after it. Readers decompress it as a stream, in chunks,
+so memory stays flat whatever its size.
+
+The logical size of a file, its size decompressed, is read from its header
+(zstd frames are written with their content size) or its trailer (gzip,
+modulo 4 GiB, as gzip stores it), not by decompressing it.
+
+zstd needs the zstandard package: pip install 'dpx[compress]'
+gzip is built in.
+"""
+
+import gzip
+import io
+import os
+import shutil
+from pathlib import Path
+from typing import BinaryIO
+
+compression_suffixes = {".zst": "zstd", ".gz": "gzip"}
+method_suffixes = {method: suffix for suffix, method in compression_suffixes.items()}
+
+# Text files which compress well, others (parquet, xlsx, zip, images) are compressed already
+compressible_suffixes = [".csv", ".tsv", ".txt", ".json", ".jsonl"]
+
+compress_chunk_size = 1024 * 1024
+
+# zstd 3 compresses csv nearly as well as gzip 6, several times faster
+compression_levels = {"zstd": 3, "gzip": 6}
+
+# dpx compress --auto: files this large not read or modified for this long
+cold_bytes = 1024 * 1024
+cold_days = 30
+
+
+def compression(path: Path | str) -> str | None:
+    """Method a file is compressed with, None if it is not."""
+
+    return compression_suffixes.get(os.path.splitext(path)[1].lower())
+
+
+def is_cold(stat: os.stat_result, now: float) -> bool:
+    """Whether a file is large and was not read or modified for cold_days.
+
+    Reads are seen where the filesystem updates atime, relatime does once a day.
+    """
+
+    last_used = max(stat.st_atime, stat.st_mtime)
+    return stat.st_size >= cold_bytes and now - last_used >= cold_days * 24 * 60 * 60
+
+
+def data_name(path: Path | str) -> str:
+    """Name of the data in a file, 'x.csv' for 'x.csv.zst' and 'x.csv'."""
+
+    name = os.path.basename(path)
+    stem, suffix = os.path.splitext(name)
+    return stem if suffix.lower() in compression_suffixes else name
+
+
+def data_suffix(path: Path | str) -> str:
+    """Suffix of the data in a file, '.csv' for 'x.csv.zst' and 'x.csv'."""
+
+    return os.path.splitext(data_name(path))[1].lower()
+
+
+def default_method() -> str:
+    """zstd if zstandard is installed, else gzip."""
+
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return "gzip"
+    return "zstd"
+
+
+def import_zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd needs zstandard: pip install 'dpx[compress]'") from e
+    return zstandard
+
+
+def open_data(path: Path | str) -> BinaryIO:
+    """Open a data file for reading, decompressed as it is read if it is compressed."""
+
+    method = compression(path)
+    if method == "gzip":
+        return gzip.open(path, "rb")
+    if method == "zstd":
+        # Buffered, the zstandard reader cannot read lines
+        return io.BufferedReader(import_zstandard().open(path, "rb"), compress_chunk_size)
+    return open(path, "rb")
+
+
+def logical_size(path: Path | str) -> int:
+    """Size of the data in a file, decompressed.
+
+    The physical size if it is not compressed, or if its compressed size does not say.
+    """
+
+    method = compression(path)
+    size = os.stat(path).st_size
+    if method is None or size == 0:
+        return size
+
+    with open(path, "rb") as f:
+        if method == "gzip":
+            # ISIZE, the last 4 bytes
+            f.seek(-4, os.SEEK_END)
+            return int.from_bytes(f.read(4), "little")
+
+        zstandard = import_zstandard()
+        try:
+            content_size = zstandard.frame_content_size(f.read(18))
+        except zstandard.ZstdError:
+            return size
+        return content_size if content_size >= 0 else size
+
+
+def compress_file(path: Path, method: str, level: int | None = None) -> Path:
+    """Compress a file next to itself, 'x.csv' to 'x.csv.zst', and remove it.
+
+    The compressed file keeps the mtime of the file.
+    Returns the compressed file.
+    """
+
+    if method not in method_suffixes:
+        raise ValueError(f"'{method}' is not a compression, choose from: {list(method_suffixes)}.")
+    if level is None:
+        level = compression_levels[method]
+
+    output_path = path.with_name(path.name + method_suffixes[method])
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+
+    stat = os.stat(path)
+    try:
+        with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+            if method == "gzip":
+                # mtime=0 keeps the output the same for the same input
+                with gzip.GzipFile(filename=path.name, mode="wb", compresslevel=level, fileobj=dst, mtime=0) as gz:
+                    shutil.copyfileobj(src, gz, compress_chunk_size)
+            else:
+                compressor = import_zstandard().ZstdCompressor(level=level, write_content_size=True, threads=-1)
+                with compressor.stream_writer(dst, size=stat.st_size, closefd=False) as writer:
+                    shutil.copyfileobj(src, writer, compress_chunk_size)
+
+        os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp_path, output_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    path.unlink()
+    return output_path
+
+
+def decompress_file(path: Path, output_path: Path) -> None:
+    """Decompress a file to output_path, replacing it, in chunks."""
+
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    try:
+        with open_data(path) as src, open(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, compress_chunk_size)
+        os.replace(tmp_path, output_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
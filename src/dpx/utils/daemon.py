@@ -0,0 +1,75 @@
+"""Protocol between the dpx client and 'dpx daemon'.
+
+Over the unix socket at DAEMON_SOCKET_PATH:
+
+client -> daemon
+    request: length prefixed json {"argv": [...], "prog": "...", "cwd": "...", "env": {...}}
+    stdin, stdout and stderr of the client, passed as file descriptors
+daemon -> client
+    pid of the process running the command (to forward Ctrl-C)
+    exit code of the command
+
+The command writes straight to the client's terminal through the passed
+file descriptors, so output streams back as it is printed.
+
+Only stdlib imports, the client must start fast.
+"""
+
+import json
+import socket
+import struct
+
+int_format = "!i"
+int_size = struct.calcsize(int_format)
+
+max_request_size = 1 << 20
+
+# stdin, stdout, stderr
+passed_fds = 3
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+    """Receive exactly size bytes, raises ConnectionError if the peer closes first."""
+
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed.")
+        data += chunk
+    return data
+
+
+def send_int(sock: socket.socket, value: int) -> None:
+    sock.sendall(struct.pack(int_format, value))
+
+
+def recv_int(sock: socket.socket) -> int:
+    return struct.unpack(int_format, recv_exactly(sock, int_size))[0]
+
+
+def send_request(sock: socket.socket, request: dict, fds: list[int]) -> None:
+    """Send a request with the client's file descriptors attached."""
+
+    body = json.dumps(request).encode()
+    message = struct.pack(int_format, len(body)) + body
+    sent = socket.send_fds(sock, [message], fds)
+    if sent < len(message):
+        sock.sendall(message[sent:])
+
+
+def recv_request(sock: socket.socket) -> tuple[dict, list[int]]:
+    """Receive a request and the file descriptors attached to it."""
+
+    message, fds, _, _ = socket.recv_fds(sock, max_request_size, passed_fds)
+    if len(message) < int_size:
+        message += recv_exactly(sock, int_size - len(message))
+
+    (size,) = struct.unpack(int_format, message[:int_size])
+    if size > max_request_size:
+        raise ValueError("Request too large.")
+
+    body = message[int_size:]
+    body += recv_exactly(sock, size - len(body))
+
+    return json.loads(body), fds
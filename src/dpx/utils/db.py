@@ -0,0 +1,388 @@
+"""Loading data files into a SQLite database, streamed row by row.
+
+some_project/
+    data/
+        db/
+            some_project.sqlite3    <- database
+        raw/
+            x.csv                   <- table x
+        interim/
+            x-copy.csv              <- table x_copy
+        processed/
+            y.parquet               <- table y
+
+Rows go from csv.reader, or from pyarrow dataset batches for .parquet and .feather,
+straight to executemany, no DataFrame is built, so memory stays flat whatever
+the size of the file. A compressed csv, x.csv.zst, is decompressed as it is read.
+
+dpx query reads files into TEMP tables instead, for one query, with only the
+columns it names and, for .parquet and .feather, its filters (see sql.py).
+
+Column affinities (INTEGER, REAL, TEXT) of a csv are inferred from a sample of rows.
+Values are inserted as text and SQLite converts those which fit the affinity,
+a value which does not is kept as text, nothing is lost. Empty fields are NULL.
+
+A table is dropped, created, loaded and indexed in one transaction,
+a load which fails leaves the previous table as it was.
+Indexes are built after the rows are in, which is faster than keeping them up to date.
+"""
+
+import csv
+import io
+import itertools
+import os
+import re
+import sqlite3
+from collections.abc import Iterable, Iterator, Sequence
+from pathlib import Path
+
+from src.dpx.utils.compress import data_name, data_suffix, open_data
+from src.dpx.utils.sniff import sniffed
+from src.dpx.utils.sql import Filter
+
+db_suffix = ".sqlite3"
+
+loaded_suffixes = [".csv", ".tsv", ".parquet", ".feather"]
+
+# Rows read to infer the affinity of each column
+affinity_sample_rows = 10_000
+
+# Rows per batch read from a .parquet file
+arrow_batch_rows = 64 * 1024
+
+# The database is rebuilt from the csv files, a crash costs a reload, not data
+load_pragmas = {
+    "synchronous": "OFF",
+    "temp_store": "MEMORY",
+    # KiB
+    "cache_size": "-262144",
+    "locking_mode": "EXCLUSIVE",
+}
+
+# Columns indexed after a load, with those asked for
+key_column_pattern = re.compile(r"(^|_)id$", re.IGNORECASE)
+
+
+def quoted(name: str) -> str:
+    """A SQL identifier, whatever characters name has."""
+
+    return '"' + name.replace('"', '""') + '"'
+
+
+def table_name(path: Path) -> str:
+    """Table of a csv, its stem as an identifier, 'x-copy.csv' and 'x-copy.csv.zst' to 'x_copy'."""
+
+    name = re.sub(r"\W+", "_", os.path.splitext(data_name(path))[0]).strip("_") or "table"
+    return f"t_{name}" if name[0].isdigit() else name
+
+
+def column_names(header: list[str]) -> list[str]:
+    """Header fields as column names, unique, 'column_3' for an empty one."""
+
+    names: list[str] = []
+    seen: set[str] = set()
+    for i, field in enumerate(header, start=1):
+        name = field.strip() or f"column_{i}"
+        unique, n = name, 2
+        while unique.lower() in seen:
+            unique, n = f"{name}_{n}", n + 1
+        seen.add(unique.lower())
+        names.append(unique)
+    return names
+
+
+def affinity(values: list[str]) -> str:
+    """INTEGER, REAL or TEXT, the narrowest holding every non-empty value."""
+
+    values = [value for value in values if value]
+    if not values:
+        return "TEXT"
+
+    for name, parse in [("INTEGER", int), ("REAL", float)]:
+        try:
+            for value in values:
+                parse(value)
+        except ValueError:
+            continue
+        return name
+    return "TEXT"
+
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    """Open a database for loading, transactions left to load_csv."""
+
+    connection = sqlite3.connect(db_path, isolation_level=None)
+    for pragma, value in load_pragmas.items():
+        connection.execute(f"PRAGMA {pragma} = {value}")
+    return connection
+
+
+def padded(rows: Iterable[list[str]], width: int) -> Iterator[list[str]]:
+    """Short rows padded and long rows cut to width, as pandas does."""
+
+    for row in rows:
+        if len(row) != width:
+            row = (row + [""] * width)[:width]
+        yield row
+
+
+def replace_table(
+    connection: sqlite3.Connection,
+    table: str,
+    columns: list[tuple[str, str]],
+    rows: Iterable[Sequence],
+    index_columns: list[str],
+    empty_as_null: bool = False,
+    schema: str = "main",
+) -> int:
+    """Drop, create, fill and index table in one transaction.
+
+    columns: (name, affinity)
+    empty_as_null: set empty strings to NULL once the rows are in
+    schema: main, or temp for a table of this connection only
+    Returns the number of rows inserted.
+
+    A temp table is read by one query, it is not indexed,
+    SQLite indexes what a join needs itself.
+    """
+
+    names = [quoted(name) for name, _ in columns]
+    definitions = ", ".join(f"{name} {column_affinity}" for name, (_, column_affinity) in zip(names, columns))
+    placeholders = ", ".join("?" for _ in columns)
+    target = f"{schema}.{quoted(table)}"
+
+    connection.execute("BEGIN")
+    try:
+        connection.execute(f"DROP TABLE IF EXISTS {target}")
+        connection.execute(f"CREATE TABLE {target} ({definitions})")
+        loaded = connection.executemany(f"INSERT INTO {target} VALUES ({placeholders})", rows).rowcount
+
+        # One pass after the insert is cheaper than NULLIF on every value bound
+        if empty_as_null:
+            connection.execute(
+                f"UPDATE {target} SET {', '.join(f"{name} = NULLIF({name}, '')" for name in names)}"
+                f" WHERE {' OR '.join(f"{name} = ''" for name in names)}"
+            )
+
+        for name, _ in columns if schema == "main" else []:
+            if name in index_columns or key_column_pattern.search(name):
+                index = quoted(f"idx_{table}__{name}")
+                connection.execute(f"CREATE INDEX {index} ON {quoted(table)} ({quoted(name)})")
+
+        connection.execute("COMMIT")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    return loaded
+
+
+def selected(names: list[str], columns: set[str] | None) -> list[int]:
+    """Positions of names in columns, lowercase, all of them if columns is None.
+
+    At least the first, a table has a column.
+    """
+
+    if columns is None:
+        return list(range(len(names)))
+    return [i for i, name in enumerate(names) if name.lower() in columns] or [0]
+
+
+def load_csv(
+    connection: sqlite3.Connection,
+    csv_path: Path,
+    table: str,
+    index_columns: list[str],
+    columns: set[str] | None = None,
+    schema: str = "main",
+) -> int:
+    """Replace table with the rows of a csv, read with its sniffed options.
+
+    index_columns are indexed, if the csv has them, as well as id columns.
+    columns: load only these, lowercase, see selected
+    Returns the number of rows loaded.
+
+    Rows are bound as the reader gives them, blank lines left out by filter,
+    a Python step per row would cost about a third of the load. A row of another width than the header makes
+    the load fail, it is then done again with every row padded.
+    """
+
+    options = sniffed(csv_path)
+
+    def opened() -> io.TextIOWrapper:
+        return io.TextIOWrapper(open_data(csv_path), encoding=options["encoding"], newline="")
+
+    def reader(f) -> Iterator[list[str]]:
+        # Blank lines are rows of no field, skipped as pandas does
+        return filter(None, csv.reader(f, delimiter=options["delimiter"], quotechar=options["quotechar"]))
+
+    with opened() as f:
+        rows = reader(f)
+        header = next(rows, None)
+        if header is None:
+            raise ValueError(f"'{csv_path.name}' is empty.")
+        sample = list(itertools.islice(rows, affinity_sample_rows))
+
+    names = column_names(header)
+    positions = selected(names, columns)
+    table_columns = [(names[i], affinity([row[i] for row in sample if i < len(row)])) for i in positions]
+
+    def load(pad: bool) -> int:
+        with opened() as f:
+            rows = reader(f)
+            next(rows, None)
+            if len(positions) < len(names):
+                rows = ([row[i] for i in positions] for row in padded(rows, len(names)))
+            elif pad:
+                rows = padded(rows, len(names))
+            return replace_table(
+                connection, table, table_columns, rows, index_columns, empty_as_null=True, schema=schema
+            )
+
+    try:
+        return load(pad=False)
+    except sqlite3.ProgrammingError:
+        # A row with more or fewer fields than the header
+        return load(pad=True)
+
+
+def arrow_filter(arrow_schema, filters: list[Filter], names: list[str]):
+    """pyarrow expression of the filters on columns of the schema of a type the value compares with.
+
+    None if there are none, others are left to SQLite.
+    """
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    positions = {name.lower(): i for i, name in enumerate(names)}
+    expression = None
+    for column, operator, value in filters:
+        i = positions.get(column.lower())
+        if i is None:
+            continue
+
+        field = arrow_schema.field(i)
+        if isinstance(value, str):
+            comparable = pa.types.is_string(field.type) or pa.types.is_large_string(field.type)
+        else:
+            comparable = pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+        if not comparable:
+            continue
+
+        try:
+            left, right = pc.field(field.name), pc.scalar(value)
+        except (pa.ArrowInvalid, OverflowError):
+            # An integer beyond int64
+            continue
+        term = {
+            "==": left == right,
+            "!=": left != right,
+            "<": left < right,
+            "<=": left <= right,
+            ">": left > right,
+            ">=": left >= right,
+        }[operator]
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def load_arrow(
+    connection: sqlite3.Connection,
+    path: Path,
+    table: str,
+    index_columns: list[str],
+    columns: set[str] | None = None,
+    filters: list[Filter] | None = None,
+    schema: str = "main",
+) -> int:
+    """Replace table with the rows of a .parquet or .feather file, batch by batch.
+
+    Affinities come from the arrow types. Decimals are inserted as floats,
+    other types sqlite3 cannot bind (dates, lists, ...) as text.
+    columns: load only these, lowercase, see selected
+    filters: load only the rows passing them, see arrow_filter,
+    parquet skips the row groups none of which can
+    Returns the number of rows loaded.
+    """
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(path, format="parquet" if path.suffix.lower() == ".parquet" else "feather")
+    names = column_names(dataset.schema.names)
+    positions = selected(names, columns)
+    scanner = dataset.scanner(
+        columns=[dataset.schema.field(i).name for i in positions],
+        filter=arrow_filter(dataset.schema, filters or [], names),
+        batch_size=arrow_batch_rows,
+    )
+    arrow_schema = scanner.projected_schema
+
+    def arrow_affinity(arrow_type: pa.DataType) -> str:
+        if pa.types.is_integer(arrow_type) or pa.types.is_boolean(arrow_type):
+            return "INTEGER"
+        if pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+            return "REAL"
+        if pa.types.is_binary(arrow_type) or pa.types.is_large_binary(arrow_type):
+            return "BLOB"
+        return "TEXT"
+
+    bound_as_is = {"INTEGER", "REAL", "BLOB"}
+    affinities = [arrow_affinity(field.type) for field in arrow_schema]
+    table_columns = [(names[i], column_affinity) for i, column_affinity in zip(positions, affinities)]
+
+    def rows() -> Iterator[tuple]:
+        for batch in scanner.to_batches():
+            arrays = [
+                pc.cast(array, pa.float64())
+                if pa.types.is_decimal(array.type)
+                else array
+                if affinity in bound_as_is or pa.types.is_string(array.type)
+                else pc.cast(array, pa.string())
+                for array, affinity in zip(batch.columns, affinities)
+            ]
+            yield from zip(*(array.to_pylist() for array in arrays))
+
+    return replace_table(connection, table, table_columns, rows(), index_columns, schema=schema)
+
+
+def load_file(
+    connection: sqlite3.Connection,
+    path: Path,
+    table: str,
+    index_columns: list[str],
+    columns: set[str] | None = None,
+    filters: list[Filter] | None = None,
+    schema: str = "main",
+) -> int:
+    """Replace table with the rows of a data file, see loaded_suffixes.
+
+    filters are applied to .parquet and .feather files, SQLite applies them to csv rows.
+    """
+
+    suffix = data_suffix(path)
+    if suffix in [".csv", ".tsv"]:
+        return load_csv(connection, path, table, index_columns, columns, schema)
+    if suffix in [".parquet", ".feather"]:
+        return load_arrow(connection, path, table, index_columns, columns, filters, schema)
+    raise ValueError(f"'{path.name}' cannot be loaded, only {', '.join(loaded_suffixes)} files.")
+
+
+def fetch(connection: sqlite3.Connection, sql: str, limit: int) -> tuple[list[str], list[tuple], bool]:
+    """Run sql, fetching rows as SQLite produces them, only limit of them.
+
+    Returns the columns, the rows, and whether there were more.
+    """
+
+    cursor = connection.execute(sql)
+    columns = [description[0] for description in cursor.description or []]
+    rows = cursor.fetchmany(limit + 1) if columns else []
+    return columns, rows[:limit], len(rows) > limit
+
+
+def has_table(connection: sqlite3.Connection, table: str) -> bool:
+    return (
+        connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+        is not None
+    )
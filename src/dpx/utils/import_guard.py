@@ -0,0 +1,91 @@
+"""Guard against filesystem scans at import time.
+
+Importing a dpx module must not list directories,
+e.g. building a ProjectManager at module level walks every group.
+
+Usage:
+    python -m src.dpx.utils.import_guard
+    dpx dev check-import-fs
+
+Patches os.listdir and os.scandir before importing any dpx module,
+then imports the app and every registered command module.
+Exits with 1 if a dpx module listed a directory while being imported.
+
+Only stdlib imports before the patch is installed.
+"""
+
+import importlib
+import os
+import sys
+import traceback
+from collections.abc import Callable
+from pathlib import Path
+
+dpx_src_dir = Path(__file__).parent.parent
+
+# Calls made from dpx source files
+# (function, caller "file:line", path argument)
+calls: list[tuple[str, str, str]] = []
+
+
+def _dpx_caller() -> str | None:
+    """The module level dpx statement that led to this call, if any."""
+
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        frame_path = Path(frame.filename)
+        if frame_path == Path(__file__) or frame.name != "<module>":
+            continue
+        if frame_path.is_relative_to(dpx_src_dir):
+            return f"{frame_path.relative_to(dpx_src_dir)}:{frame.lineno}"
+    return None
+
+
+def _counting(name: str, function: Callable) -> Callable:
+    def wrapper(*args, **kwargs):
+        caller = _dpx_caller()
+        if caller is not None:
+            path = str(args[0]) if args else "."
+            calls.append((name, caller, path))
+        return function(*args, **kwargs)
+
+    return wrapper
+
+
+def install() -> None:
+    os.listdir = _counting("os.listdir", os.listdir)
+    os.scandir = _counting("os.scandir", os.scandir)
+
+
+def import_all() -> list[str]:
+    """Import the app and every registered command module.
+
+    Returns the modules imported.
+    """
+
+    importlib.import_module("src.dpx.__main__")
+
+    from src.dpx.cli.utils.registry import lazy_table
+
+    module_names: list[str] = sorted({module_name for module_name, _ in lazy_table().values()})
+    for module_name in module_names:
+        importlib.import_module(module_name)
+
+    return ["src.dpx.__main__"] + module_names
+
+
+def main() -> None:
+    install()
+    module_names = import_all()
+
+    for name, caller, path in calls:
+        print(f"{caller}: {name}('{path}') at import time")
+
+    if calls:
+        print(f"{len(calls)} directory scan(s) while importing {len(module_names)} modules.")
+        sys.exit(1)
+
+    print(f"No directory scans while importing {len(module_names)} modules.")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ data-projects/
     dpx/
         src/
     dp-projects/
+        .dpx/
         main/
         playground/
 
@@ -12,9 +13,9 @@ Let:
 DP_DIR = data-projects/
 DPX_DIR = dpx/
 PROJECTS_DIR = projects/
+DPX_STATE_DIR = projects/.dpx/
 """
 
-from icecream import ic
 from pathlib import Path
 
 DPX_DIR = Path(__file__).parent.parent.parent.parent
@@ -26,13 +27,35 @@ PROJECTS_DIR = DP_DIR / "dp-projects"
 MAIN_DIR = PROJECTS_DIR / "main"
 PLAYGROUND_DIR = PROJECTS_DIR / "playground"
 
+# What dpx keeps next to the projects: catalog, indexes, ...
+DPX_STATE_DIR = PROJECTS_DIR / ".dpx"
+
+# Where 'dpx daemon' listens
+DAEMON_SOCKET_PATH = DPX_STATE_DIR / "daemon.sock"
+
+# Names served to shell completion
+NAMES_INDEX_DIR = DPX_STATE_DIR / "names"
+
+# Raw data shared by projects, see cli/utils/store.py
+STORE_DIR = PROJECTS_DIR / ".hidden" / "store"
+
+# Scaffold copied by 'dpx init', see cli/utils/template.py
+TEMPLATE_DIR = DPX_STATE_DIR / "template"
+
 
 def main() -> None:
+    from icecream import ic
+
     ic(DPX_DIR)
     ic(DP_DIR)
     ic(PROJECTS_DIR)
     ic(MAIN_DIR)
     ic(PLAYGROUND_DIR)
+    ic(DPX_STATE_DIR)
+    ic(DAEMON_SOCKET_PATH)
+    ic(NAMES_INDEX_DIR)
+    ic(STORE_DIR)
+    ic(TEMPLATE_DIR)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+"""First and last records of a text data file, read in constant memory.
+
+The file is memory mapped. head searches forward from its start and tail
+backward from its end, page by page, until they have n records,
+so both read a few pages whatever the size of the file.
+
+In a .csv a newline inside a quoted field does not end a record.
+A newline ends a record when the number of quotes before it is even.
+A well formed file ends outside quotes, so that is also when the number of
+quotes after it is even, and tail can tell without reading from the start.
+
+A compressed file (see compress.py) cannot be mapped or read backward.
+It is decompressed as a stream: head still stops after n records,
+tail reads it whole, keeping only the last n records in memory.
+"""
+
+import mmap
+import os
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from src.dpx.utils.compress import compression, open_data
+
+
+@contextmanager
+def mapped(path: Path) -> Iterator[mmap.mmap | None]:
+    """Read only map of a file, None if it is empty."""
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield None
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            yield m
+
+
+def decode(record: bytes, encoding: str = "utf-8") -> str:
+    return record.decode(encoding, errors="replace").removesuffix("\r")
+
+
+def stream_records(path: Path, quoted: bool = True, encoding: str = "utf-8") -> Iterator[str]:
+    """Records of a file, read from start to end, decompressed if it is compressed."""
+
+    with open_data(path) as f:
+        parts: list[bytes] = []
+        quotes = 0
+        for line in f:
+            parts.append(line)
+            if quoted:
+                quotes += line.count(b'"')
+                if quotes % 2 and line.endswith(b"\n"):
+                    continue
+
+            yield decode(b"".join(parts).removesuffix(b"\n"), encoding)
+            parts, quotes = [], 0
+
+        if parts:
+            yield decode(b"".join(parts), encoding)
+
+
+def head_records(path: Path, n: int, quoted: bool = True, encoding: str = "utf-8") -> list[str]:
+    """The first n records of a file, a header counting as one.
+
+    quoted: newlines inside double quotes do not end a record, as in a .csv
+    """
+
+    records: list[str] = []
+    if compression(path) is not None:
+        for record in stream_records(path, quoted, encoding):
+            if len(records) == n:
+                break
+            records.append(record)
+        return records
+
+    with mapped(path) as m:
+        if m is None:
+            return records
+
+        size = len(m)
+        start = pos = 0
+        quotes = 0
+        while len(records) < n and start < size:
+            newline = m.find(b"\n", pos)
+            end = size if newline == -1 else newline
+
+            if quoted:
+                quotes += m[pos:end].count(b'"')
+                if quotes % 2 and newline != -1:
+                    pos = newline + 1
+                    continue
+
+            records.append(decode(m[start:end], encoding))
+            start = pos = end + 1
+
+    return records
+
+
+def tail_records(path: Path, n: int, quoted: bool = True, encoding: str = "utf-8") -> tuple[list[str], bool]:
+    """The last n records of a file.
+
+    quoted: newlines inside double quotes do not end a record, as in a .csv
+
+    Returns the records, and whether the first of them is the first of the file
+    (a header, if the file has one).
+    """
+
+    records: list[str] = []
+    if compression(path) is not None:
+        last: deque[str] = deque(maxlen=n + 1)
+        last.extend(stream_records(path, quoted, encoding))
+        # With one record more than asked, the first is not the first of the file
+        from_start = len(last) <= n
+        if not from_start:
+            last.popleft()
+        return list(last), from_start
+
+    with mapped(path) as m:
+        if m is None:
+            return records, True
+
+        # The newline ending the last record does not start another
+        end = len(m)
+        if m[end - 1 : end] == b"\n":
+            end -= 1
+
+        record_end = pos = end
+        quotes = 0
+        newline = end
+        while len(records) < n:
+            newline = m.rfind(b"\n", 0, pos)
+            start = newline + 1
+
+            if quoted:
+                quotes += m[start:pos].count(b'"')
+                if quotes % 2 and newline != -1:
+                    pos = newline
+                    continue
+
+            records.append(decode(m[start:record_end], encoding))
+            if newline == -1:
+                break
+            record_end = pos = newline
+
+    records.reverse()
+    return records, newline == -1
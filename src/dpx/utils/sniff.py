@@ -0,0 +1,223 @@
+"""Reading options of csv files, sniffed once and kept in a sidecar next to each file.
+
+raw/
+    x.csv
+    .x.csv.sniff.json   <- sidecar
+
+A sample from the start of the file gives its encoding, its dialect
+(delimiter and quote) and a dtype map:
+    integer columns     the smallest integer type holding the sample
+    text columns        category, when few distinct values repeat
+
+The sidecar is valid while the size and mtime of the file are unchanged,
+and is copied with the file by dcp. A compressed file, x.csv.zst, is sniffed
+from the start of its data and pandas decompresses it as it reads.
+
+pandas wraps integers which do not fit a dtype given to read_csv, so integer
+columns are read as pandas infers them and downcast after, only where every
+value fits. pyarrow refuses them instead, csv_to_arrow then reads as inferred.
+
+Notebooks can read with the same options:
+    from src.dpx.utils.sniff import read_csv
+"""
+
+import codecs
+import csv
+import io
+import json
+import os
+from collections.abc import Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from src.dpx.utils.compress import data_suffix, open_data
+
+# pandas is imported where used, head and tail only read sidecars
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+sidecar_suffix = ".sniff.json"
+
+# Bump to sniff again files sniffed by an older dpx
+sniff_version = 1
+
+# Bytes and rows of the sample
+sample_bytes = 1024 * 1024
+sample_rows = 10_000
+
+# Tried in order, latin-1 decodes anything
+encodings = ["utf-8", "cp1252", "latin-1"]
+delimiters = ",;\t|"
+
+# A text column is a category when its distinct values are at most this share of the sample
+category_share = 0.5
+
+integer_types = ["int8", "int16", "int32", "int64"]
+
+# {"version", "size", "mtime_ns", "encoding", "delimiter", "quotechar", "dtypes": {column: dtype}}
+type Sniffed = dict[str, Any]
+
+
+def sidecar_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}{sidecar_suffix}")
+
+
+def load_sniffed(path: Path) -> Sniffed | None:
+    """The sidecar of a file, None if it has none or it is stale."""
+
+    try:
+        sniffed = json.loads(sidecar_path(path).read_text(encoding="utf-8"))
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(sniffed, dict) or sniffed.get("version") != sniff_version:
+        return None
+    if (sniffed.get("size"), sniffed.get("mtime_ns")) != (stat.st_size, stat.st_mtime_ns):
+        return None
+    return sniffed
+
+
+def save_sniffed(path: Path, sniffed: Sniffed) -> None:
+    """Write a sidecar, quietly skipped where the folder is read only."""
+
+    stat = os.stat(path)
+    sniffed = sniffed | {"version": sniff_version, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    target = sidecar_path(path)
+    tmp_path = target.with_name(f"{target.name}.tmp")
+    try:
+        tmp_path.write_text(json.dumps(sniffed), encoding="utf-8")
+        os.replace(tmp_path, target)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+
+
+def sample_text(sample: bytes) -> tuple[str, str]:
+    """Encoding and text of a sample, cut after its last whole line."""
+
+    if b"\n" in sample:
+        sample = sample[: sample.rindex(b"\n") + 1]
+
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig", sample[len(codecs.BOM_UTF8) :].decode("utf-8", errors="replace")
+
+    for encoding in encodings:
+        try:
+            return encoding, sample.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return encodings[-1], sample.decode(encodings[-1], errors="replace")
+
+
+def splits_evenly(text: str, delimiter: str, records: int = 50) -> bool:
+    """Whether the first records of text all have the same number, above one, of fields."""
+
+    reader = csv.reader(io.StringIO(text, newline=""), delimiter=delimiter)
+    counts = {len(row) for _, row in zip(range(records), reader) if row}
+    return len(counts) == 1 and counts.pop() > 1
+
+
+def sniff(path: Path) -> Sniffed:
+    """Sniff a file from a sample and write its sidecar."""
+
+    import pandas as pd
+    from pandas.api.types import is_string_dtype
+
+    with open_data(path) as f:
+        sample = f.read(sample_bytes)
+
+    encoding, text = sample_text(sample)
+
+    # The Sniffer can be misled by delimiters inside fields, the usual one is kept if it works
+    delimiter, quotechar = "\t" if data_suffix(path) == ".tsv" else ",", '"'
+    if not splits_evenly(text, delimiter):
+        try:
+            dialect = csv.Sniffer().sniff(text[: 64 * 1024], delimiters=delimiters)
+            delimiter, quotechar = dialect.delimiter, dialect.quotechar
+        except csv.Error:
+            pass
+
+    dtypes: dict[str, str] = {}
+    try:
+        df = pd.read_csv(io.StringIO(text), sep=delimiter, quotechar=quotechar, nrows=sample_rows)
+    except (ValueError, pd.errors.ParserError):
+        df = pd.DataFrame()
+
+    for column in df.columns:
+        series = df[column]
+        if series.dtype.kind in "iu":
+            low, high = int(series.min()), int(series.max())
+            dtypes[str(column)] = next(t for t in integer_types if fits(low, high, t))
+        elif is_string_dtype(series) and len(series) and series.nunique() <= category_share * len(series):
+            dtypes[str(column)] = "category"
+
+    sniffed: Sniffed = {"encoding": encoding, "delimiter": delimiter, "quotechar": quotechar, "dtypes": dtypes}
+    save_sniffed(path, sniffed)
+    return sniffed
+
+
+def sniffed(path: Path) -> Sniffed:
+    """The sidecar of a file, sniffing it first if needed."""
+
+    return load_sniffed(path) or sniff(path)
+
+
+def copy_sidecar(src: Path, dst: Path) -> None:
+    """Give a byte for byte copy of src the sidecar of src."""
+
+    sniffed = load_sniffed(src)
+    if sniffed is not None:
+        save_sniffed(dst, sniffed)
+
+
+def fits(low: int, high: int, dtype: str) -> bool:
+    import numpy as np
+
+    info = np.iinfo(dtype)
+    return info.min <= low and high <= info.max
+
+
+def downcast(df: "DataFrame", dtypes: dict[str, str]) -> "DataFrame":
+    """Integer columns as their sniffed type, where every value fits."""
+
+    for column, dtype in dtypes.items():
+        if dtype not in integer_types or column not in df.columns:
+            continue
+
+        series = df[column]
+        if series.dtype.kind in "iu" and (series.empty or fits(int(series.min()), int(series.max()), dtype)):
+            df[column] = series.astype(dtype)
+    return df
+
+
+def pandas_options(sniffed: Sniffed) -> dict[str, Any]:
+    """read_csv keyword arguments, integer types left to downcast."""
+
+    return {
+        "sep": sniffed["delimiter"],
+        "quotechar": sniffed["quotechar"],
+        "encoding": sniffed["encoding"],
+        "dtype": {column: dtype for column, dtype in sniffed["dtypes"].items() if dtype == "category"},
+    }
+
+
+def read_csv_chunks(path: Path, chunksize: int) -> Iterator["DataFrame"]:
+    """Chunks of a csv read with its sniffed options."""
+
+    import pandas as pd
+
+    options = sniffed(path)
+    with pd.read_csv(path, chunksize=chunksize, **pandas_options(options)) as chunks:
+        for chunk in chunks:
+            yield downcast(chunk, options["dtypes"])
+
+
+def read_csv(path: Path | str, **kwargs) -> "DataFrame":
+    """pandas.read_csv with the sniffed options of the file, kwargs taking precedence."""
+
+    import pandas as pd
+
+    path = Path(path)
+    options = sniffed(path)
+    return downcast(pd.read_csv(path, **(pandas_options(options) | kwargs)), options["dtypes"])
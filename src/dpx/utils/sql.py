@@ -0,0 +1,211 @@
+"""What a SQL query reads, found without running it, for dpx query.
+
+SELECT region, amount FROM train WHERE amount > 10 AND region = 'north'
+                           ^^^^^       ^^^^^^^^^^^     ^^^^^^^^^^^^^^^^
+                           table       filters, applied while the file is read
+
+Tables are the names in FROM and JOIN positions only, columns are every
+name of the query (a superset of those it reads, which is enough to leave
+the others out). Filters are pushed down only where they cannot change
+the result: the query reads one table once, and each filter is a column
+compared to a literal in a WHERE of ANDs. SQLite applies every filter again.
+"""
+
+import re
+
+type Token = tuple[str, str]
+# (column, operator, value)
+type Filter = tuple[str, str, int | float | str]
+
+token_pattern = re.compile(
+    r"""\s+|--[^\n]*|/\*.*?(?:\*/|$)
+    |'(?P<string>(?:[^']|'')*)'
+    |"(?P<quoted>(?:[^"]|"")*)"|`(?P<backquoted>(?:[^`]|``)*)`|\[(?P<bracketed>[^\]]*)\]
+    |(?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)
+    |(?P<word>\w+)
+    |(?P<op><=|>=|<>|!=|==|\|\||\S)""",
+    re.VERBOSE | re.DOTALL,
+)
+
+# Words after a table which are not its alias
+clause_words = {
+    "WHERE", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS", "NATURAL", "OUTER", "ON", "USING",
+    "GROUP", "ORDER", "LIMIT", "HAVING", "WINDOW", "UNION", "EXCEPT", "INTERSECT", "INDEXED", "NOT",
+}  # fmt: skip
+
+# Words ending a WHERE
+where_end_words = {"GROUP", "ORDER", "LIMIT", "HAVING", "WINDOW", "UNION", "EXCEPT", "INTERSECT"}
+
+# SQL comparison operators to those of pyarrow.compute
+filter_operators = {"=": "==", "==": "==", "!=": "!=", "<>": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+
+
+def tokens(sql: str) -> list[Token]:
+    """(kind, value) of each token, comments and spaces left out.
+
+    kinds: word, name (a quoted identifier), string, number, op
+    """
+
+    found: list[Token] = []
+    for match in token_pattern.finditer(sql):
+        kind = match.lastgroup
+        if kind is None:
+            continue
+        value = match.group(kind)
+        if kind == "string":
+            value = value.replace("''", "'")
+        elif kind in ["quoted", "backquoted", "bracketed"]:
+            value = value.replace('""', '"').replace("``", "`")
+            kind = "name"
+        found.append((kind, value))
+    return found
+
+
+def is_keyword(token: Token, *words: str) -> bool:
+    return token[0] == "word" and token[1].upper() in words
+
+
+def is_identifier(token: Token) -> bool:
+    return token[0] == "name" or (token[0] == "word" and token[1].upper() not in clause_words)
+
+
+def closing(sql_tokens: list[Token], i: int) -> int:
+    """Position of the parenthesis closing the one at i, the end if it is not closed."""
+
+    depth = 0
+    for j in range(i, len(sql_tokens)):
+        if sql_tokens[j] == ("op", "("):
+            depth += 1
+        elif sql_tokens[j] == ("op", ")"):
+            depth -= 1
+            if depth == 0:
+                return j
+    return len(sql_tokens)
+
+
+def table_reference(sql_tokens: list[Token], i: int) -> tuple[str | None, str | None, int]:
+    """Table and alias of the table reference at i, and where it ends.
+
+    None for a subquery, a table function or a table of another schema.
+    """
+
+    table: str | None = None
+    if i < len(sql_tokens) and is_identifier(sql_tokens[i]):
+        table = sql_tokens[i][1]
+        i += 1
+        if i < len(sql_tokens) and sql_tokens[i] == ("op", "."):
+            table, i = None, i + 2
+    elif i >= len(sql_tokens) or sql_tokens[i] != ("op", "("):
+        return None, None, i
+
+    # The subquery or the arguments of a table function
+    if i < len(sql_tokens) and sql_tokens[i] == ("op", "("):
+        table, i = None, closing(sql_tokens, i) + 1
+
+    alias = None
+    if i < len(sql_tokens) and is_keyword(sql_tokens[i], "AS"):
+        i += 1
+    if i < len(sql_tokens) and is_identifier(sql_tokens[i]):
+        alias = sql_tokens[i][1]
+        i += 1
+    return table, alias, i
+
+
+def from_tables(sql_tokens: list[Token]) -> list[str]:
+    """Names in FROM and JOIN positions, in order, repeated as often as they are read."""
+
+    tables: list[str] = []
+    for i, token in enumerate(sql_tokens):
+        if not is_keyword(token, "FROM", "JOIN"):
+            continue
+
+        j = i + 1
+        while True:
+            table, _, j = table_reference(sql_tokens, j)
+            if table is not None:
+                tables.append(table)
+            # FROM a, b lists more tables
+            if not (is_keyword(token, "FROM") and j < len(sql_tokens) and sql_tokens[j] == ("op", ",")):
+                break
+            j += 1
+    return tables
+
+
+def referenced_columns(sql_tokens: list[Token]) -> set[str] | None:
+    """Names of the query, lowercase, None if it may read every column (a * other than COUNT(*))."""
+
+    for i, token in enumerate(sql_tokens):
+        if token == ("op", "*") and not (
+            0 < i < len(sql_tokens) - 1 and sql_tokens[i - 1] == ("op", "(") and sql_tokens[i + 1] == ("op", ")")
+        ):
+            return None
+    return {value.lower() for kind, value in sql_tokens if kind in ["word", "name"]}
+
+
+def literal(sql_tokens: list[Token]) -> int | float | str | None:
+    """Value of a string or number literal, negative numbers too."""
+
+    sign = 1
+    if len(sql_tokens) == 2 and sql_tokens[0] == ("op", "-"):
+        sign, sql_tokens = -1, sql_tokens[1:]
+    if len(sql_tokens) != 1:
+        return None
+
+    kind, value = sql_tokens[0]
+    if kind == "string" and sign == 1:
+        return value
+    if kind == "number":
+        number = int(value) if value.isdigit() else float(value)
+        return sign * number
+    return None
+
+
+def pushed_filters(sql_tokens: list[Token]) -> list[Filter]:
+    """Filters of the WHERE of a query reading one table once, see the module docstring."""
+
+    if sum(is_keyword(token, "FROM") for token in sql_tokens) != 1:
+        return []
+    if any(is_keyword(token, "JOIN", "WITH", "BETWEEN", "CASE") for token in sql_tokens):
+        return []
+
+    start = next(i for i, token in enumerate(sql_tokens) if is_keyword(token, "FROM"))
+    table, alias, i = table_reference(sql_tokens, start + 1)
+    if table is None or i >= len(sql_tokens) or not is_keyword(sql_tokens[i], "WHERE"):
+        return []
+
+    # Terms of the WHERE at its own depth, split on AND
+    terms: list[list[Token]] = [[]]
+    depth = 0
+    for token in sql_tokens[i + 1 :]:
+        if token == ("op", "("):
+            depth += 1
+        elif token == ("op", ")"):
+            depth -= 1
+            if depth < 0:
+                break
+        elif depth == 0:
+            if is_keyword(token, *where_end_words) or token == ("op", ";"):
+                break
+            if is_keyword(token, "OR"):
+                return []
+            if is_keyword(token, "AND"):
+                terms.append([])
+                continue
+        terms[-1].append(token)
+
+    qualifiers = {name.lower() for name in [table, alias] if name is not None}
+    filters: list[Filter] = []
+    for term in terms:
+        # table.column
+        if len(term) > 2 and term[1] == ("op", ".") and term[0][1].lower() in qualifiers:
+            term = term[2:]
+        if (
+            len(term) < 3
+            or term[0][0] not in ["word", "name"]
+            or term[1] not in [("op", op) for op in filter_operators]
+        ):
+            continue
+        value = literal(term[2:])
+        if value is not None:
+            filters.append((term[0][1], filter_operators[term[1][1]], value))
+    return filters
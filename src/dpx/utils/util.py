@@ -2,28 +2,79 @@
 Util functions that could be used in other programs.
 """
 
+import contextlib
+import errno
 import os
 import random
+import re
+import shutil
 import string
-from typing import Dict
-
-import nbformat as nbf
-import pandas as pd
-from icecream import ic
-from nbformat import NotebookNode
-from pandas import DataFrame, Series
+import threading
+import time
+import zlib
+from collections import Counter
+from collections.abc import Callable
 from pathlib import Path
-from rich.table import Table
+from typing import TYPE_CHECKING, BinaryIO
 
+from src.dpx.utils.compress import data_name
 from src.dpx.utils.paths import PROJECTS_DIR, PLAYGROUND_DIR
+from src.dpx.utils.sniff import integer_types, read_csv_chunks, sniffed
+
+# pandas, nbformat and rich are imported where used to keep startup fast
+if TYPE_CHECKING:
+    from zipfile import ZipFile, ZipInfo
+
+    from pandas import DataFrame
+    from rich.table import Table
 
 
 # copy_attachment = "-copy"
 random_string_length = 6
 
+# Rows per sheet in .xlsx, header included
+excel_max_rows = 1_048_576
+# Rows of a csv held in memory at once while converting
+csv_chunk_rows = 50_000
+# Peak memory of one csv_to_excel, for sizing process pools
+csv_to_excel_memory = 256 * 1024 * 1024
+
+# Bytes of csv read per record batch when writing parquet or feather,
+# column types are inferred from the first batch
+arrow_block_size = 16 * 1024 * 1024
+arrow_compression = "zstd"
+columnar_formats = ["parquet", "feather"]
+
+# How copy_file duplicates a file
+copy_modes = ["auto", "reflink", "hardlink", "copy"]
+# ioctl sharing the extents of one file with another, linux/fs.h
+FICLONE = 0x40049409
+# Errors meaning a faster copy is unsupported here, not that the copy failed
+unsupported_copy_errnos = {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTTY, errno.EBADF}
+
+# Bytes read or written at once while extracting or checking a zip member
+zip_chunk_size = 1024 * 1024
+# A zip member is written through no symlink, O_NOFOLLOW is not on every platform
+zip_open_flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_NOFOLLOW", 0)
+
+# Seconds after a change within which an mtime is not trusted, see settled_mtime_ns
+racy_seconds = 2
+
 type Tree = dict[str, None | Tree]
 
 
+def settled_mtime_ns(mtime_ns: int) -> int:
+    """mtime_ns, or -1 if it is within racy_seconds of now.
+
+    Filesystems with coarse mtimes could hide a second change in the same tick,
+    -1 matches no mtime so what is cached with it is checked again next time.
+    """
+
+    if time.time_ns() - mtime_ns < racy_seconds * 1_000_000_000:
+        return -1
+    return mtime_ns
+
+
 def random_string(length: int = random_string_length) -> str:
     """Generate any random string."""
 
@@ -36,24 +87,478 @@ def random_string(length: int = random_string_length) -> str:
     return output
 
 
-def csv_to_excel(csv_file: Path) -> Path:
+def csv_to_excel(
+    csv_file: Path,
+    *,
+    chunk_rows: int = csv_chunk_rows,
+    rows_per_sheet: int = excel_max_rows,
+    sheets_per_workbook: int | None = None,
+) -> list[Path]:
     """Converts a .csv to an .xlsx within the same dir.
-    Returns the path of the .xlsx file
+    Returns the paths of the .xlsx files, in order.
+
+    Streams: the csv is read chunk_rows rows at a time, with its sniffed options
+    (see sniff.py), and written through openpyxl's write-only mode,
+    so memory stays flat whatever the size of the csv.
+
+    A sheet holds at most rows_per_sheet rows, header included,
+    then rows continue in a new sheet: Sheet1, Sheet2, ...
+    With sheets_per_workbook, rows continue in a new workbook after that many sheets:
+    file.xlsx, file-2.xlsx, ...
+    """
+
+    if rows_per_sheet < 2:
+        raise ValueError(f"'{rows_per_sheet}' rows per sheet leaves no room for data.")
+
+    from openpyxl import Workbook
+
+    stem, _ = os.path.splitext(data_name(csv_file))
+
+    xlsx_paths: list[Path] = []
+    workbook: Workbook | None = None
+    sheet = None
+    sheet_rows = rows_per_sheet
+
+    def next_sheet(header: list[str]) -> None:
+        nonlocal workbook, sheet, sheet_rows
+
+        if workbook is None or (sheets_per_workbook is not None and len(workbook.worksheets) >= sheets_per_workbook):
+            if workbook is not None:
+                workbook.save(xlsx_paths[-1])
+            workbook = Workbook(write_only=True)
+            suffix = "" if not xlsx_paths else f"-{len(xlsx_paths) + 1}"
+            xlsx_paths.append(csv_file.parent / f"{stem}{suffix}.xlsx")
+
+        sheet = workbook.create_sheet(f"Sheet{len(workbook.worksheets) + 1}")
+        sheet.append(header)
+        sheet_rows = 1
+
+    header: list[str] = []
+    for chunk in read_csv_chunks(csv_file, chunk_rows):
+        header = [str(column) for column in chunk.columns]
+
+        # Empty cells, as to_excel writes NaN
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+
+        for row in chunk.itertuples(index=False, name=None):
+            if sheet_rows >= rows_per_sheet:
+                next_sheet(header)
+            sheet.append(row)
+            sheet_rows += 1
+
+    # A csv with a header only
+    if workbook is None:
+        next_sheet(header)
+
+    workbook.save(xlsx_paths[-1])
+
+    return xlsx_paths
+
+
+def csv_to_arrow(
+    csv_file: Path,
+    output_format: str,
+    output_path: Path | None = None,
+    compression: str = arrow_compression,
+) -> Path:
+    """Converts a .csv to a .parquet or .feather, by default within the same dir.
+    Returns the path of the written file.
+
+    Streams: pyarrow's csv reader yields record batches of arrow_block_size bytes,
+    each written to the output as it is read, so memory stays flat.
+
+    The csv is read with its sniffed dialect, encoding and integer types (see sniff.py).
+    If a value does not fit them, the file is written again with types inferred
+    from the first batch, then with integer columns as floats,
+    then with every column as text.
+
+    pyarrow is optional: pip install 'dpx[columnar]'
+    """
+
+    try:
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+        from pyarrow import ipc
+        from pyarrow import parquet as pq
+    except ImportError as e:
+        raise ImportError(f"'{output_format}' output needs pyarrow: pip install 'dpx[columnar]'") from e
+
+    if output_format not in columnar_formats:
+        raise ValueError(f"'{output_format}' is not a columnar format.")
+
+    if output_path is None:
+        stem, _ = os.path.splitext(data_name(csv_file))
+        output_path = csv_file.parent / f"{stem}.{output_format}"
+    tmp_path = output_path.parent / f".{output_path.name}.tmp"
+
+    options = sniffed(csv_file)
+    # pyarrow skips a utf-8 BOM itself, other encodings are transcoded
+    encoding = "utf8" if options["encoding"] in ["utf-8", "utf-8-sig"] else options["encoding"]
+    read_options = pa_csv.ReadOptions(block_size=arrow_block_size, encoding=encoding)
+    parse_options = pa_csv.ParseOptions(
+        delimiter=options["delimiter"],
+        quote_char=options["quotechar"],
+        newlines_in_values=True,
+    )
+    sniffed_types = {
+        column: getattr(pa, dtype)() for column, dtype in options["dtypes"].items() if dtype in integer_types
+    }
+
+    def write(column_types: dict) -> None:
+        reader = pa_csv.open_csv(
+            csv_file,
+            read_options=read_options,
+            parse_options=parse_options,
+            convert_options=pa_csv.ConvertOptions(column_types=column_types),
+        )
+
+        if output_format == "parquet":
+            with pq.ParquetWriter(tmp_path, reader.schema, compression=compression) as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+            return
+
+        options = ipc.IpcWriteOptions(compression=compression)
+        with pa.OSFile(str(tmp_path), "wb") as sink, ipc.new_file(sink, reader.schema, options=options) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+
+    def widened(schema, to_string: bool) -> dict:
+        if to_string:
+            return {field.name: pa.string() for field in schema}
+        return {field.name: pa.float64() for field in schema if pa.types.is_integer(field.type)}
+
+    def write_inferred() -> None:
+        try:
+            write({})
+        except pa.ArrowInvalid:
+            schema = pa_csv.open_csv(csv_file, read_options=read_options, parse_options=parse_options).schema
+            try:
+                write(widened(schema, to_string=False))
+            except pa.ArrowInvalid:
+                write(widened(schema, to_string=True))
+
+    try:
+        if sniffed_types:
+            try:
+                write(sniffed_types)
+            except pa.ArrowInvalid:
+                write_inferred()
+        else:
+            write_inferred()
+        os.replace(tmp_path, output_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    return output_path
+
+
+def csv_to_parquet(csv_file: Path) -> list[Path]:
+    """Converts a .csv to a zstd compressed .parquet within the same dir."""
+
+    return [csv_to_arrow(csv_file, "parquet")]
+
+
+def csv_to_feather(csv_file: Path) -> list[Path]:
+    """Converts a .csv to a zstd compressed .feather (arrow ipc) within the same dir."""
+
+    return [csv_to_arrow(csv_file, "feather")]
+
+
+# Output format: converter returning the written files
+csv_converters: dict[str, Callable[[Path], list[Path]]] = {
+    "xlsx": csv_to_excel,
+    "parquet": csv_to_parquet,
+    "feather": csv_to_feather,
+}
+
+
+def reflink(src_fd: int, dst_fd: int) -> None:
+    """Make dst share the data of src, copy-on-write (btrfs, XFS, bcachefs, ...).
+    Raises OSError where the filesystem or platform cannot.
+    """
+
+    try:
+        import fcntl
+    except ImportError as e:
+        raise OSError(errno.EOPNOTSUPP, "Reflinks need linux.") from e
+
+    fcntl.ioctl(dst_fd, FICLONE, src_fd)
+
+
+def copy_range(src_fd: int, dst_fd: int) -> int:
+    """Copy with os.copy_file_range, within the kernel.
+    The filesystem may share extents instead (NFS server-side copy, XFS, btrfs).
+
+    Returns the bytes copied.
+    """
+
+    if not hasattr(os, "copy_file_range"):
+        raise OSError(errno.ENOSYS, "copy_file_range is not available.")
+
+    copied = 0
+    while n := os.copy_file_range(src_fd, dst_fd, 1 << 30):
+        copied += n
+    return copied
+
+
+def copy_file(src: Path, dst: Path, mode: str = "auto") -> str:
+    """Copies src to dst, replacing dst.
+
+    mode:
+        reflink     copy-on-write clone, fails where unsupported
+        hardlink    dst is the same file as src, editing one edits both
+        copy        a full copy
+        auto        reflink, else copy_file_range, else a full copy
+
+    Returns how the file was copied: reflink, hardlink, copy_file_range or copy.
+    """
+
+    if mode not in copy_modes:
+        raise ValueError(f"'{mode}' is not a copy mode, choose from: {copy_modes}.")
+
+    # Never write through an old hardlink into src
+    dst.unlink(missing_ok=True)
+
+    if mode == "hardlink":
+        os.link(src, dst)
+        return "hardlink"
+
+    if mode == "copy":
+        shutil.copyfile(src, dst)
+        return "copy"
+
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            return copy_fd(fsrc, fdst, mode)
+    except BaseException:
+        # No empty or partial copy left behind
+        dst.unlink(missing_ok=True)
+        raise
+
+
+def copy_fd(fsrc: BinaryIO, fdst: BinaryIO, mode: str) -> str:
+    """The reflink and auto modes of copy_file, between open files."""
+
+    try:
+        reflink(fsrc.fileno(), fdst.fileno())
+        return "reflink"
+    except OSError as e:
+        if mode == "reflink":
+            raise OSError(e.errno, f"'{fsrc.name}' cannot be reflinked to '{fdst.name}': {e.strerror}.") from e
+        if e.errno not in unsupported_copy_errnos:
+            raise
+
+    try:
+        # Some filesystems (FUSE, procfs, network mounts) copy nothing and return 0 as if done
+        if copy_range(fsrc.fileno(), fdst.fileno()) >= os.fstat(fsrc.fileno()).st_size:
+            return "copy_file_range"
+    except OSError as e:
+        if e.errno not in unsupported_copy_errnos:
+            raise
+    fsrc.seek(0)
+    fdst.seek(0)
+    fdst.truncate()
+
+    shutil.copyfileobj(fsrc, fdst)
+    return "copy"
+
+
+def copy_tree(src: Path, dst: Path, mode: str = "auto", workers: int | None = None) -> Counter[str]:
+    """Copies a directory tree into dst, each file with copy_file.
+
+    Folders are made first, then files are copied by a pool of threads,
+    overlapping the open, copy and close of many small files.
+    workers=1 copies in this thread. Symlinks are copied as symlinks.
+
+    Returns how many files were copied each way, see copy_file.
     """
 
-    stem, _ = os.path.splitext(csv_file.name)
-    xlsx_filename: str = f"{stem}.xlsx"
-    xlsx_path = csv_file.parent / xlsx_filename
+    if mode not in copy_modes:
+        raise ValueError(f"'{mode}' is not a copy mode, choose from: {copy_modes}.")
+
+    # Plain strings, a tree can hold 100k files
+    src_root, dst_root = str(src), str(dst)
+    files: list[tuple[str, str]] = []
+    how: Counter[str] = Counter()
+
+    def copy_symlink(src_path: str, dst_path: str) -> None:
+        if os.path.lexists(dst_path):
+            os.unlink(dst_path)
+        os.symlink(os.readlink(src_path), dst_path)
+        how["symlink"] += 1
+
+    os.makedirs(dst_root, exist_ok=True)
+    # Symlinked folders are listed in dirnames but not walked into
+    for root, dirnames, filenames in os.walk(src_root):
+        target = dst_root + root[len(src_root) :]
+        for name in dirnames:
+            src_path, dst_path = os.path.join(root, name), os.path.join(target, name)
+            if os.path.islink(src_path):
+                copy_symlink(src_path, dst_path)
+            else:
+                os.makedirs(dst_path, exist_ok=True)
+        for name in filenames:
+            src_path, dst_path = os.path.join(root, name), os.path.join(target, name)
+            if os.path.islink(src_path):
+                copy_symlink(src_path, dst_path)
+            else:
+                files.append((src_path, dst_path))
+
+    def copy(pair: tuple[str, str]) -> str:
+        return copy_file(Path(pair[0]), Path(pair[1]), mode)
+
+    if workers == 1:
+        how.update(map(copy, files))
+        return how
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        how.update(executor.map(copy, files))
+    return how
+
+
+def zip_member_path(dst_root: str, name: str) -> str:
+    """Where a zip member is extracted, refusing names which would escape dst_root."""
+
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ["", "."]]
+    # A drive, 'C:/x' from an archive made on Windows, 'C:x' only where the platform has drives
+    if (
+        not parts
+        or name.startswith(("/", "\\"))
+        or ".." in parts
+        or re.fullmatch(r"[A-Za-z]:", parts[0])
+        or os.path.splitdrive(parts[0])[0]
+    ):
+        raise ValueError(f"'{name}' would be extracted outside of '{dst_root}'.")
+    return os.path.join(dst_root, *parts)
+
+
+def file_crc32(path: str) -> int:
+    crc = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(zip_chunk_size):
+            crc = zlib.crc32(chunk, crc)
+    return crc
 
-    df = pd.read_csv(csv_file)
-    df.to_excel(xlsx_path, index=False)
 
-    return xlsx_path
+def extract_zip(zip_path: Path, dst: Path, workers: int | None = None, skip_existing: bool = True) -> Counter[str]:
+    """Extracts a zip into dst, members decompressed by a pool of threads.
 
+    Every member name is checked before anything is written, an archive with
+    a member outside dst ('../x', '/x', 'C:/x') is refused whole.
+    A symlink already at the path of a member is replaced, not written through.
 
-def df_to_table(df: DataFrame) -> Table:
+    Members stream straight to their final path, nothing is staged, and a
+    member which fails is removed.
+    With skip_existing, a file already matching the size and CRC of its member is kept.
+
+    Returns how many members were extracted and skipped.
+    """
+
+    import zipfile
+
+    dst_root = os.path.realpath(dst)
+    how: Counter[str] = Counter()
+
+    with zipfile.ZipFile(zip_path) as zf:
+        members = zf.infolist()
+
+    targets = [(member, zip_member_path(dst_root, member.filename)) for member in members]
+
+    # Folders first, so the threads only write files
+    os.makedirs(dst_root, exist_ok=True)
+    files: list[tuple[ZipInfo, str]] = []
+    for member, target in targets:
+        folder = target if member.is_dir() else os.path.dirname(target)
+        os.makedirs(folder, exist_ok=True)
+        # A symlink already in dst could lead outside it
+        real_folder = os.path.realpath(folder)
+        if real_folder != dst_root and not real_folder.startswith(dst_root + os.sep):
+            raise ValueError(f"'{member.filename}' would be extracted outside of '{dst_root}'.")
+        if not member.is_dir():
+            files.append((member, target))
+
+    # ZipFile reads are not safe to share between threads, each has its own
+    local = threading.local()
+    handles: list[ZipFile] = []
+
+    def extract(item: tuple["ZipInfo", str]) -> str:
+        member, target = item
+
+        if os.path.islink(target):
+            os.unlink(target)
+
+        if skip_existing:
+            try:
+                if os.path.getsize(target) == member.file_size and file_crc32(target) == member.CRC:
+                    return "skipped"
+            except OSError:
+                pass
+
+        if not hasattr(local, "zf"):
+            local.zf = zipfile.ZipFile(zip_path)
+            handles.append(local.zf)
+
+        try:
+            with local.zf.open(member) as source, open(os.open(target, zip_open_flags, 0o666), "wb") as f:
+                shutil.copyfileobj(source, f, zip_chunk_size)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(target)
+            raise
+        return "extracted"
+
+    try:
+        if workers == 1:
+            how.update(map(extract, files))
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                how.update(executor.map(extract, files))
+    finally:
+        for handle in handles:
+            handle.close()
+
+    return how
+
+
+def format_size(size: int) -> str:
+    """Bytes in a human readable unit, '1.5 MB'."""
+
+    value = float(size)
+    for unit in ["B", "kB", "MB", "GB", "TB"]:
+        if value < 1000 or unit == "TB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1000
+    return f"{size} B"
+
+
+def available_memory() -> int | None:
+    """Bytes of memory available to new processes, None if unknown."""
+
+    # Linux: counts reclaimable page cache, unlike free pages
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def df_to_table(df: "DataFrame") -> "Table":
     """Pandas dataframe to rich table"""
 
+    from rich.table import Table
+
     col_names: list[str] = list(df.columns)
     table = Table()
 
@@ -95,7 +600,9 @@ def create_structure(base_path: Path, tree: Tree) -> None:
             # TODO: fix notebook type checking
             # .ipynb
             if folder_path.name.endswith(".ipynb"):
-                nb: NotebookNode = nbf.v4.new_notebook()
+                import nbformat as nbf
+
+                nb: nbf.NotebookNode = nbf.v4.new_notebook()
                 nb["cells"].append(nbf.v4.new_code_cell())
                 with open(folder_path, "w") as f:
                     nbf.write(nb, f)
@@ -0,0 +1,135 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.dpx.cli import create
+from src.dpx.cli.utils.util import Project
+from src.dpx.utils import util
+from src.dpx.utils.util import csv_converters, csv_to_arrow, csv_to_feather, csv_to_parquet
+
+pytest.importorskip("pyarrow")
+
+readers = {"parquet": pd.read_parquet, "feather": pd.read_feather}
+
+
+@pytest.fixture(params=["parquet", "feather"])
+def output_format(request: pytest.FixtureRequest) -> str:
+    return request.param
+
+
+@pytest.fixture
+def csv_path(tmp_path: Path) -> Path:
+    path = tmp_path / "sales.csv"
+    path.write_text(
+        "id,region,amount,note\n"
+        + "".join(f"{i},{['north', 'south'][i % 2]},{i / 4},n{i}\n" for i in range(1_000))
+        + '1000,east,,"a, quoted\nnote"\n'
+    )
+    return path
+
+
+def test_round_trip_matches_pandas(csv_path: Path, output_format: str) -> None:
+    output_path = csv_to_arrow(csv_path, output_format)
+
+    assert output_path == csv_path.with_suffix(f".{output_format}")
+    assert not list(csv_path.parent.glob(".*.tmp"))
+    pd.testing.assert_frame_equal(readers[output_format](output_path), pd.read_csv(csv_path), check_dtype=False)
+
+
+def test_round_trip_in_small_batches(csv_path: Path, output_format: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(util, "arrow_block_size", 1024)
+
+    output_path = csv_to_arrow(csv_path, output_format, output_path=csv_path.parent / f"x.{output_format}")
+
+    assert output_path.name == f"x.{output_format}"
+    pd.testing.assert_frame_equal(readers[output_format](output_path), pd.read_csv(csv_path), check_dtype=False)
+
+
+def test_converters_write_within_the_same_dir(csv_path: Path) -> None:
+    assert csv_to_parquet(csv_path) == [csv_path.with_suffix(".parquet")]
+    assert csv_to_feather(csv_path) == [csv_path.with_suffix(".feather")]
+    assert csv_converters["parquet"] is csv_to_parquet
+    assert csv_converters["feather"] is csv_to_feather
+
+
+@pytest.mark.parametrize(
+    ("late_value", "as_type"),
+    [
+        ("2.5", float),
+        ("abc", str),
+    ],
+)
+def test_columns_widen_when_a_later_batch_does_not_fit(
+    tmp_path: Path, output_format: str, monkeypatch: pytest.MonkeyPatch, late_value: str, as_type: type
+) -> None:
+    # Batches of a few rows, the first ones typed as integers
+    monkeypatch.setattr(util, "arrow_block_size", 64)
+    csv_path = tmp_path / "codes.csv"
+    csv_path.write_text("id,code\n" + "".join(f"{i},{i}\n" for i in range(50)) + f"50,{late_value}\n")
+
+    df = readers[output_format](csv_to_arrow(csv_path, output_format))
+
+    assert df["code"].tolist() == [as_type(i) for i in range(50)] + [as_type(late_value)]
+
+
+def test_unknown_format_is_refused(csv_path: Path) -> None:
+    with pytest.raises(ValueError, match="'xlsx' is not a columnar format"):
+        csv_to_arrow(csv_path, "xlsx")
+
+
+@pytest.fixture
+def project(tmp_path: Path, csv_path: Path) -> Project:
+    project = Project(tmp_path / "main" / "shop")
+    project.data_dump_path.mkdir(parents=True)
+    csv_path.rename(project.data_dump_path / "sales.csv")
+    (project.data_dump_path / "notes.txt").write_text("notes\n")
+    return project
+
+
+def test_data_copy_converts_csvs_to_the_format(project: Project, output_format: str) -> None:
+    created_copies = project.data_copy(output_format=output_format)
+
+    assert dict(created_copies)[project.data_interim_path / f"sales-copy.{output_format}"] == output_format
+    assert sorted(path.name for path in project.data_interim_path.iterdir()) == [
+        "notes-copy.txt",
+        f"sales-copy.{output_format}",
+    ]
+    assert len(readers[output_format](project.data_interim_path / f"sales-copy.{output_format}")) == 1001
+
+    # Unchanged since, nothing to convert again
+    assert project.data_copy(output_format=output_format) == []
+
+
+def test_data_copy_without_a_format_copies_csvs(project: Project) -> None:
+    created_copies = project.data_copy()
+
+    assert sorted(path.name for path, _ in created_copies) == ["notes-copy.txt", "sales-copy.csv"]
+
+
+@pytest.mark.parametrize("output_format", ["xlsx", "csv"])
+def test_data_copy_refuses_other_formats(project: Project, output_format: str) -> None:
+    with pytest.raises(ValueError, match="cannot be written while copying"):
+        project.data_copy(output_format=output_format)
+
+
+def test_dpromote_refuses_unknown_formats() -> None:
+    with pytest.raises(ValueError, match="'csv' is not a format"):
+        create.dpromote(None, "shop", output_format="csv")
+
+
+def test_dpromote_converters_run_in_the_process_pool(tmp_path: Path, output_format: str) -> None:
+    csv_paths = [tmp_path / f"part{i}.csv" for i in range(3)]
+    for i, csv_path in enumerate(csv_paths):
+        csv_path.write_text(f"id,value\n{i},{i * 10}\n")
+
+    created_by_csv = create.promote_csvs(csv_paths, 2, csv_converters[output_format])
+
+    assert created_by_csv == {csv_path: [csv_path.with_suffix(f".{output_format}")] for csv_path in csv_paths}
+    assert [
+        readers[output_format](csv_path.with_suffix(f".{output_format}"))["value"].tolist() for csv_path in csv_paths
+    ] == [
+        [0],
+        [10],
+        [20],
+    ]
@@ -0,0 +1,212 @@
+import os
+import random
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from src.dpx.cli.utils.catalog import (
+    ProjectCatalog,
+    catalog_dirname,
+    schema_version,
+    similarity,
+    similarity_threshold,
+    trigrams,
+)
+from src.dpx.utils.util import racy_seconds
+
+# Well before the racy window
+settled_ns = time.time_ns() - 3600 * 1_000_000_000
+
+
+def make_group(base_path: Path, group: str, names: list[str], mtime_ns: int = settled_ns) -> None:
+    """A group of empty projects, its folder last changed at mtime_ns."""
+
+    for name in names:
+        (base_path / group / name).mkdir(parents=True)
+    os.utime(base_path / group, ns=(mtime_ns, mtime_ns))
+
+
+def scan(catalog: ProjectCatalog, group: str, mtime_ns: int) -> None:
+    names = sorted(os.listdir(catalog.base_path / group))
+    catalog.replace_group(group, mtime_ns, [(name, group, 0) for name in names])
+
+
+@pytest.fixture
+def catalog(tmp_path: Path) -> Iterator[ProjectCatalog]:
+    make_group(tmp_path, "main", ["alpha", "beta"])
+    make_group(tmp_path, "playground", ["gamma"])
+    catalog = ProjectCatalog(tmp_path)
+    yield catalog
+    catalog.close()
+
+
+def test_groups_are_stale_until_scanned(catalog: ProjectCatalog) -> None:
+    assert catalog.stale_groups(["main", "playground"]) == {"main": settled_ns, "playground": settled_ns}
+
+    scan(catalog, "main", settled_ns)
+
+    assert catalog.stale_groups(["main", "playground"]) == {"playground": settled_ns}
+    assert catalog.projects_in("main") == ["alpha", "beta"]
+
+
+def test_a_changed_group_is_stale_again(catalog: ProjectCatalog, tmp_path: Path) -> None:
+    scan(catalog, "main", settled_ns)
+
+    (tmp_path / "main" / "delta").mkdir()
+    mtime_ns = os.stat(tmp_path / "main").st_mtime_ns
+
+    assert catalog.stale_groups(["main"]) == {"main": mtime_ns}
+
+
+@pytest.mark.parametrize(("age_seconds", "stale"), [(0, True), (racy_seconds / 2, True), (racy_seconds + 1, False)])
+def test_groups_scanned_in_the_racy_window_are_scanned_again(
+    catalog: ProjectCatalog, tmp_path: Path, age_seconds: float, stale: bool
+) -> None:
+    mtime_ns = time.time_ns() - int(age_seconds * 1_000_000_000)
+    os.utime(tmp_path / "main", ns=(mtime_ns, mtime_ns))
+
+    scan(catalog, "main", mtime_ns)
+
+    assert ("main" in catalog.stale_groups(["main"])) is stale
+    # Stale or not, the scan is served
+    assert catalog.projects_in("main") == ["alpha", "beta"]
+
+
+def test_a_change_in_the_same_mtime_tick_as_the_scan_is_seen(catalog: ProjectCatalog, tmp_path: Path) -> None:
+    mtime_ns = time.time_ns()
+    os.utime(tmp_path / "main", ns=(mtime_ns, mtime_ns))
+    scan(catalog, "main", mtime_ns)
+
+    # A filesystem with coarse mtimes gives the folder the same mtime after a second change
+    (tmp_path / "main" / "delta").mkdir()
+    os.utime(tmp_path / "main", ns=(mtime_ns, mtime_ns))
+
+    assert catalog.stale_groups(["main"]) == {"main": mtime_ns}
+    scan(catalog, "main", mtime_ns)
+    assert catalog.projects_in("main") == ["alpha", "beta", "delta"]
+
+
+def test_rescanning_replaces_the_projects_of_a_group(catalog: ProjectCatalog, tmp_path: Path) -> None:
+    scan(catalog, "main", settled_ns)
+    scan(catalog, "playground", settled_ns)
+
+    os.rename(tmp_path / "main" / "beta", tmp_path / "main" / "bravo")
+    scan(catalog, "main", settled_ns)
+
+    assert catalog.projects_in("main") == ["alpha", "bravo"]
+    assert catalog.projects_in("playground") == ["gamma"]
+
+
+def test_removed_groups_are_forgotten(catalog: ProjectCatalog) -> None:
+    scan(catalog, "main", settled_ns)
+    scan(catalog, "playground", settled_ns)
+
+    catalog.retain_groups(["main"])
+
+    assert catalog.projects_in("playground") == []
+    assert catalog.stale_groups(["main"]) == {}
+
+
+def test_catalog_persists_across_invocations(catalog: ProjectCatalog, tmp_path: Path) -> None:
+    scan(catalog, "main", settled_ns)
+    catalog.close()
+
+    reopened = ProjectCatalog(tmp_path)
+
+    assert reopened.stale_groups(["main", "playground"]) == {"playground": settled_ns}
+    assert reopened.projects_in("main") == ["alpha", "beta"]
+    reopened.close()
+
+
+def test_a_catalog_of_an_older_schema_is_rebuilt(catalog: ProjectCatalog, tmp_path: Path) -> None:
+    scan(catalog, "main", settled_ns)
+    catalog.connection.execute(f"PRAGMA user_version = {schema_version - 1}")
+    catalog.close()
+
+    reopened = ProjectCatalog(tmp_path)
+
+    assert reopened.stale_groups(["main"]) == {"main": settled_ns}
+    assert reopened.projects_in("main") == []
+    reopened.close()
+
+
+def test_catalog_is_kept_in_memory_where_it_cannot_be_written(tmp_path: Path) -> None:
+    make_group(tmp_path, "main", ["alpha"])
+    # A file where the catalog folder goes
+    (tmp_path / catalog_dirname).write_text("")
+
+    catalog = ProjectCatalog(tmp_path)
+    scan(catalog, "main", settled_ns)
+
+    assert catalog.projects_in("main") == ["alpha"]
+    assert catalog.connection.execute("PRAGMA database_list").fetchone()[2] == ""
+    catalog.close()
+
+
+def test_trigrams_and_similarity() -> None:
+    assert trigrams("ab-c") == {"  a", " ab", "ab ", "  c", " c "}
+    assert trigrams("AB") == trigrams("ab")
+    assert trigrams("--") == set()
+
+    assert similarity(trigrams("sales"), trigrams("sales")) == 1.0
+    assert similarity(trigrams("sales"), trigrams("")) == 0.0
+    # 4 of 7 trigrams in common
+    assert similarity(trigrams("abc"), trigrams("abd")) == pytest.approx(2 / 6)
+
+
+def index(catalog: ProjectCatalog, rows_by_group: dict[str, list[str]]) -> None:
+    for group, names in rows_by_group.items():
+        catalog.replace_group(group, settled_ns, [(name, group, 0) for name in names])
+
+
+def test_similar_names_rank_most_similar_first(catalog: ProjectCatalog) -> None:
+    index(
+        catalog,
+        {
+            "main": ["sales-2024", "sales-2023", "sales", "salaries", "weather"],
+            "playground": ["sales", "sales-2024-draft"],
+        },
+    )
+
+    matches = catalog.similar("sales 2024")
+
+    assert [(name, group) for name, group, _ in matches] == [
+        ("sales-2024", "main"),
+        ("sales-2023", "main"),
+        ("sales-2024-draft", "playground"),
+        ("sales", "main"),
+        ("sales", "playground"),
+    ]
+    assert matches[0][2] == 1.0
+    assert [score for _, _, score in matches] == sorted((score for _, _, score in matches), reverse=True)
+    assert catalog.similar("sales 2024", limit=2) == matches[:2]
+
+
+@pytest.mark.parametrize("threshold", [0.1, 0.2, similarity_threshold, 0.5, 0.8])
+def test_similar_finds_every_name_at_the_threshold(catalog: ProjectCatalog, threshold: float) -> None:
+    rng = random.Random(0)
+    names = sorted({"-".join(rng.choices(["sales", "sale", "tax", "weather", "2024", "eu"], k=2)) for _ in range(50)})
+    index(catalog, {"main": names})
+
+    for query in ["sales", "sales tax", "weathr 2024", "eu"]:
+        grams = trigrams(query)
+        expected = {name for name in names if similarity(grams, trigrams(name)) >= threshold}
+
+        matches = catalog.similar(query, limit=len(names), threshold=threshold)
+
+        assert {name for name, _, _ in matches} == expected, query
+        assert all(score >= threshold for _, _, score in matches)
+
+
+def test_similar_finds_nothing_below_the_threshold(catalog: ProjectCatalog) -> None:
+    index(catalog, {"main": ["weather", "sales"]})
+
+    assert catalog.similar("wxyz") == []
+    assert catalog.similar("") == []
+    assert catalog.similar("--") == []
+    # 'weathr' and 'weather' share 5 of their 10 trigrams
+    assert catalog.similar("weathr") == [("weather", "main", 0.5)]
+    assert catalog.similar("weathr", threshold=0.5) == [("weather", "main", 0.5)]
+    assert catalog.similar("weathr", threshold=0.51) == []
@@ -0,0 +1,103 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from src.dpx.cli.utils.completion import NameIndex, search_prefix, write_lines
+
+
+@pytest.fixture
+def name_index(tmp_path: Path) -> NameIndex:
+    return NameIndex(tmp_path / ".dpx" / "names", tmp_path)
+
+
+def test_prefix_search_matches_a_scan_of_the_lines(tmp_path: Path) -> None:
+    rng = random.Random(0)
+    lines = sorted({"".join(rng.choices("abc-", k=rng.randint(1, 6))) for _ in range(2_000)})
+    path = tmp_path / "lines"
+    write_lines(path, lines)
+
+    for prefix in ["", "a", "ab", "c-", "cc", "-", "bca-", "abcabc", "d", "0"]:
+        expected = [line for line in lines if line.startswith(prefix)]
+        assert search_prefix(path, prefix, limit=len(lines)) == expected, prefix
+
+
+@pytest.mark.parametrize(
+    ("prefix", "expected"),
+    [
+        ("a", ["a", "ab"]),
+        ("b", ["b"]),
+        ("c", ["c"]),
+        ("ca", []),
+        ("", ["a", "ab", "b", "c"]),
+        ("0", []),
+        ("z", []),
+    ],
+)
+def test_first_middle_and_last_lines_are_found(tmp_path: Path, prefix: str, expected: list[str]) -> None:
+    # No trailing newline after the last line
+    write_lines(tmp_path / "lines", ["a", "ab", "b", "c"])
+
+    assert search_prefix(tmp_path / "lines", prefix) == expected
+
+
+def test_missing_and_empty_files_have_no_lines(tmp_path: Path) -> None:
+    assert search_prefix(tmp_path / "missing", "a") == []
+
+    write_lines(tmp_path / "empty", [])
+    assert search_prefix(tmp_path / "empty", "") == []
+
+
+def test_matches_are_limited(tmp_path: Path) -> None:
+    write_lines(tmp_path / "lines", [f"p{i:03}" for i in range(500)])
+
+    assert search_prefix(tmp_path / "lines", "p", limit=3) == ["p000", "p001", "p002"]
+
+
+def test_a_name_is_not_found_by_a_longer_name(name_index: NameIndex) -> None:
+    name_index.write_projects(["main", "clients"], {"ab-c": "main", "ab": "clients", "ab c": "main"})
+
+    assert name_index.group_of("ab") == "clients"
+    assert name_index.group_of("a") is None
+    assert name_index.complete_projects("ab") == ["ab", "ab c", "ab-c"]
+    assert name_index.complete_groups("c") == ["clients"]
+
+
+def test_a_renamed_project_is_found_by_its_new_name_only(name_index: NameIndex) -> None:
+    groups_by_name = {"beta": "main", "beta-2": "main", "bet": "clients", "betb": "clients"}
+    name_index.write_projects(["main", "clients"], groups_by_name)
+    name_index.write_data(
+        {
+            "bet": [("raw", "x.csv")],
+            "beta": [("raw", "a.csv"), ("interim", "a-copy.csv")],
+            "beta-2": [("raw", "b.csv")],
+            "betb": [],
+        }
+    )
+
+    # As 'dpx rename beta betaa' does
+    groups_by_name["betaa"] = groups_by_name.pop("beta")
+    name_index.write_projects(["main", "clients"], groups_by_name)
+    name_index.write_data({"beta": None, "betaa": [("raw", "a.csv"), ("interim", "a-copy.csv")]})
+
+    assert name_index.complete_projects("beta") == ["beta-2", "betaa"]
+    assert name_index.group_of("beta") is None
+    assert name_index.group_of("betaa") == "main"
+    assert name_index.complete_data_files("betaa", "a") == [("a-copy.csv", "interim"), ("a.csv", "raw")]
+    # Its neighbours are untouched
+    assert name_index.complete_data_files("bet", "") == [("x.csv", "raw")]
+    assert name_index.complete_data_files("beta-2", "") == [("b.csv", "raw")]
+    assert name_index.complete_data_files("betb", "") == []
+    assert name_index.complete_data_files("beta", "") == []
+
+
+def test_projects_missing_from_the_data_index_are_listed(name_index: NameIndex, tmp_path: Path) -> None:
+    (tmp_path / "main" / "shop" / "data" / "raw").mkdir(parents=True)
+    (tmp_path / "main" / "shop" / "data" / "raw" / "sales.csv").touch()
+    (tmp_path / "main" / "shop" / "data" / "raw" / ".gitkeep").touch()
+    name_index.write_projects(["main"], {"shop": "main", "sho": "main"})
+    name_index.write_data({"sho": []})
+
+    assert name_index.complete_data_files("shop", "s") == [("sales.csv", "raw")]
+    assert name_index.complete_data_files("sho", "") == []
+    assert name_index.complete_data_files("unknown", "") == []
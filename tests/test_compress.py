@@ -0,0 +1,107 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from src.dpx.utils.compress import (
+    cold_bytes,
+    cold_days,
+    compress_file,
+    compression,
+    data_name,
+    data_suffix,
+    decompress_file,
+    is_cold,
+    logical_size,
+)
+from src.dpx.utils.db import connect, load_csv, table_name
+from src.dpx.utils.records import head_records, tail_records
+from src.dpx.utils.sniff import read_csv
+
+
+@pytest.fixture(params=["gzip", "zstd"])
+def method(request: pytest.FixtureRequest) -> str:
+    if request.param == "zstd":
+        pytest.importorskip("zstandard")
+    return request.param
+
+
+@pytest.fixture
+def csv_text() -> str:
+    return "id;note\n" + "".join(f'{i};"line {i}\nsecond line"\n' for i in range(500))
+
+
+def test_names() -> None:
+    assert (compression("x.csv.zst"), compression("x.CSV.GZ"), compression("x.csv")) == ("zstd", "gzip", None)
+    assert (data_name("raw/x.csv.zst"), data_name("raw/x.csv")) == ("x.csv", "x.csv")
+    assert (data_suffix("x.tsv.gz"), data_suffix("x.zst")) == (".tsv", "")
+    assert table_name(Path("x-copy.csv.gz")) == "x_copy"
+
+
+def test_compress_and_decompress_round_trip(tmp_path: Path, method: str, csv_text: str) -> None:
+    path = tmp_path / "x.csv"
+    path.write_text(csv_text)
+    past = time.time() - 3600
+    os.utime(path, (past, past))
+    mtime_ns = path.stat().st_mtime_ns
+
+    compressed = compress_file(path, method)
+
+    assert not path.exists()
+    assert compressed.name == {"gzip": "x.csv.gz", "zstd": "x.csv.zst"}[method]
+    assert compressed.stat().st_size < len(csv_text)
+    assert compressed.stat().st_mtime_ns == mtime_ns
+    assert logical_size(compressed) == len(csv_text)
+
+    decompress_file(compressed, tmp_path / "back.csv")
+    assert (tmp_path / "back.csv").read_text() == csv_text
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_unknown_method_is_refused(tmp_path: Path) -> None:
+    path = tmp_path / "x.csv"
+    path.write_text("id\n")
+
+    with pytest.raises(ValueError, match="not a compression"):
+        compress_file(path, "lz4")
+    assert path.exists()
+
+
+def test_compressed_files_read_as_the_original(tmp_path: Path, method: str, csv_text: str) -> None:
+    plain = tmp_path / "plain" / "x.csv"
+    plain.parent.mkdir()
+    plain.write_text(csv_text)
+    path = tmp_path / "x.csv"
+    path.write_text(csv_text)
+    compressed = compress_file(path, method)
+
+    assert head_records(compressed, 4) == head_records(plain, 4)
+    assert tail_records(compressed, 3) == tail_records(plain, 3)
+    assert tail_records(compressed, 600) == tail_records(plain, 600)
+    assert read_csv(compressed).equals(read_csv(plain))
+
+    connection = connect(tmp_path / "x.sqlite3")
+    assert load_csv(connection, compressed, "x", []) == 500
+    assert connection.execute("SELECT note FROM x WHERE id = 7").fetchone() == ("line 7\nsecond line",)
+    connection.close()
+
+
+def test_is_cold(tmp_path: Path) -> None:
+    path = tmp_path / "x.csv"
+    path.write_bytes(b"x" * cold_bytes)
+    now = time.time()
+    old = now - (cold_days + 1) * 24 * 60 * 60
+
+    assert not is_cold(path.stat(), now)
+    os.utime(path, (old, old))
+    assert is_cold(path.stat(), now)
+
+    # Read recently
+    os.utime(path, (now, old))
+    assert not is_cold(path.stat(), now)
+
+    small = tmp_path / "small.csv"
+    small.write_bytes(b"x")
+    os.utime(small, (old, old))
+    assert not is_cold(small.stat(), now)
@@ -0,0 +1,151 @@
+import errno
+import os
+from pathlib import Path
+
+import pytest
+
+from src.dpx.utils import util
+from src.dpx.utils.util import copy_file, copy_tree
+
+
+def unsupported(*args) -> None:
+    raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+
+
+@pytest.fixture
+def src(tmp_path: Path) -> Path:
+    path = tmp_path / "src.csv"
+    path.write_bytes(b"id,value\n" + b"".join(b"%d,%d\n" % (i, i * 7) for i in range(10_000)))
+    return path
+
+
+def test_copy_and_hardlink_modes(src: Path, tmp_path: Path) -> None:
+    assert copy_file(src, tmp_path / "copy.csv", "copy") == "copy"
+    assert (tmp_path / "copy.csv").read_bytes() == src.read_bytes()
+    assert not (tmp_path / "copy.csv").samefile(src)
+
+    assert copy_file(src, tmp_path / "link.csv", "hardlink") == "hardlink"
+    assert (tmp_path / "link.csv").samefile(src)
+
+
+def test_copy_replaces_an_old_hardlink_without_writing_through_it(src: Path, tmp_path: Path) -> None:
+    dst = tmp_path / "dst.csv"
+    other = tmp_path / "other.csv"
+    other.write_bytes(b"other\n")
+    os.link(other, dst)
+
+    copy_file(src, dst, "copy")
+
+    assert other.read_bytes() == b"other\n"
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_unknown_mode_is_refused(src: Path, tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="not a copy mode"):
+        copy_file(src, tmp_path / "dst.csv", "symlink")
+
+
+def test_reflink_mode_fails_where_unsupported(src: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(util, "reflink", unsupported)
+
+    with pytest.raises(OSError, match="cannot be reflinked"):
+        copy_file(src, tmp_path / "dst.csv", "reflink")
+    assert not (tmp_path / "dst.csv").exists()
+
+
+@pytest.mark.skipif(not hasattr(os, "copy_file_range"), reason="copy_file_range is linux only")
+def test_auto_uses_copy_file_range_without_reflinks(src: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(util, "reflink", unsupported)
+
+    assert copy_file(src, tmp_path / "dst.csv") == "copy_file_range"
+    assert (tmp_path / "dst.csv").read_bytes() == src.read_bytes()
+
+
+@pytest.mark.parametrize(
+    "copy_file_range",
+    [
+        # Unsupported
+        lambda *args: unsupported(),
+        # Copies nothing and returns 0, as on some FUSE and network filesystems
+        lambda *args: 0,
+    ],
+)
+def test_auto_falls_back_to_a_full_copy(
+    src: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, copy_file_range
+) -> None:
+    monkeypatch.setattr(util, "reflink", unsupported)
+    monkeypatch.setattr(os, "copy_file_range", copy_file_range, raising=False)
+
+    assert copy_file(src, tmp_path / "dst.csv") == "copy"
+    assert (tmp_path / "dst.csv").read_bytes() == src.read_bytes()
+
+
+def test_auto_redoes_a_short_copy_file_range(src: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(util, "reflink", unsupported)
+    calls: list[int] = []
+
+    def short_copy_file_range(src_fd: int, dst_fd: int, count: int) -> int:
+        # Copies a first block, then stops as if the source ended
+        if calls:
+            return 0
+        calls.append(count)
+        return os.write(dst_fd, os.read(src_fd, 100))
+
+    monkeypatch.setattr(os, "copy_file_range", short_copy_file_range, raising=False)
+
+    assert copy_file(src, tmp_path / "dst.csv") == "copy"
+    assert (tmp_path / "dst.csv").read_bytes() == src.read_bytes()
+
+
+def test_failed_copy_leaves_no_partial_file(src: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(util, "reflink", unsupported)
+
+    def failing_copy_file_range(*args) -> int:
+        raise OSError(errno.EIO, "Input/output error")
+
+    monkeypatch.setattr(os, "copy_file_range", failing_copy_file_range, raising=False)
+
+    with pytest.raises(OSError, match="Input/output error"):
+        copy_file(src, tmp_path / "dst.csv")
+    assert not (tmp_path / "dst.csv").exists()
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_copy_tree_copies_nested_folders_and_symlinks(tmp_path: Path, workers: int) -> None:
+    src_root = tmp_path / "raw"
+    (src_root / "a" / "b").mkdir(parents=True)
+    (src_root / "empty").mkdir()
+    for i in range(20):
+        (src_root / "a" / "b" / f"part{i}.csv").write_text(f"id\n{i}\n")
+    (src_root / "top.csv").write_text("id\n")
+    (src_root / "latest.csv").symlink_to("top.csv")
+    (src_root / "current").symlink_to("a")
+
+    how = copy_tree(src_root, tmp_path / "copy", "copy", workers=workers)
+
+    dst_root = tmp_path / "copy"
+    assert how == {"copy": 21, "symlink": 2}
+    assert sorted(path.relative_to(dst_root) for path in dst_root.rglob("*")) == sorted(
+        path.relative_to(src_root) for path in src_root.rglob("*")
+    )
+    assert (dst_root / "a" / "b" / "part7.csv").read_text() == "id\n7\n"
+    assert (dst_root / "empty").is_dir()
+    assert os.readlink(dst_root / "latest.csv") == "top.csv"
+    # A symlinked folder is not walked into
+    assert (dst_root / "current").is_symlink()
+
+
+def test_copy_tree_into_an_existing_copy(tmp_path: Path) -> None:
+    src_root = tmp_path / "raw"
+    src_root.mkdir()
+    (src_root / "x.csv").write_text("new\n")
+    (src_root / "link").symlink_to("x.csv")
+    dst_root = tmp_path / "copy"
+    dst_root.mkdir()
+    (dst_root / "x.csv").write_text("old\n")
+    (dst_root / "link").symlink_to("elsewhere")
+
+    copy_tree(src_root, dst_root, "hardlink")
+
+    assert (dst_root / "x.csv").samefile(src_root / "x.csv")
+    assert os.readlink(dst_root / "link") == "x.csv"
@@ -0,0 +1,120 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from src.dpx.utils import db
+from src.dpx.utils.db import (
+    affinity,
+    column_names,
+    connect,
+    has_table,
+    load_csv,
+    load_file,
+    replace_table,
+    table_name,
+)
+
+
+@pytest.fixture
+def connection(tmp_path: Path):
+    connection = connect(tmp_path / "x.sqlite3")
+    yield connection
+    connection.close()
+
+
+def indexes(connection: sqlite3.Connection, table: str) -> list[str]:
+    return [name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE tbl_name = ?", (table,))][1:]
+
+
+def test_names() -> None:
+    assert table_name(Path("x-copy.csv")) == "x_copy"
+    assert table_name(Path("x-copy.csv.zst")) == "x_copy"
+    assert table_name(Path("2024 sales.csv")) == "t_2024_sales"
+    assert column_names(["id", "", "ID", "id"]) == ["id", "column_2", "ID_2", "id_3"]
+
+
+@pytest.mark.parametrize(
+    ("values", "expected"),
+    [(["1", "", "-2"], "INTEGER"), (["1", "2.5", "1e3"], "REAL"), (["1", "x"], "TEXT"), (["", ""], "TEXT")],
+)
+def test_affinity(values: list[str], expected: str) -> None:
+    assert affinity(values) == expected
+
+
+def test_load_csv_types_nulls_and_indexes(
+    tmp_path: Path, connection: sqlite3.Connection, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(db, "affinity_sample_rows", 2)
+    csv_path = tmp_path / "sales.csv"
+    csv_path.write_text("store_id;region;amount\n1;north;2.5\n2;;3\n3;south;n/a\n")
+
+    assert load_csv(connection, csv_path, "sales", ["region"]) == 3
+
+    rows = connection.execute("SELECT store_id, region, amount, typeof(amount) FROM sales ORDER BY store_id").fetchall()
+    # A value beyond the sample not fitting the affinity is kept as text
+    assert rows == [(1, "north", 2.5, "real"), (2, None, 3.0, "real"), (3, "south", "n/a", "text")]
+    assert indexes(connection, "sales") == ["idx_sales__store_id", "idx_sales__region"]
+
+
+def test_rows_of_another_width_are_padded_or_cut(tmp_path: Path, connection: sqlite3.Connection) -> None:
+    csv_path = tmp_path / "x.csv"
+    csv_path.write_text("a,b,c\n1,2,3\n4\n5,6,7,8\n")
+
+    assert load_csv(connection, csv_path, "x", []) == 3
+    assert connection.execute("SELECT * FROM x").fetchall() == [(1, 2, 3), (4, None, None), (5, 6, 7)]
+
+
+@pytest.mark.parametrize(
+    ("text", "columns", "rows"),
+    [
+        ("a,b\n1,2\n\n3,4\n", None, [(1, 2), (3, 4)]),
+        ("\na,b\n1,2\n\n\n3,4\n\n", None, [(1, 2), (3, 4)]),
+        # Padded, a row of another width makes the load start again
+        ("a,b\n1,2\n\n3\n", None, [(1, 2), (3, None)]),
+        ("a,b\n1,2\n\n3,4\n", {"b"}, [(2,), (4,)]),
+    ],
+)
+def test_blank_lines_are_not_rows(
+    tmp_path: Path, connection: sqlite3.Connection, text: str, columns: set[str] | None, rows: list[tuple]
+) -> None:
+    csv_path = tmp_path / "x.csv"
+    csv_path.write_text(text)
+
+    assert load_csv(connection, csv_path, "x", [], columns=columns) == 2
+    assert connection.execute("SELECT * FROM x").fetchall() == rows
+
+
+def test_only_selected_columns_are_loaded(tmp_path: Path, connection: sqlite3.Connection) -> None:
+    csv_path = tmp_path / "x.csv"
+    csv_path.write_text("id,Region,amount\n1,north,2\n2\n")
+
+    load_csv(connection, csv_path, "x", [], columns={"region"})
+
+    assert [row[1] for row in connection.execute("PRAGMA table_info(x)")] == ["Region"]
+    assert connection.execute("SELECT * FROM x").fetchall() == [("north",), (None,)]
+
+
+def test_failed_load_keeps_the_previous_table(tmp_path: Path, connection: sqlite3.Connection) -> None:
+    csv_path = tmp_path / "x.csv"
+    csv_path.write_text("id\n1\n")
+    load_csv(connection, csv_path, "x", [])
+
+    empty_path = tmp_path / "empty.csv"
+    empty_path.write_text("")
+    with pytest.raises(ValueError, match="is empty"):
+        load_csv(connection, empty_path, "x", [])
+
+    def failing_rows():
+        yield [2]
+        raise OSError("read failed")
+
+    with pytest.raises(OSError, match="read failed"):
+        replace_table(connection, "x", [("id", "INTEGER")], failing_rows(), [])
+    assert connection.execute("SELECT * FROM x").fetchall() == [(1,)]
+
+
+def test_load_file_refuses_other_files(tmp_path: Path, connection: sqlite3.Connection) -> None:
+    with pytest.raises(ValueError, match="cannot be loaded"):
+        load_file(connection, tmp_path / "x.xlsx", "x", [])
+    assert not has_table(connection, "x")
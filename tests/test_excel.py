@@ -0,0 +1,52 @@
+from pathlib import Path
+
+import pytest
+from openpyxl import load_workbook
+
+from src.dpx.utils.util import csv_to_excel
+
+
+def sheet_rows(xlsx_path: Path) -> dict[str, list[tuple]]:
+    workbook = load_workbook(xlsx_path)
+    return {sheet.title: list(sheet.iter_rows(values_only=True)) for sheet in workbook.worksheets}
+
+
+def test_rows_roll_over_to_new_sheets_and_workbooks(tmp_path: Path) -> None:
+    csv_path = tmp_path / "sales.csv"
+    csv_path.write_text("id,region\n" + "".join(f"{i},r{i}\n" for i in range(7)))
+
+    xlsx_paths = csv_to_excel(csv_path, chunk_rows=2, rows_per_sheet=3, sheets_per_workbook=3)
+
+    assert xlsx_paths == [tmp_path / "sales.xlsx", tmp_path / "sales-2.xlsx"]
+    first, second = sheet_rows(xlsx_paths[0]), sheet_rows(xlsx_paths[1])
+    assert list(first) == ["Sheet1", "Sheet2", "Sheet3"]
+    assert first["Sheet1"] == [("id", "region"), (0, "r0"), (1, "r1")]
+    assert first["Sheet3"] == [("id", "region"), (4, "r4"), (5, "r5")]
+    assert second == {"Sheet1": [("id", "region"), (6, "r6")]}
+
+
+def test_one_workbook_without_sheets_per_workbook(tmp_path: Path) -> None:
+    csv_path = tmp_path / "sales.csv"
+    csv_path.write_text("id,note\n1,\n2,b\n")
+
+    (xlsx_path,) = csv_to_excel(csv_path, rows_per_sheet=2)
+
+    # Missing values are empty cells
+    assert sheet_rows(xlsx_path) == {"Sheet1": [("id", "note"), (1, None)], "Sheet2": [("id", "note"), (2, "b")]}
+
+
+def test_header_only_csv_gives_a_header_sheet(tmp_path: Path) -> None:
+    csv_path = tmp_path / "empty.csv"
+    csv_path.write_text("id,region\n")
+
+    (xlsx_path,) = csv_to_excel(csv_path)
+
+    assert sheet_rows(xlsx_path) == {"Sheet1": [("id", "region")]}
+
+
+def test_rows_per_sheet_needs_room_for_data(tmp_path: Path) -> None:
+    csv_path = tmp_path / "sales.csv"
+    csv_path.write_text("id\n1\n")
+
+    with pytest.raises(ValueError, match="no room for data"):
+        csv_to_excel(csv_path, rows_per_sheet=1)
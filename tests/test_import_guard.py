@@ -0,0 +1,47 @@
+import importlib
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.dpx.utils import import_guard
+
+repo_dir = Path(__file__).parent.parent
+
+
+def test_importing_dpx_scans_no_directory() -> None:
+    # A fresh interpreter, modules imported by other tests are imported again
+    result = subprocess.run(
+        [sys.executable, "-m", "src.dpx.utils.import_guard"], check=False, cwd=repo_dir, capture_output=True, text=True
+    )
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert result.stdout.startswith("No directory scans while importing")
+
+
+@pytest.mark.parametrize(
+    ("function", "scan"),
+    [
+        ("listdir", "os.listdir('.')"),
+        ("scandir", "list(os.scandir('.'))"),
+    ],
+)
+def test_scans_at_module_level_are_caught(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, function: str, scan: str
+) -> None:
+    monkeypatch.setattr(import_guard, "dpx_src_dir", tmp_path)
+    monkeypatch.setattr(import_guard, "calls", [])
+    for name in ["listdir", "scandir"]:
+        monkeypatch.setattr(os, name, import_guard._counting(f"os.{name}", getattr(os, name)))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    module_name = f"scanning_{function}"
+    (tmp_path / f"{module_name}.py").write_text(f"import os\n\n{scan}\n\n\ndef later():\n    return {scan}\n")
+
+    module = importlib.import_module(module_name)
+    monkeypatch.delitem(sys.modules, module_name)
+    # Scans after the import are not
+    module.later()
+
+    assert import_guard.calls == [(f"os.{function}", f"{module_name}.py:3", ".")]
@@ -0,0 +1,110 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from src.dpx.cli.utils import manifest
+from src.dpx.cli.utils.manifest import DataManifest
+
+
+def write_settled(path: Path, text: str) -> None:
+    """Write a file with an mtime older than racy_seconds, so its hash is cached."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    past = time.time() - 60
+    os.utime(path, (past, past))
+
+
+@pytest.fixture
+def hashed(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Names of the files read to be hashed."""
+
+    names: list[str] = []
+    hash_file = manifest.hash_file
+
+    def counting_hash_file(path: Path) -> str:
+        names.append(path.name)
+        return hash_file(path)
+
+    monkeypatch.setattr(manifest, "hash_file", counting_hash_file)
+    return names
+
+
+def test_outputs_are_current_until_the_input_changes(tmp_path: Path) -> None:
+    write_settled(tmp_path / "raw" / "x.csv", "id\n1\n")
+    write_settled(tmp_path / "interim" / "x-copy.csv", "id\n1\n")
+    data_manifest = DataManifest(tmp_path)
+
+    assert data_manifest.is_current(tmp_path / "raw" / "x.csv", "copy") is None
+    data_manifest.record(tmp_path / "raw" / "x.csv", "copy", [tmp_path / "interim" / "x-copy.csv"])
+    assert data_manifest.is_current(tmp_path / "raw" / "x.csv", "copy") is True
+    assert data_manifest.is_current(tmp_path / "raw" / "x.csv", "xlsx") is None
+
+    write_settled(tmp_path / "raw" / "x.csv", "id\n2\n")
+    assert data_manifest.is_current(tmp_path / "raw" / "x.csv", "copy") is False
+
+
+def test_missing_output_is_not_current(tmp_path: Path) -> None:
+    write_settled(tmp_path / "raw" / "x.csv", "id\n1\n")
+    data_manifest = DataManifest(tmp_path)
+    data_manifest.record(tmp_path / "raw" / "x.csv", "copy", [tmp_path / "interim" / "x-copy.csv"])
+
+    assert data_manifest.is_current(tmp_path / "raw" / "x.csv", "copy") is False
+
+
+def test_unchanged_files_are_not_read_again(tmp_path: Path, hashed: list[str]) -> None:
+    write_settled(tmp_path / "raw" / "x.csv", "id\n1\n")
+    write_settled(tmp_path / "interim" / "x-copy.csv", "id\n1\n")
+    data_manifest = DataManifest(tmp_path)
+    data_manifest.record(tmp_path / "raw" / "x.csv", "copy", [tmp_path / "interim" / "x-copy.csv"])
+    data_manifest.save()
+
+    data_manifest = DataManifest(tmp_path)
+    assert data_manifest.is_current(tmp_path / "raw" / "x.csv", "copy") is True
+    assert hashed == ["x.csv"]
+
+
+def test_recently_changed_files_are_read_again(tmp_path: Path, hashed: list[str]) -> None:
+    (tmp_path / "raw").mkdir()
+    (tmp_path / "raw" / "x.csv").write_text("id\n1\n")
+    data_manifest = DataManifest(tmp_path)
+
+    data_manifest.fingerprint(tmp_path / "raw" / "x.csv")
+    data_manifest.fingerprint(tmp_path / "raw" / "x.csv")
+
+    # Changed within racy_seconds, a second change could keep the same mtime
+    assert data_manifest.files["raw/x.csv"][1] == -1
+    assert hashed == ["x.csv", "x.csv"]
+
+
+def test_folder_fingerprint_follows_its_files(tmp_path: Path) -> None:
+    write_settled(tmp_path / "raw" / "parts" / "a.csv", "id\n1\n")
+    data_manifest = DataManifest(tmp_path)
+    fingerprint = data_manifest.fingerprint(tmp_path / "raw" / "parts")
+
+    assert data_manifest.fingerprint(tmp_path / "raw" / "parts") == fingerprint
+    write_settled(tmp_path / "raw" / "parts" / "b.csv", "id\n2\n")
+    assert data_manifest.fingerprint(tmp_path / "raw" / "parts") != fingerprint
+    assert data_manifest.fingerprint(tmp_path / "raw" / "gone") is None
+
+
+def test_save_drops_deleted_inputs(tmp_path: Path) -> None:
+    write_settled(tmp_path / "raw" / "x.csv", "id\n1\n")
+    write_settled(tmp_path / "raw" / "y.csv", "id\n1\n")
+    data_manifest = DataManifest(tmp_path)
+    data_manifest.record(tmp_path / "raw" / "x.csv", "copy", [])
+    data_manifest.record(tmp_path / "raw" / "y.csv", "copy", [])
+    (tmp_path / "raw" / "y.csv").unlink()
+    data_manifest.save()
+
+    data_manifest = DataManifest(tmp_path)
+    assert list(data_manifest.files) == ["raw/x.csv"]
+    assert list(data_manifest.derived) == ["raw/x.csv"]
+
+
+def test_manifest_of_another_version_is_ignored(tmp_path: Path) -> None:
+    (tmp_path / manifest.manifest_filename).write_text('{"version": 0, "files": {"raw/x.csv": [1, 1, "h"]}}')
+
+    assert DataManifest(tmp_path).files == {}
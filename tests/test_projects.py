@@ -0,0 +1,154 @@
+import os
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from src.dpx.cli.dev import count_fs_calls, legacy_scan_group
+from src.dpx.cli.utils import util
+from src.dpx.cli.utils.completion import NameIndex
+from src.dpx.cli.utils.util import GroupManager, ProjectManager, scan_group
+
+
+@pytest.fixture
+def projects_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """A dp-projects/ of three groups, in place of the real one."""
+
+    projects_dir = tmp_path / "dp-projects"
+    projects = {
+        "main": ["alpha", "beta", "shared"],
+        "playground": ["tmp_abc", "shared"],
+        "clients": ["gamma"],
+    }
+    for group, names in projects.items():
+        for name in names:
+            (projects_dir / group / name).mkdir(parents=True)
+        # Changed well before the racy window, so the catalog keeps its scan
+        os.utime(projects_dir / group, (time.time() - 3600,) * 2)
+    (projects_dir / ".hidden" / "archived").mkdir(parents=True)
+
+    monkeypatch.setattr(util, "PROJECTS_DIR", projects_dir)
+    monkeypatch.setattr(GroupManager, "base_path", projects_dir)
+    monkeypatch.setattr(util, "name_index", NameIndex(projects_dir / ".dpx" / "names", projects_dir))
+    return projects_dir
+
+
+@pytest.fixture
+def project_manager(projects_dir: Path) -> Iterator[ProjectManager]:
+    project_manager = ProjectManager()
+    yield project_manager
+    project_manager.catalog.close()
+
+
+def test_every_project_maps_to_its_group(project_manager: ProjectManager, projects_dir: Path) -> None:
+    assert project_manager.groups == ["main", "playground", "clients"]
+    assert project_manager.groups_by_name == {
+        "alpha": "main",
+        "beta": "main",
+        "shared": "main",
+        "tmp_abc": "playground",
+        "gamma": "clients",
+    }
+    assert project_manager.get_group_from_project("gamma") == "clients"
+    assert project_manager.get_project_path("tmp_abc") == projects_dir / "playground" / "tmp_abc"
+
+
+def test_a_name_in_two_groups_is_found_in_the_first(project_manager: ProjectManager, projects_dir: Path) -> None:
+    assert project_manager.get_project_path("shared") == projects_dir / "main" / "shared"
+    assert project_manager.projects.count("shared") == 1
+
+
+def test_unknown_projects_are_refused_with_suggestions(project_manager: ProjectManager) -> None:
+    with pytest.raises(FileNotFoundError, match="Cannot find group from project: 'alpah'. Did you mean: 'alpha'?"):
+        project_manager.get_group_from_project("alpah")
+
+    with pytest.raises(ValueError, match="'zzz' is not a valid project.$"):
+        project_manager.verify_project("zzz")
+
+    with pytest.raises(FileNotFoundError, match="'zzz'"):
+        project_manager.get_project_path("zzz")
+
+
+@pytest.mark.parametrize("group", ["nope", ".hidden", "alpha"])
+def test_unknown_groups_are_refused(project_manager: ProjectManager, group: str) -> None:
+    with pytest.raises(ValueError, match=f"'{group}' is not a valid group."):
+        project_manager.verify_group(group)
+
+    with pytest.raises(ValueError, match=f"'{group}' is not a valid group."):
+        project_manager.list_projects([group])
+
+
+def test_projects_of_archives_are_not_looked_up(project_manager: ProjectManager) -> None:
+    assert "archived" not in project_manager.groups_by_name
+    with pytest.raises(FileNotFoundError):
+        project_manager.get_group_from_project("archived")
+
+
+def test_registered_projects_are_looked_up(project_manager: ProjectManager, projects_dir: Path) -> None:
+    project_manager.register_project(projects_dir / "clients" / "delta")
+    project_manager.unregister_project("beta")
+
+    assert project_manager.get_group_from_project("delta") == "clients"
+    with pytest.raises(FileNotFoundError):
+        project_manager.get_group_from_project("beta")
+    with pytest.raises(FileExistsError, match="'delta' already exists in the project group: 'clients'."):
+        project_manager.can_create_project("delta")
+
+
+def test_lookups_are_served_by_the_next_invocation(
+    project_manager: ProjectManager, projects_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def unexpected_scan(group_path: Path) -> None:
+        raise AssertionError(f"'{group_path.name}' was scanned again")
+
+    monkeypatch.setattr(util, "scan_group", unexpected_scan)
+
+    next_manager = ProjectManager()
+
+    assert next_manager.groups_by_name == project_manager.groups_by_name
+    assert util.name_index.group_of("gamma") == "clients"
+    next_manager.catalog.close()
+
+
+@pytest.fixture
+def group_path(tmp_path: Path) -> Path:
+    """A group of projects, temp projects and what is not a project."""
+
+    group_path = tmp_path / "dp-projects" / "main"
+    for name in ["zeta", "alpha", "tmp_b", "tmp_a", ".hidden-project", "Beta"]:
+        (group_path / name).mkdir(parents=True)
+    (group_path / ".gitkeep").touch()
+    (group_path / "notes.txt").write_text("notes\n")
+    (group_path / "tmp_file").touch()
+    (tmp_path / "elsewhere").mkdir()
+    (group_path / "linked").symlink_to(tmp_path / "elsewhere")
+    (group_path / "tmp_dangling").symlink_to(tmp_path / "missing")
+    return group_path
+
+
+def test_scan_matches_the_old_listing(group_path: Path) -> None:
+    temp_project_paths, non_temp_project_paths = scan_group(group_path)
+    legacy_temp_project_paths, legacy_non_temp_project_paths = legacy_scan_group(group_path)
+
+    assert temp_project_paths == sorted(legacy_temp_project_paths) == [group_path / "tmp_a", group_path / "tmp_b"]
+    assert non_temp_project_paths == sorted(legacy_non_temp_project_paths)
+    assert [path.name for path in non_temp_project_paths] == [".hidden-project", "Beta", "alpha", "linked", "zeta"]
+
+
+def test_scan_lists_the_group_once_without_a_stat_per_entry(group_path: Path) -> None:
+    with count_fs_calls() as counts:
+        scan_group(group_path)
+    with count_fs_calls() as legacy_counts:
+        legacy_scan_group(group_path)
+
+    assert counts == {"scandir": 1}
+    assert legacy_counts["listdir"] == 1
+    assert legacy_counts["stat"] >= len(os.listdir(group_path))
+
+
+def test_scan_of_an_empty_group(tmp_path: Path) -> None:
+    group_path = tmp_path / "dp-projects" / "empty"
+    group_path.mkdir(parents=True)
+
+    assert scan_group(group_path) == legacy_scan_group(group_path) == ([], [])
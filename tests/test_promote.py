@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pytest
+
+from src.dpx.cli import create
+from src.dpx.cli.create import conversion_jobs, promote_csvs
+
+
+def write_csvs(tmp_path: Path, count: int) -> list[Path]:
+    csv_paths = [tmp_path / f"part{i}.csv" for i in range(count)]
+    for i, csv_path in enumerate(csv_paths):
+        csv_path.write_text(f"id,value\n{i},{i * 10}\n")
+    return csv_paths
+
+
+def test_conversion_jobs_is_capped_by_files_and_memory(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(create, "available_memory", lambda: None)
+    assert conversion_jobs(8, 3) == 3
+    assert conversion_jobs(2, 0) == 1
+
+    monkeypatch.setattr(create, "available_memory", lambda: create.csv_to_excel_memory * 2)
+    assert conversion_jobs(8, 8) == 2
+
+    with pytest.raises(ValueError, match="at least 1"):
+        conversion_jobs(0, 3)
+
+
+def test_failed_conversions_are_reported_in_order(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    csv_paths = write_csvs(tmp_path, 3)
+
+    def convert(csv_path: Path) -> list[Path]:
+        if csv_path.name == "part1.csv":
+            raise ValueError("bad row")
+        return [csv_path.with_suffix(".xlsx")]
+
+    created_by_csv = promote_csvs(csv_paths, 1, convert)
+
+    assert created_by_csv == {
+        csv_paths[0]: [tmp_path / "part0.xlsx"],
+        csv_paths[1]: None,
+        csv_paths[2]: [tmp_path / "part2.xlsx"],
+    }
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split("]")[0] for line in lines] == ["[1/3", "[2/3", "[3/3"]
+    assert "Could not convert 'part1.csv': bad row" in lines[1]
+
+
+def test_process_pool_converts_every_csv(tmp_path: Path) -> None:
+    csv_paths = [*write_csvs(tmp_path, 3), tmp_path / "missing.csv"]
+
+    created_by_csv = promote_csvs(csv_paths, 2)
+
+    assert list(created_by_csv) == csv_paths
+    assert [created_by_csv[csv_path] for csv_path in csv_paths[:3]] == [
+        [csv_path.with_suffix(".xlsx")] for csv_path in csv_paths[:3]
+    ]
+    assert all(csv_path.with_suffix(".xlsx").exists() for csv_path in csv_paths[:3])
+    assert created_by_csv[csv_paths[3]] is None
@@ -0,0 +1,97 @@
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.dpx.cli.utils.util import Project
+from src.dpx.utils.db import connect, fetch, load_arrow
+from src.dpx.utils.sql import pushed_filters, referenced_columns, tokens
+
+
+@pytest.fixture
+def project(tmp_path: Path) -> Project:
+    project = Project(tmp_path / "main" / "shop")
+    for path in [project.data_dump_path, project.data_interim_path, project.data_processed_path]:
+        path.mkdir(parents=True)
+
+    sales = pd.DataFrame(
+        {"id": range(100), "region": ["north", "south", "east", "west"] * 25, "amount": [i / 2 for i in range(100)]}
+    )
+    sales.to_parquet(project.data_dump_path / "sales.parquet", index=False)
+    pd.DataFrame({"region": ["north", "south"], "manager": ["ann", "bo"]}).to_csv(
+        project.data_dump_path / "regions.csv", index=False
+    )
+    return project
+
+
+def test_load_arrow_reads_only_named_columns_and_filtered_rows(project: Project) -> None:
+    sql = "SELECT region, amount FROM sales WHERE amount >= 40 AND region = 'north'"
+    sql_tokens = tokens(sql)
+    connection = connect(project.this_project_path / "x.sqlite3")
+
+    loaded = load_arrow(
+        connection,
+        project.data_dump_path / "sales.parquet",
+        "sales",
+        [],
+        referenced_columns(sql_tokens),
+        pushed_filters(sql_tokens),
+    )
+
+    assert loaded == 5
+    assert [row[1] for row in connection.execute("PRAGMA table_info(sales)")] == ["region", "amount"]
+    assert connection.execute(sql).fetchall() == [("north", amount) for amount in [40.0, 42.0, 44.0, 46.0, 48.0]]
+    connection.close()
+
+
+def test_query_reads_files_into_temp_tables_and_writes_nothing(project: Project) -> None:
+    sql = (
+        "SELECT r.manager, SUM(s.amount) FROM sales s JOIN regions r ON r.region = s.region "
+        "GROUP BY r.manager ORDER BY 1"
+    )
+
+    connection, read = project.query_connection(sql)
+    columns, rows, more = fetch(connection, sql, 1)
+
+    assert read == {
+        project.data_dump_path / "sales.parquet": ("sales", 100),
+        project.data_dump_path / "regions.csv": ("regions", 2),
+    }
+    assert (columns, rows, more) == (["manager", "SUM(s.amount)"], [("ann", 600.0)], True)
+    with pytest.raises(sqlite3.OperationalError):
+        connection.execute("DELETE FROM sales")
+    connection.close()
+    assert not project.data_db_path.exists()
+
+
+def test_query_reuses_current_cdb_tables_read_only(project: Project) -> None:
+    csv_path = project.data_dump_path / "regions.csv"
+    project.data_load_db()
+    db_path = project.data_db()
+
+    connection, read = project.query_connection("SELECT * FROM regions")
+    assert read == {}
+    assert fetch(connection, "SELECT manager FROM regions ORDER BY 1", 10)[1] == [("ann",), ("bo",)]
+    with pytest.raises(sqlite3.OperationalError):
+        connection.execute("DELETE FROM regions")
+    connection.close()
+
+    # A file changed since cdb is read again
+    csv_path.write_text("region,manager\nnorth,cy\n")
+    connection, read = project.query_connection("SELECT * FROM regions")
+    assert read == {csv_path: ("regions", 1)}
+    assert fetch(connection, "SELECT manager FROM regions", 10)[1] == [("cy",)]
+    connection.close()
+    assert sqlite3.connect(db_path).execute("SELECT COUNT(*) FROM regions").fetchone() == (2,)
+
+
+def test_query_reports_files_which_cannot_be_read(project: Project) -> None:
+    (project.data_interim_path / "broken.parquet").write_text("not parquet")
+
+    connection, read = project.query_connection("SELECT * FROM broken")
+    connection.close()
+
+    ((table, error),) = read.values()
+    assert table == "broken"
+    assert isinstance(error, str)
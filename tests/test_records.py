@@ -0,0 +1,71 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from src.dpx.utils.records import head_records, stream_records, tail_records
+
+# Records of a csv, some with quoted newlines and escaped quotes
+records = [
+    "id,note",
+    '1,"two\nlines"',
+    '2,"a ""quoted"" word"',
+    '3,"""\nstarts with a quote"',
+    "4,plain",
+    '5,"ends\n\nwith newlines\n"',
+    '6,"""x""\n"",y"',
+]
+
+
+@pytest.fixture
+def csv_path(tmp_path: Path) -> Path:
+    path = tmp_path / "x.csv"
+    path.write_text("\n".join(records) + "\n")
+    return path
+
+
+@pytest.mark.parametrize("n", range(len(records) + 2))
+def test_head_keeps_quoted_newlines(csv_path: Path, n: int) -> None:
+    assert head_records(csv_path, n) == records[:n]
+
+
+@pytest.mark.parametrize("n", range(1, len(records) + 2))
+def test_tail_finds_record_starts_by_quote_parity(csv_path: Path, n: int) -> None:
+    assert tail_records(csv_path, n) == (records[-n:], n >= len(records))
+
+
+def test_unquoted_splits_on_every_newline(csv_path: Path) -> None:
+    assert head_records(csv_path, 3, quoted=False) == ["id,note", '1,"two', 'lines"']
+    assert tail_records(csv_path, 2, quoted=False) == (['6,"""x""', '"",y"'], False)
+
+
+@pytest.mark.parametrize("text", ["id\r\n1\r\n2", "id\r\n1\r\n2\r\n"])
+def test_crlf_and_missing_final_newline(tmp_path: Path, text: str) -> None:
+    path = tmp_path / "x.csv"
+    path.write_bytes(text.encode())
+
+    assert head_records(path, 5) == ["id", "1", "2"]
+    assert tail_records(path, 2) == (["1", "2"], False)
+    assert list(stream_records(path)) == ["id", "1", "2"]
+
+
+def test_empty_file(tmp_path: Path) -> None:
+    path = tmp_path / "x.csv"
+    path.write_bytes(b"")
+
+    assert head_records(path, 3) == []
+    assert tail_records(path, 3) == ([], True)
+
+
+def test_long_records_across_pages(tmp_path: Path) -> None:
+    rng = random.Random(0)
+    long_records = ["id,text"]
+    for i in range(300):
+        words = [rng.choice(["a", "b\nc", '""', ",", "x" * rng.randint(0, 200)]) for _ in range(rng.randint(1, 40))]
+        long_records.append(f'{i},"{"".join(words)}"')
+    path = tmp_path / "x.csv"
+    path.write_text("\n".join(long_records))
+
+    assert head_records(path, 150) == long_records[:150]
+    assert tail_records(path, 150) == (long_records[-150:], False)
+    assert list(stream_records(path)) == long_records
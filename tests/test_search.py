@@ -0,0 +1,77 @@
+import os
+from pathlib import Path
+
+from src.dpx.cli.utils.search import SearchIndex, json_text, tokenize
+
+
+def write_project(base_path: Path, group: str, project: str, readme: str) -> Path:
+    project_path = base_path / group / project
+    (project_path / "data" / "external").mkdir(parents=True)
+    (project_path / "README.md").write_text(readme)
+    return project_path
+
+
+def test_tokenize_splits_on_punctuation_and_underscores() -> None:
+    assert tokenize("Red-Wine quality_2009, v1.") == ["red", "wine", "quality", "2009", "v1"]
+
+
+def test_json_text_keeps_values_only() -> None:
+    assert json_text({"title": "Wine", "keywords": ["red", {"name": "cortez"}], "size": 3}).split() == [
+        "Wine",
+        "red",
+        "cortez",
+    ]
+
+
+def test_search_ranks_projects_with_every_term(tmp_path: Path) -> None:
+    write_project(tmp_path, "main", "wine", "red wine quality, wine ratings")
+    write_project(tmp_path, "main", "beer", "beer quality")
+    index = SearchIndex(tmp_path)
+
+    assert index.sync({"wine": "main", "beer": "main"}) == 2
+    # The shorter README matches as often, it ranks first
+    assert [project for project, *_ in index.search("quality")] == ["beer", "wine"]
+    assert [(project, files) for project, _, _, files in index.search("wine quality")] == [("wine", ["README.md"])]
+    assert index.search("cider") == []
+    index.close()
+
+
+def test_sync_reads_only_changed_files(tmp_path: Path) -> None:
+    project_path = write_project(tmp_path, "main", "wine", "red wine")
+    (project_path / "data" / "external" / "dataset-metadata.json").write_text('{"title": "Cortez"}')
+    index = SearchIndex(tmp_path)
+
+    assert index.sync({"wine": "main"}) == 2
+    assert index.sync({"wine": "main"}) == 0
+
+    readme = project_path / "README.md"
+    readme.write_text("white wine")
+    stat = readme.stat()
+    os.utime(readme, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert index.sync({"wine": "main"}) == 1
+    assert index.search("red") == []
+    assert [files for *_, files in index.search("cortez")] == [["data/external/dataset-metadata.json"]]
+    index.close()
+
+
+def test_sync_drops_files_of_removed_projects(tmp_path: Path) -> None:
+    write_project(tmp_path, "main", "wine", "red wine")
+    index = SearchIndex(tmp_path)
+    index.sync({"wine": "main"})
+
+    assert index.sync({}) == 0
+    assert index.search("wine") == []
+    assert index.connection.execute("SELECT COUNT(*) FROM postings").fetchone() == (0,)
+    index.close()
+
+
+def test_index_persists_across_connections(tmp_path: Path) -> None:
+    write_project(tmp_path, "main", "wine", "red wine")
+    index = SearchIndex(tmp_path)
+    index.sync({"wine": "main"})
+    index.close()
+
+    index = SearchIndex(tmp_path)
+    assert index.sync({"wine": "main"}) == 0
+    assert [project for project, *_ in index.search("red")] == ["wine"]
+    index.close()
@@ -0,0 +1,91 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from src.dpx.utils import sniff as sniff_module
+from src.dpx.utils.sniff import copy_sidecar, load_sniffed, read_csv, sidecar_path, sniff, sniffed
+
+
+def test_semicolons_and_cp1252_are_sniffed(tmp_path: Path) -> None:
+    path = tmp_path / "x.csv"
+    path.write_bytes("id;name;amount\n1;café;1,5\n2;thé;2,5\n".encode("cp1252"))
+
+    options = sniff(path)
+
+    assert (options["encoding"], options["delimiter"], options["quotechar"]) == ("cp1252", ";", '"')
+    assert read_csv(path)["name"].tolist() == ["café", "thé"]
+
+
+def test_utf8_bom_and_tabs(tmp_path: Path) -> None:
+    path = tmp_path / "x.tsv"
+    path.write_bytes(b"\xef\xbb\xbfid\tname\n1\ta\n")
+
+    options = sniff(path)
+
+    assert (options["encoding"], options["delimiter"]) == ("utf-8-sig", "\t")
+    assert read_csv(path).columns.tolist() == ["id", "name"]
+
+
+def test_commas_inside_quotes_keep_the_comma(tmp_path: Path) -> None:
+    path = tmp_path / "x.csv"
+    path.write_text('id,note\n1,"a;b;c"\n2,"d;e"\n')
+
+    assert sniff(path)["delimiter"] == ","
+
+
+def test_integers_are_downcast_and_repeated_text_is_a_category(tmp_path: Path) -> None:
+    path = tmp_path / "x.csv"
+    path.write_text("small,large,region,id\n" + "".join(f"{i},{i * 100_000},{'ns'[i % 2]},u{i}\n" for i in range(100)))
+
+    assert sniff(path)["dtypes"] == {"small": "int8", "large": "int32", "region": "category"}
+    df = read_csv(path)
+    assert [str(df[column].dtype) for column in ["small", "large", "region"]] == ["int8", "int32", "category"]
+
+
+def test_integers_beyond_the_sample_keep_a_wider_type(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(sniff_module, "sample_rows", 10)
+    path = tmp_path / "x.csv"
+    path.write_text("id\n" + "".join(f"{i}\n" for i in range(10)) + "100000\n")
+
+    assert sniff(path)["dtypes"] == {"id": "int8"}
+    assert read_csv(path)["id"].tolist()[-1] == 100000
+
+
+def test_sidecar_is_reused_until_the_file_changes(tmp_path: Path) -> None:
+    path = tmp_path / "x.csv"
+    path.write_text("id\n1\n")
+    sniff(path)
+
+    assert sidecar_path(path) == tmp_path / ".x.csv.sniff.json"
+    assert load_sniffed(path) is not None
+
+    path.write_text("id;name\n1;a\n")
+    assert load_sniffed(path) is None
+    assert sniffed(path)["delimiter"] == ";"
+    assert load_sniffed(path) is not None
+
+
+def test_sidecar_is_copied_with_its_file(tmp_path: Path) -> None:
+    path = tmp_path / "x.csv"
+    path.write_text("id;name\n1;a\n")
+    sniff(path)
+    copy = tmp_path / "x-copy.csv"
+    copy.write_bytes(path.read_bytes())
+
+    copy_sidecar(path, copy)
+
+    assert load_sniffed(copy)["delimiter"] == ";"
+
+
+def test_read_only_folder_skips_the_sidecar(tmp_path: Path) -> None:
+    if os.geteuid() == 0:
+        pytest.skip("root writes to read only folders")
+    path = tmp_path / "x.csv"
+    path.write_text("id\n1\n")
+    tmp_path.chmod(0o555)
+    try:
+        assert sniff(path)["delimiter"] == ","
+        assert not sidecar_path(path).exists()
+    finally:
+        tmp_path.chmod(0o755)
@@ -0,0 +1,74 @@
+import pytest
+
+from src.dpx.utils.sql import from_tables, pushed_filters, referenced_columns, tokens
+
+
+def test_tokens_skip_comments_and_unquote() -> None:
+    assert tokens('SELECT "a ""b""", \'it\'\'s\' -- comment\n/* block */ FROM [t] WHERE x>=1.5e3') == [
+        ("word", "SELECT"),
+        ("name", 'a "b"'),
+        ("op", ","),
+        ("string", "it's"),
+        ("word", "FROM"),
+        ("name", "t"),
+        ("word", "WHERE"),
+        ("word", "x"),
+        ("op", ">="),
+        ("number", "1.5e3"),
+    ]
+
+
+@pytest.mark.parametrize(
+    ("sql", "tables"),
+    [
+        ("SELECT * FROM sales", ["sales"]),
+        (
+            "SELECT * FROM sales s JOIN stores AS st ON s.id = st.id LEFT JOIN regions USING (id)",
+            ["sales", "stores", "regions"],
+        ),
+        ("SELECT * FROM a, b c, (SELECT 1) d, e", ["a", "b", "e"]),
+        ("SELECT * FROM json_each('[1]'), sales", ["sales"]),
+        ("SELECT * FROM main.sales, x", ["x"]),
+        ("SELECT * FROM (SELECT * FROM inner_t) JOIN other", ["inner_t", "other"]),
+        ("SELECT 'FROM fake', sales FROM \"my table\"", ["my table"]),
+        ("WITH w AS (SELECT * FROM base) SELECT * FROM w", ["base", "w"]),
+        ("SELECT 1", []),
+    ],
+)
+def test_from_tables(sql: str, tables: list[str]) -> None:
+    assert from_tables(tokens(sql)) == tables
+
+
+def test_referenced_columns() -> None:
+    assert referenced_columns(tokens("SELECT Region, COUNT(*) FROM sales GROUP BY Region")) == {
+        "select",
+        "region",
+        "count",
+        "from",
+        "sales",
+        "group",
+        "by",
+    }
+    assert referenced_columns(tokens("SELECT * FROM sales")) is None
+    assert referenced_columns(tokens("SELECT s.* FROM sales s")) is None
+
+
+@pytest.mark.parametrize(
+    ("sql", "filters"),
+    [
+        (
+            "SELECT * FROM sales WHERE amount > 10 AND region = 'north' AND -2 < x",
+            [("amount", ">", 10), ("region", "==", "north")],
+        ),
+        ("SELECT * FROM sales s WHERE s.amount <> -1.5 ORDER BY 1", [("amount", "!=", -1.5)]),
+        ("SELECT * FROM sales WHERE (a = 1 OR b = 2) AND c = 3", [("c", "==", 3)]),
+        ("SELECT * FROM sales WHERE a = 1 OR b = 2", []),
+        ("SELECT * FROM sales JOIN stores ON 1 WHERE a = 1", []),
+        ("SELECT * FROM sales WHERE a BETWEEN 1 AND 2", []),
+        ("SELECT * FROM sales WHERE a IN (SELECT b FROM other)", []),
+        ("SELECT * FROM sales WHERE a = b", []),
+        ("SELECT * FROM other_schema.sales WHERE a = 1", []),
+    ],
+)
+def test_pushed_filters(sql: str, filters: list) -> None:
+    assert pushed_filters(tokens(sql)) == filters
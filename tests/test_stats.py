@@ -0,0 +1,122 @@
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.dpx.cli.utils import stats
+from src.dpx.cli.utils.stats import DataStats, FrameProfiler, profile_file
+
+
+def write_settled(path: Path, text: str) -> None:
+    """Write a file with an mtime older than racy_seconds, so its profile is cached."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    past = time.time() - 60
+    os.utime(path, (past, past))
+
+
+@pytest.fixture
+def profiled(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Names of the files read to be profiled."""
+
+    names: list[str] = []
+
+    def counting_profile_file(path: str) -> stats.Profile:
+        names.append(os.path.basename(path))
+        return profile_file(path)
+
+    monkeypatch.setattr(stats, "profile_file", counting_profile_file)
+    return names
+
+
+def test_chunks_of_different_types_merge() -> None:
+    profiler = FrameProfiler()
+    profiler.add(
+        pd.DataFrame({"id": [1, 2], "amount": [3, None], "code": [10, 20], "empty": [None, None], "units": [5, 100]})
+    )
+    profiler.add(
+        pd.DataFrame(
+            {"id": [3, 4], "amount": [0.5, 1.5], "code": ["b7", "a1"], "empty": [None, None], "units": [9.5, None]}
+        )
+    )
+    profiler.add(pd.DataFrame({"id": [5], "amount": [2.0], "code": ["c"], "empty": [None], "units": [3]}))
+
+    columns = {column["name"]: column for column in profiler.profile()["columns"]}
+
+    assert profiler.profile()["rows"] == 5
+    assert columns["id"] == {"name": "id", "type": "int", "nulls": 0, "min": 1, "max": 5}
+    assert columns["amount"] == {"name": "amount", "type": "float", "nulls": 1, "min": 0.5, "max": 3.0}
+    # Numbers then text compare as text
+    assert (columns["code"]["type"], columns["code"]["min"], columns["code"]["max"]) == ("string", "10", "c")
+    assert columns["empty"]["type"] == "empty"
+    # An int column with a null in a later chunk is read as float, it still compares as numbers
+    assert columns["units"] == {"name": "units", "type": "float", "nulls": 1, "min": 3.0, "max": 100.0}
+
+
+def test_csv_and_parquet_profiles_agree(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    df = pd.DataFrame({"id": range(10), "region": ["north", "south"] * 5, "amount": [1.5, None] * 5})
+    df.to_csv(tmp_path / "x.csv", index=False)
+    df.to_parquet(tmp_path / "x.parquet", index=False)
+    monkeypatch.setattr(stats, "csv_chunk_rows", 3)
+
+    csv_profile = profile_file(str(tmp_path / "x.csv"))
+    parquet_profile = profile_file(str(tmp_path / "x.parquet"))
+
+    assert csv_profile["rows"] == parquet_profile["rows"] == 10
+    for csv_column, parquet_column in zip(csv_profile["columns"], parquet_profile["columns"]):
+        assert csv_column["name"] == parquet_column["name"]
+        assert (csv_column["nulls"], csv_column["min"], csv_column["max"]) == (
+            parquet_column["nulls"],
+            parquet_column["min"],
+            parquet_column["max"],
+        )
+
+
+def test_unsupported_file_is_refused(tmp_path: Path) -> None:
+    (tmp_path / "notes.txt").write_text("hello")
+
+    with pytest.raises(ValueError, match="cannot be profiled"):
+        profile_file(str(tmp_path / "notes.txt"))
+
+
+def test_profiles_are_cached_until_the_file_changes(tmp_path: Path, profiled: list[str]) -> None:
+    write_settled(tmp_path / "raw" / "x.csv", "id\n1\n2\n")
+    paths = [tmp_path / "raw" / "x.csv"]
+
+    data_stats = DataStats(tmp_path)
+    assert data_stats.profiles(paths, jobs=1)[paths[0]]["rows"] == 2
+    data_stats.save()
+
+    data_stats = DataStats(tmp_path)
+    assert data_stats.profiles(paths, jobs=1)[paths[0]]["rows"] == 2
+    assert profiled == ["x.csv"]
+
+    write_settled(tmp_path / "raw" / "x.csv", "id\n1\n2\n3\n")
+    assert data_stats.profiles(paths, jobs=1)[paths[0]]["rows"] == 3
+    assert data_stats.profiles(paths, jobs=1, force=True)[paths[0]]["rows"] == 3
+    assert profiled == ["x.csv", "x.csv", "x.csv"]
+
+
+def test_unreadable_file_gives_an_error_not_cached(tmp_path: Path, profiled: list[str]) -> None:
+    write_settled(tmp_path / "raw" / "x.parquet", "not parquet")
+    paths = [tmp_path / "raw" / "x.parquet"]
+    data_stats = DataStats(tmp_path)
+
+    for _ in range(2):
+        outcome = data_stats.profiles(paths, jobs=1)[paths[0]]
+        assert isinstance(outcome, str)
+    assert profiled == ["x.parquet", "x.parquet"]
+
+
+def test_profiles_in_a_process_pool(tmp_path: Path) -> None:
+    paths = []
+    for i in range(3):
+        write_settled(tmp_path / "raw" / f"x{i}.csv", "id\n" + "1\n" * i)
+        paths.append(tmp_path / "raw" / f"x{i}.csv")
+
+    outcomes = DataStats(tmp_path).profiles(paths, jobs=2)
+
+    assert [outcomes[path]["rows"] for path in paths] == [0, 1, 2]
@@ -0,0 +1,80 @@
+import os
+import stat
+from pathlib import Path
+
+import pytest
+
+from src.dpx.cli.utils.store import BlobStore
+
+
+def write_raw(data_path: Path, name: str, content: bytes) -> Path:
+    path = data_path / "raw" / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> BlobStore:
+    return BlobStore(tmp_path / ".hidden" / "store")
+
+
+def test_identical_files_share_one_blob(tmp_path: Path, store: BlobStore) -> None:
+    first = write_raw(tmp_path / "a" / "data", "x.csv", b"id\n1\n")
+    second = write_raw(tmp_path / "b" / "data", "copy.csv", b"id\n1\n")
+    other = write_raw(tmp_path / "b" / "data", "y.csv", b"id\n2\n")
+
+    digests, freed = store.add_files(tmp_path / "a" / "data", [first])
+    assert (list(digests), freed) == (["raw/x.csv"], 0)
+    assert store.exists()
+
+    digests, freed = store.add_files(tmp_path / "b" / "data", [second, other])
+    assert freed == len(b"id\n1\n")
+    assert second.samefile(first)
+    assert second.samefile(store.blob_path(digests["raw/copy.csv"]))
+    assert not other.samefile(first)
+    assert not os.stat(first).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+
+    # Adding again changes nothing
+    assert store.add_files(tmp_path / "b" / "data", [second, other])[1] == 0
+
+
+def test_collect_removes_only_unlinked_blobs(tmp_path: Path, store: BlobStore) -> None:
+    kept = write_raw(tmp_path / "a" / "data", "x.csv", b"kept\n")
+    dropped = write_raw(tmp_path / "a" / "data", "y.csv", b"dropped\n")
+    digests, _ = store.add_files(tmp_path / "a" / "data", [kept, dropped])
+
+    assert store.collect() == (0, 0)
+
+    dropped.unlink()
+    assert store.collect() == (1, len(b"dropped\n"))
+    assert store.blob_path(digests["raw/x.csv"]).is_file()
+    assert not store.blob_path(digests["raw/y.csv"]).exists()
+    assert not store.blob_path(digests["raw/y.csv"]).parent.exists()
+
+
+def test_collect_without_a_store(store: BlobStore) -> None:
+    assert store.collect() == (0, 0)
+    assert not store.exists()
+
+
+def test_datasets_are_linked_until_a_blob_is_collected(tmp_path: Path, store: BlobStore) -> None:
+    url = "https://www.kaggle.com/datasets/owner/wine"
+    path = write_raw(tmp_path / "a" / "data", "wine/red.csv", b"quality\n5\n")
+    digests, _ = store.add_files(tmp_path / "a" / "data", [path])
+    store.record_dataset(url, digests)
+    store.save()
+
+    store = BlobStore(store.store_path)
+    (linked,) = store.link_dataset(url, tmp_path / "b" / "data")
+    assert linked == tmp_path / "b" / "data" / "raw" / "wine" / "red.csv"
+    assert linked.samefile(path)
+    assert store.link_dataset("https://example.com/other", tmp_path / "c" / "data") is None
+
+    path.unlink()
+    linked.unlink()
+    store.collect()
+    store.save()
+    store = BlobStore(store.store_path)
+    assert store.datasets == {}
+    assert store.link_dataset(url, tmp_path / "c" / "data") is None
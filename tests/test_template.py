@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import pytest
+
+from src.dpx.cli.utils.template import ProjectTemplate, placeholder
+from src.dpx.cli.utils.util import Project
+from src.dpx.utils.util import create_structure
+
+
+def relative_files(root: Path) -> list[str]:
+    return sorted(path.relative_to(root).as_posix() for path in root.rglob("*"))
+
+
+def make_project(project_path: Path) -> None:
+    project = Project(project_path)
+    project.mkdir_data_folders()
+    project.mkdir_other_files()
+    project.add_final_excel_file()
+
+
+def project_trees() -> list:
+    blank = Project(Path(placeholder))
+    return [blank.data_folders_structure, blank.other_files_structure]
+
+
+def test_copy_matches_a_generated_project(tmp_path: Path) -> None:
+    template = ProjectTemplate(project_trees(), tmp_path / "templates")
+
+    template.copy(tmp_path / "main" / "shop", make_project)
+    make_project(tmp_path / "generated" / "shop")
+
+    assert relative_files(tmp_path / "main" / "shop") == relative_files(tmp_path / "generated" / "shop")
+    assert "notebooks/shop.ipynb" in relative_files(tmp_path / "main" / "shop")
+    assert "data/processed/shop.xlsx" in relative_files(tmp_path / "main" / "shop")
+
+
+def test_template_is_built_once(tmp_path: Path) -> None:
+    built: list[Path] = []
+
+    def make(project_path: Path) -> None:
+        built.append(project_path)
+        create_structure(project_path, {placeholder: {f"{placeholder}.txt": None}, "README.md": None})
+
+    template = ProjectTemplate([{"README.md": None}], tmp_path / "templates")
+    template.copy(tmp_path / "main" / "a", make)
+    template.copy(tmp_path / "main" / "b", make)
+
+    assert len(built) == 1
+    # Nested names are renamed too
+    assert relative_files(tmp_path / "main" / "b") == ["README.md", "b", "b/b.txt"]
+    assert relative_files(template.template_path) == ["README.md", placeholder, f"{placeholder}/{placeholder}.txt"]
+
+
+def test_a_new_structure_replaces_the_old_template(tmp_path: Path) -> None:
+    def make(project_path: Path) -> None:
+        (project_path / "README.md").touch()
+
+    old = ProjectTemplate([{"README.md": None}], tmp_path / "templates")
+    old.copy(tmp_path / "main" / "a", make)
+    new = ProjectTemplate([{"README.md": None, "docs": {}}], tmp_path / "templates")
+    new.copy(tmp_path / "main" / "b", make)
+
+    assert new.digest != old.digest
+    assert [path.name for path in (tmp_path / "templates").iterdir()] == [new.digest]
+
+
+def test_failed_build_leaves_no_template(tmp_path: Path) -> None:
+    def make(project_path: Path) -> None:
+        (project_path / "README.md").touch()
+        raise OSError("disk full")
+
+    template = ProjectTemplate([{"README.md": None}], tmp_path / "templates")
+    with pytest.raises(OSError, match="disk full"):
+        template.copy(tmp_path / "main" / "a", make)
+
+    assert list((tmp_path / "templates").iterdir()) == []
+    assert not (tmp_path / "main" / "a").exists()
@@ -0,0 +1,91 @@
+import os
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from src.dpx.utils.util import extract_zip, zip_member_path
+
+
+def write_zip(zip_path: Path, members: dict[str, bytes]) -> Path:
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return zip_path
+
+
+@pytest.mark.parametrize(
+    "name", ["../x.csv", "a/../../x.csv", "/etc/x.csv", "\\x.csv", "C:/x.csv", "c:\\x.csv", "..\\x.csv", ""]
+)
+def test_member_names_outside_the_folder_are_refused(name: str) -> None:
+    with pytest.raises(ValueError, match="outside of"):
+        zip_member_path("/data/interim", name)
+
+
+def test_member_names_are_normalized() -> None:
+    assert zip_member_path("/data/interim", "./a//b\\c.csv") == "/data/interim/a/b/c.csv"
+
+
+@pytest.mark.skipif(os.name == "nt", reason="a colon starts a drive on Windows")
+@pytest.mark.parametrize("name", ["C:x.csv", "10:30 export.csv", "a/b:c.csv"])
+def test_colons_are_valid_in_posix_names(name: str) -> None:
+    assert zip_member_path("/data/interim", name) == f"/data/interim/{name}"
+
+
+def test_archive_with_one_escaping_member_is_refused_whole(tmp_path: Path) -> None:
+    zip_path = write_zip(tmp_path / "x.zip", {"ok.csv": b"id\n", "../escaped.csv": b"id\n"})
+
+    with pytest.raises(ValueError, match="outside of"):
+        extract_zip(zip_path, tmp_path / "out")
+
+    assert not (tmp_path / "escaped.csv").exists()
+    assert not (tmp_path / "out" / "ok.csv").exists()
+
+
+def test_symlinked_folder_leading_outside_is_refused(tmp_path: Path) -> None:
+    zip_path = write_zip(tmp_path / "x.zip", {"link/x.csv": b"id\n"})
+    (tmp_path / "out").mkdir()
+    (tmp_path / "elsewhere").mkdir()
+    (tmp_path / "out" / "link").symlink_to(tmp_path / "elsewhere")
+
+    with pytest.raises(ValueError, match="outside of"):
+        extract_zip(zip_path, tmp_path / "out")
+    assert os.listdir(tmp_path / "elsewhere") == []
+
+
+@pytest.mark.parametrize("skip_existing", [True, False])
+def test_symlink_at_a_member_path_is_replaced_not_written_through(tmp_path: Path, skip_existing: bool) -> None:
+    zip_path = write_zip(tmp_path / "x.zip", {"x.csv": b"id\n1\n"})
+    outside = tmp_path / "outside.csv"
+    # Same size and CRC as the member, not skipped either
+    outside.write_bytes(b"id\n1\n")
+    (tmp_path / "out").mkdir()
+    (tmp_path / "out" / "x.csv").symlink_to(outside)
+
+    assert extract_zip(zip_path, tmp_path / "out", skip_existing=skip_existing) == {"extracted": 1}
+
+    assert not (tmp_path / "out" / "x.csv").is_symlink()
+    assert (tmp_path / "out" / "x.csv").read_bytes() == b"id\n1\n"
+    assert not outside.samefile(tmp_path / "out" / "x.csv")
+
+    outside.write_bytes(b"untouched")
+    (tmp_path / "out" / "x.csv").unlink()
+    (tmp_path / "out" / "x.csv").symlink_to(outside)
+    extract_zip(zip_path, tmp_path / "out", skip_existing=skip_existing)
+    assert outside.read_bytes() == b"untouched"
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_extract_skips_members_already_extracted(tmp_path: Path, workers: int) -> None:
+    members = {f"parts/p{i}.csv": f"id\n{i}\n".encode() for i in range(10)}
+    zip_path = write_zip(tmp_path / "x.zip", {"empty/": b"", **members})
+
+    assert extract_zip(zip_path, tmp_path / "out", workers=workers) == {"extracted": 10}
+    assert (tmp_path / "out" / "empty").is_dir()
+    assert (tmp_path / "out" / "parts" / "p3.csv").read_bytes() == b"id\n3\n"
+
+    (tmp_path / "out" / "parts" / "p3.csv").write_bytes(b"id\nX\n")
+    assert extract_zip(zip_path, tmp_path / "out", workers=workers) == {"skipped": 9, "extracted": 1}
+    assert (tmp_path / "out" / "parts" / "p3.csv").read_bytes() == b"id\n3\n"
+
+    assert extract_zip(zip_path, tmp_path / "out", workers=workers, skip_existing=False) == {"extracted": 10}